@@ -0,0 +1,680 @@
+from typing import Callable as tCallable;
+from typing import Tuple as tTuple;
+from typing import List as tList;
+from typing import Dict as tDict;
+from argparse import ArgumentParser;
+from time import perf_counter, time;
+import random;
+import platform;
+import json;
+import sys;
+import os;
+import io;
+
+# Rendering benchmarks don't need a display. N.B. this must be set before pygame's display is initialised
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy");
+
+# Stops pygame printing its greeting to standard output, which JSON output may be going to
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1");
+
+from pygame import Vector2;
+import pygame;
+
+from machine import Machine, Position;
+from tape import Tape, TAPE_DEFAULT_SYMBOL;
+from rle_tape import RleTape;
+from engine import Engine, RunResult, run_machine;
+from macro_engine import MacroEngine, run_macro_machine, MACRO_DEFAULT_BLOCK_SIZE;
+from machine_serializer import MachineSerializer;
+from macro_check import check_same_result;
+from trace_files import TraceReader, TRACE_DEFAULT_CHECKPOINT_INTERVAL;
+
+# Benchmark suite for the engine, tape, serializer and renderer. Results can be written as JSON to compare runs across commits.
+# Usage: python benchmark.py [-o results.json] [-b benchmark names...]
+
+BENCHMARK_SYMBOLS = ["0", "1", "2", "3"];
+
+LARGE_MACHINE_STATES = 200;
+LARGE_MACHINE_STEPS = 20000;
+
+SERIALIZER_MACHINE_STATES = 25000; # With 4 symbols, gives 100,000 transitions
+
+SYNTHETIC_MACHINE_STATES = 1000;
+SYNTHETIC_MACHINE_SYMBOLS = [str(i) for i in range(10)]; # With 1000 states, gives 10,000 transitions
+SYNTHETIC_MACHINE_SEED = 0;
+SYNTHETIC_MACHINE_COLUMNS = 40; # States are laid out in a grid for rendering
+SYNTHETIC_MACHINE_SPACING = 150;
+
+ENGINE_STEPS = 200000; # Steps run for machines that don't halt sooner
+
+MACRO_BLOCK_SIZES = [1, 2, 3, 4, 6]; # Block sizes the macro machine is checked against the engine with
+CHECK_STEPS = [0, 1, 7, 100, 5000, ENGINE_STEPS]; # Step limits the macro machine and compiled machines are checked against the engine with, so that runs stop part way through blocks
+
+BUSY_BEAVER_5_STEPS = 47176870;
+BUSY_BEAVER_5_ONES = 4098;
+TAPE_OPERATIONS = 200000;
+
+TRACE_SEEKS = 100; # Random steps the trace reader is checked and timed seeking to
+
+MIN_TIMING_DURATION = 0.5; # Least time (in seconds) spent repeating an operation when timing it
+
+BENCHMARK_WINDOW_SIZE = (1000, 500);
+HEATMAP_FRAME_STEPS = 10000; # Steps run between heatmap updates when timing them
+BENCHMARK_TAPE_WINDOW_SIZE = (1000, 100);
+
+BLANK_SYMBOL = "_"; # Blank symbol used by the binary counter
+
+# Standard workloads. Transitions are (start, read symbol, end, write symbol, head move) and a machine halts by moving to a state without transitions
+
+BUSY_BEAVERS = {
+
+    # Champions for the number of steps made before halting
+
+    "busy_beaver_2": (3, [
+        (0, "0", 1, "1", 1), (0, "1", 1, "1", -1),
+        (1, "0", 0, "1", -1), (1, "1", 2, "1", 1)
+    ]), # 6 steps
+
+    "busy_beaver_3": (4, [
+        (0, "0", 1, "1", 1), (0, "1", 3, "1", 1),
+        (1, "0", 1, "1", -1), (1, "1", 2, "0", 1),
+        (2, "0", 2, "1", -1), (2, "1", 0, "1", -1)
+    ]), # 21 steps
+
+    "busy_beaver_4": (5, [
+        (0, "0", 1, "1", 1), (0, "1", 1, "1", -1),
+        (1, "0", 0, "1", -1), (1, "1", 2, "0", -1),
+        (2, "0", 4, "1", 1), (2, "1", 3, "1", -1),
+        (3, "0", 3, "1", 1), (3, "1", 0, "0", 1)
+    ]), # 107 steps
+
+    "busy_beaver_5": (6, [
+        (0, "0", 1, "1", 1), (0, "1", 2, "1", -1),
+        (1, "0", 2, "1", 1), (1, "1", 1, "1", 1),
+        (2, "0", 3, "1", 1), (2, "1", 4, "0", -1),
+        (3, "0", 0, "1", -1), (3, "1", 3, "1", -1),
+        (4, "0", 5, "1", 1), (4, "1", 0, "0", -1)
+    ]) # 47,176,870 steps so is only run for ENGINE_STEPS steps
+
+};
+
+BINARY_COUNTER = (2, [
+
+    # Counts up in binary forever. State 0 moves right to the end of the number and state 1 adds one moving left
+
+    (0, "0", 0, "0", 1), (0, "1", 0, "1", 1), (0, BLANK_SYMBOL, 1, BLANK_SYMBOL, -1),
+    (1, "1", 1, "0", -1), (1, "0", 0, "1", 1), (1, BLANK_SYMBOL, 0, "1", 1)
+
+]);
+
+def create_machine(states_count: int,
+    transitions: tList[tTuple[int, str, int, str, int]]) -> Machine:
+
+    """Creates a machine from a list of (start, read symbol, end, write symbol, head move). States are laid out in a grid."""
+
+    m = Machine();
+
+    for i in range(states_count):
+        m.add_state(Position(
+            (i % SYNTHETIC_MACHINE_COLUMNS) * SYNTHETIC_MACHINE_SPACING,
+            (i // SYNTHETIC_MACHINE_COLUMNS) * SYNTHETIC_MACHINE_SPACING
+        ));
+
+    for start, read_symbol, end, write_symbol, head_move in transitions:
+
+        m.try_add_transition(
+            start = start,
+            end = end,
+            read_symbol = read_symbol,
+            write_symbol = write_symbol,
+            head_move = head_move
+        );
+
+    return m;
+
+def create_large_machine(states_count: int,
+    symbols: list) -> Machine:
+
+    """Creates a machine with a transition for every (state, symbol) pair. Each transition moves on to the next state, writes the next symbol and moves the head right, so the machine never halts."""
+
+    m = Machine();
+
+    for i in range(states_count):
+        m.add_state(Position(i, 0));
+
+    for i in range(states_count):
+
+        for j in range(len(symbols)):
+
+            m.try_add_transition(
+                start = i,
+                end = (i + 1) % states_count,
+                read_symbol = symbols[j],
+                write_symbol = symbols[(j + 1) % len(symbols)],
+                head_move = 1
+            );
+
+    return m;
+
+def create_synthetic_machine(states_count: int = SYNTHETIC_MACHINE_STATES,
+    symbols: tList[str] = SYNTHETIC_MACHINE_SYMBOLS,
+    seed: int = SYNTHETIC_MACHINE_SEED) -> Machine:
+
+    """Creates a machine with a transition for every (state, symbol) pair going to a random state, writing a random symbol and moving the head randomly. The machine never halts. The same seed always gives the same machine."""
+
+    rng = random.Random(seed);
+
+    transitions = [];
+
+    for i in range(states_count):
+
+        for symbol in symbols:
+            transitions.append((i, symbol, rng.randrange(states_count), rng.choice(symbols), rng.choice((-1, 1))));
+
+    return create_machine(states_count, transitions);
+
+def determine_output_linear(m: Machine,
+    start_state: int,
+    read_symbol: str
+    ) -> tTuple[int, str, int] | None:
+
+    """The original implementation of Machine.determine_output, scanning every transition. Kept as the baseline to compare against."""
+
+    for t in m.transitions:
+
+        if t.applies_to(start_state, read_symbol):
+            return t.output_to_tuple();
+
+    return None;
+
+def time_steps(determine_output: tCallable[[int, str], tTuple[int, str, int] | None],
+    steps: int) -> float:
+
+    """Runs the given number of steps using the provided output function on a blank tape and returns the number of steps per second"""
+
+    tape = Tape(TAPE_DEFAULT_SYMBOL);
+    state = 0;
+
+    start_time = perf_counter();
+
+    for _ in range(steps):
+
+        out = determine_output(state, tape.get_at_head());
+
+        if out == None:
+            break;
+
+        state, write_symbol, head_move = out;
+        tape.set_at_head(write_symbol);
+        tape.head_forward(head_move);
+
+    return steps / (perf_counter() - start_time);
+
+def time_repeated(f: tCallable[[], object],
+    min_duration: float = MIN_TIMING_DURATION) -> float:
+
+    """Calls f repeatedly for at least min_duration seconds and returns the mean time per call in seconds"""
+
+    count = 0;
+    start_time = perf_counter();
+
+    while True:
+
+        f();
+        count += 1;
+
+        elapsed = perf_counter() - start_time;
+
+        if elapsed >= min_duration:
+            return elapsed / count;
+
+def time_engine(m: Machine,
+    blank_symbol: str,
+    max_steps: int,
+    detect_cycles: bool = False,
+    profile: bool = False,
+    tape_class: type = Tape,
+    compiled: bool = False) -> float:
+
+    """Runs the machine on a blank tape until it halts or max_steps steps have been made, repeating short runs, and returns the number of steps per second"""
+
+    steps = 0;
+    start_time = perf_counter();
+
+    while True:
+
+        result = Engine(m, tape_class(blank_symbol), detect_cycles = detect_cycles, profile = profile, compiled = compiled).run(max_steps);
+        steps += result.steps;
+
+        elapsed = perf_counter() - start_time;
+
+        if elapsed >= MIN_TIMING_DURATION:
+            return steps / elapsed;
+
+class BenchmarkResults:
+
+    """Collects measurements, printing each as it is added"""
+
+    def __init__(self,
+        log_file = sys.stdout):
+
+        self.results = {};
+        self.log_file = log_file;
+
+    def section(self,
+        title: str) -> None:
+        print(f"{title}:", file = self.log_file);
+
+    def add(self,
+        name: str,
+        value: float,
+        unit: str) -> None:
+
+        self.results[name] = {"value": value, "unit": unit};
+
+        print(f"    {name:48}{value:16.3f} {unit}", file = self.log_file);
+
+    def to_json_object(self) -> tDict[str, object]:
+
+        return {
+            "meta": {
+                "time": time(),
+                "python": sys.version,
+                "implementation": platform.python_implementation(),
+                "platform": platform.platform(),
+                "pygame": pygame.version.ver
+            },
+            "results": self.results
+        };
+
+def benchmark_determine_output(results: BenchmarkResults) -> None:
+
+    m = create_large_machine(LARGE_MACHINE_STATES, BENCHMARK_SYMBOLS);
+
+    results.section(f"determine_output on {len(m.states)} states, {len(m.transitions)} transitions");
+
+    linear_rate = time_steps(lambda s, r: determine_output_linear(m, s, r), LARGE_MACHINE_STEPS);
+    table_rate = time_steps(m.determine_output, LARGE_MACHINE_STEPS);
+
+    results.add("determine_output.linear_scan", linear_rate, "steps/s");
+    results.add("determine_output.table", table_rate, "steps/s");
+
+def benchmark_engine(results: BenchmarkResults) -> None:
+
+    # (name, machine, blank symbol)
+
+    workloads = [(name, create_machine(*definition), TAPE_DEFAULT_SYMBOL) for name, definition in BUSY_BEAVERS.items()];
+    workloads.append(("binary_counter", create_machine(*BINARY_COUNTER), BLANK_SYMBOL));
+    workloads.append(("synthetic", create_synthetic_machine(), TAPE_DEFAULT_SYMBOL));
+
+    results.section("Engine");
+
+    for name, m, blank_symbol in workloads:
+
+        results.add(f"engine.{name}", time_engine(m, blank_symbol, ENGINE_STEPS), "steps/s");
+        results.add(f"engine.{name}.detect_cycles", time_engine(m, blank_symbol, ENGINE_STEPS, detect_cycles = True), "steps/s");
+        results.add(f"engine.{name}.profile", time_engine(m, blank_symbol, ENGINE_STEPS, profile = True), "steps/s");
+        results.add(f"engine.{name}.compiled", time_engine(m, blank_symbol, ENGINE_STEPS, compiled = True), "steps/s");
+
+    # Differential check of compiled machines against the engine, including runs split over several calls. Any difference stops the benchmarks
+
+    checked = 0;
+
+    for name, m, blank_symbol in workloads:
+
+        for max_steps in CHECK_STEPS:
+
+            expected = run_machine(m, Tape(blank_symbol), max_steps = max_steps);
+
+            check_same_result(expected, Engine(m, Tape(blank_symbol), compiled = True).run(max_steps), f"{name} compiled with {max_steps} steps");
+
+            engine = Engine(m, Tape(blank_symbol), compiled = True);
+            engine.run_steps(max_steps // 3);
+            check_same_result(expected, engine.run(max_steps), f"{name} compiled continued to {max_steps} steps");
+
+            checked += 2;
+
+    results.add("engine.compiled.runs_matching_engine", checked, "runs");
+
+    # Checkpointing, as used by the GUI
+
+    m = create_machine(*BUSY_BEAVERS["busy_beaver_5"]);
+    engine = Engine(m, Tape(TAPE_DEFAULT_SYMBOL), checkpoint_interval = 1000, max_checkpoints = 1000);
+
+    start_time = perf_counter();
+    engine.run_steps(ENGINE_STEPS);
+    results.add("engine.busy_beaver_5.checkpoints", engine.steps / (perf_counter() - start_time), "steps/s");
+
+    start_time = perf_counter();
+    engine.seek(ENGINE_STEPS // 2);
+    results.add("engine.busy_beaver_5.seek_back_half", (perf_counter() - start_time) * 1000, "ms");
+
+def benchmark_macro(results: BenchmarkResults) -> None:
+
+    # (name, machine, blank symbol)
+
+    workloads = [(name, create_machine(*definition), TAPE_DEFAULT_SYMBOL) for name, definition in BUSY_BEAVERS.items()];
+    workloads.append(("binary_counter", create_machine(*BINARY_COUNTER), BLANK_SYMBOL));
+    workloads.append(("synthetic", create_synthetic_machine(), TAPE_DEFAULT_SYMBOL));
+
+    results.section("Macro machine");
+
+    # Differential check against the engine on the standard workloads. Any difference stops the benchmarks. macro_check.py checks random machines and tapes
+
+    checked = 0;
+
+    for name, m, blank_symbol in workloads:
+
+        for max_steps in CHECK_STEPS:
+
+            expected = run_machine(m, Tape(blank_symbol), max_steps = max_steps);
+
+            for block_size in MACRO_BLOCK_SIZES:
+
+                check_same_result(expected, run_macro_machine(m, Tape(blank_symbol), max_steps = max_steps, block_size = block_size), f"{name} with block size {block_size} and {max_steps} steps");
+                checked += 1;
+
+            # Continuing a run that stopped part way through a block
+
+            engine = MacroEngine(m, Tape(blank_symbol));
+            engine.run(max_steps // 2);
+            check_same_result(expected, engine.run(max_steps), f"{name} continued to {max_steps} steps");
+            checked += 1;
+
+    results.add("macro.runs_matching_engine", checked, "runs");
+
+    # Speed
+
+    for name, m, blank_symbol in workloads:
+
+        start_time = perf_counter();
+        result = run_macro_machine(m, Tape(blank_symbol), max_steps = ENGINE_STEPS);
+        results.add(f"macro.{name}", result.steps / (perf_counter() - start_time), "steps/s");
+
+    # Busy beaver 5 all the way to halting, which the engine would take minutes for
+
+    m = create_machine(*BUSY_BEAVERS["busy_beaver_5"]);
+
+    start_time = perf_counter();
+    engine = MacroEngine(m, Tape(TAPE_DEFAULT_SYMBOL), block_size = MACRO_DEFAULT_BLOCK_SIZE);
+    result = engine.run();
+    elapsed = perf_counter() - start_time;
+
+    if (not result.halted) or (result.steps != BUSY_BEAVER_5_STEPS) or (result.tape_cells.count("1") != BUSY_BEAVER_5_ONES):
+        raise Exception("Busy beaver 5 gave the wrong result");
+
+    results.add("macro.busy_beaver_5.to_halt", elapsed * 1000, "ms");
+    results.add("macro.busy_beaver_5.to_halt.macro_steps", engine.macro_steps, "macro steps");
+
+def benchmark_trace(results: BenchmarkResults) -> None:
+
+    results.section("Trace");
+
+    m = create_machine(*BUSY_BEAVERS["busy_beaver_5"]);
+
+    # Writing, into memory so that disk speed isn't measured
+
+    f = io.BytesIO();
+    engine = Engine(m, Tape(TAPE_DEFAULT_SYMBOL));
+
+    start_time = perf_counter();
+    engine.enable_tracing(f, TRACE_DEFAULT_CHECKPOINT_INTERVAL);
+    engine.run_steps(ENGINE_STEPS);
+    engine.disable_tracing();
+    elapsed = perf_counter() - start_time;
+
+    results.add("trace.write", engine.steps / elapsed, "steps/s");
+    results.add("trace.size", len(f.getvalue()) / engine.steps, "bytes/step");
+
+    # Seeking to random steps, checked against the engine
+
+    reader = TraceReader(io.BytesIO(f.getvalue()));
+    rng = random.Random(0);
+    engine = Engine(m, Tape(TAPE_DEFAULT_SYMBOL));
+    elapsed = 0;
+
+    for step in sorted(rng.randrange(ENGINE_STEPS + 1) for _ in range(TRACE_SEEKS)):
+
+        start_time = perf_counter();
+        configuration = reader.get_configuration(step);
+        elapsed += perf_counter() - start_time;
+
+        engine.run(step);
+
+        if ((configuration.state, configuration.tape.head, configuration.tape.get_bounds(), configuration.tape.read_all())
+            != (engine.state, engine.tape.head, engine.tape.get_bounds(), engine.tape.read_all())):
+            raise Exception(f"Trace gave the wrong configuration for step {step}");
+
+    results.add("trace.seek", elapsed * 1000 / TRACE_SEEKS, "ms");
+
+    # Reading every step
+
+    start_time = perf_counter();
+    count = sum(1 for _ in reader.iter_steps());
+    results.add("trace.iterate", count / (perf_counter() - start_time), "steps/s");
+
+def benchmark_tape(results: BenchmarkResults) -> None:
+
+    results.section("Tape");
+
+    rng = random.Random(0);
+    indexes = [rng.randrange(-1000, 1000) for _ in range(TAPE_OPERATIONS)];
+    symbols = [rng.choice(BENCHMARK_SYMBOLS) for _ in range(TAPE_OPERATIONS)];
+
+    for name, tape_class in (("tape", Tape), ("rle_tape", RleTape)):
+
+        def random_sets():
+
+            tape = tape_class(TAPE_DEFAULT_SYMBOL);
+
+            for i, symbol in zip(indexes, symbols):
+                tape.set(i, symbol);
+
+        def random_gets():
+
+            for i in indexes:
+                tape.get(i);
+
+        def sweep():
+
+            # Moves the head right writing to every cell, growing the tape as it goes
+
+            t = tape_class(TAPE_DEFAULT_SYMBOL);
+
+            for symbol in symbols:
+                t.set_at_head(symbol);
+                t.head_forward(1);
+
+        def uniform_sweep():
+
+            # The same but writing the same symbol to every cell
+
+            t = tape_class(TAPE_DEFAULT_SYMBOL);
+
+            for _ in range(TAPE_OPERATIONS):
+                t.set_at_head("1");
+                t.head_forward(1);
+
+        tape = tape_class(TAPE_DEFAULT_SYMBOL);
+
+        for i, symbol in zip(indexes, symbols):
+            tape.set(i, symbol);
+
+        results.add(f"{name}.random_set", TAPE_OPERATIONS / time_repeated(random_sets), "ops/s");
+        results.add(f"{name}.random_get", TAPE_OPERATIONS / time_repeated(random_gets), "ops/s");
+        results.add(f"{name}.sweep_write", TAPE_OPERATIONS / time_repeated(sweep), "ops/s");
+        results.add(f"{name}.uniform_sweep_write", TAPE_OPERATIONS / time_repeated(uniform_sweep), "ops/s");
+        results.add(f"{name}.copy", 1 / time_repeated(tape.copy), "copies/s");
+
+    # Size of a uniform stretch of tape. The run-length-encoded tape holds it as a single run
+
+    t = RleTape(TAPE_DEFAULT_SYMBOL);
+    t.set(TAPE_OPERATIONS, "1");
+
+    for i in range(TAPE_OPERATIONS):
+        t.set(i, "1");
+
+    results.add("rle_tape.uniform_stretch_runs", t.get_runs_count(), "runs");
+
+    # Running a machine on each kind of tape, checking that they agree
+
+    m = create_machine(*BUSY_BEAVERS["busy_beaver_5"]);
+
+    expected = run_machine(m, Tape(TAPE_DEFAULT_SYMBOL), max_steps = ENGINE_STEPS);
+    check_same_result(expected, run_machine(m, RleTape(TAPE_DEFAULT_SYMBOL), max_steps = ENGINE_STEPS), "busy_beaver_5 on a run-length-encoded tape");
+
+    results.add("engine.busy_beaver_5.rle_tape", time_engine(m, TAPE_DEFAULT_SYMBOL, ENGINE_STEPS, tape_class = RleTape), "steps/s");
+
+def benchmark_serializer(results: BenchmarkResults) -> None:
+
+    results.section("MachineSerializer");
+
+    for name, m in (("synthetic", create_synthetic_machine()), ("large", create_large_machine(SERIALIZER_MACHINE_STATES, BENCHMARK_SYMBOLS))):
+
+        bs = MachineSerializer.serialize(m);
+        mb = len(bs) / 1_000_000;
+
+        save_time = time_repeated(lambda: MachineSerializer.serialize(m));
+        load_time = time_repeated(lambda: MachineSerializer.deserialize(bs));
+
+        results.add(f"serializer.{name}.size", mb, "MB");
+        results.add(f"serializer.{name}.save", mb / save_time, "MB/s");
+        results.add(f"serializer.{name}.load", mb / load_time, "MB/s");
+
+def benchmark_renderer(results: BenchmarkResults) -> None:
+
+    # Imported here so the other benchmarks can be run without the GUI modules
+
+    from machine_window import MachineWindow;
+    from tape_window import TapeWindow;
+    from camera import CAMERA_MIN_ZOOM;
+    from render_cache import TEXT_CACHE;
+
+    pygame.display.init();
+    pygame.font.init();
+
+    state_font = pygame.font.SysFont("Courier New", 24);
+    transition_font = pygame.font.SysFont("Courier New", 12);
+    tape_font = pygame.font.SysFont("Courier New", 20);
+
+    results.section("Renderer");
+
+    def add_render_timing(name: str,
+        f: tCallable[[], object]) -> None:
+
+        """Times a render and reports how the text cache was used by it, with the cache's counters reset first"""
+
+        TEXT_CACHE.reset_counters();
+
+        results.add(f"renderer.{name}", time_repeated(f) * 1000, "ms");
+        results.add(f"renderer.{name}.text_cache_hits", TEXT_CACHE.hits, "hits");
+        results.add(f"renderer.{name}.text_cache_misses", TEXT_CACHE.misses, "misses");
+        results.add(f"renderer.{name}.text_cache_hit_rate", TEXT_CACHE.get_hit_rate() * 100, "%");
+
+    m = create_synthetic_machine();
+    window = MachineWindow(BENCHMARK_WINDOW_SIZE, m, (255, 255, 255), state_font, transition_font);
+
+    add_render_timing("machine_window.refresh", window.refresh);
+    add_render_timing("machine_window.redraw", window.redraw);
+
+    # Changing the current state as happens every frame while running
+
+    curr_state = [0];
+
+    def step_frame():
+        curr_state[0] = (curr_state[0] + 1) % len(m.states);
+        window.set_curr_state(curr_state[0]);
+        window.redraw_if_dirty();
+
+    add_render_timing("machine_window.step_frame", step_frame);
+
+    # Panning back and forth
+
+    direction = [1];
+
+    def pan_frame():
+        direction[0] = -direction[0];
+        window.pan_camera(direction[0] * 50, 0);
+        window.redraw_if_dirty();
+
+    add_render_timing("machine_window.pan_frame", pan_frame);
+
+    # Panning steadily in one direction, so that the sprites are updated whenever the view leaves the area they were made for. Goes back to the start after crossing the machine
+
+    def pan_across_frame():
+
+        if window.camera.offset[0] > SYNTHETIC_MACHINE_COLUMNS * SYNTHETIC_MACHINE_SPACING:
+            window.camera.offset[0] = 0;
+
+        window.pan_camera(50, 0);
+        window.redraw_if_dirty();
+
+    add_render_timing("machine_window.pan_across_frame", pan_across_frame);
+
+    # Updating the heatmap while running, with the counts of a profiled run growing between updates
+
+    engine = Engine(m, Tape(TAPE_DEFAULT_SYMBOL), profile = True);
+
+    def heatmap_frame():
+        engine.run_steps(HEATMAP_FRAME_STEPS);
+        window.set_heatmap(engine.profile.get_state_counts(), engine.profile.get_pair_counts());
+        window.redraw_if_dirty();
+
+    add_render_timing("machine_window.heatmap_frame", heatmap_frame);
+    window.set_heatmap(None, None);
+
+    # Zoomed out so that the whole machine is in view
+
+    window.zoom_camera(CAMERA_MIN_ZOOM / window.camera.zoom, Vector2(0, 0));
+
+    add_render_timing("machine_window.refresh_all_visible", window.refresh);
+    add_render_timing("machine_window.redraw_all_visible", window.redraw);
+
+    # Tape
+
+    tape = Tape(TAPE_DEFAULT_SYMBOL);
+    tape_window = TapeWindow(BENCHMARK_TAPE_WINDOW_SIZE, tape, (255, 255, 255), tape_font);
+
+    def tape_frame():
+        tape.set_at_head(BENCHMARK_SYMBOLS[tape.head % len(BENCHMARK_SYMBOLS)]);
+        tape.head_forward(1);
+        tape_window.refresh();
+
+    add_render_timing("tape_window.step_frame", tape_frame);
+
+BENCHMARKS = {
+    "determine_output": benchmark_determine_output,
+    "engine": benchmark_engine,
+    "macro": benchmark_macro,
+    "trace": benchmark_trace,
+    "tape": benchmark_tape,
+    "serializer": benchmark_serializer,
+    "renderer": benchmark_renderer
+};
+
+def main():
+
+    parser = ArgumentParser(description = "Run benchmarks for the engine, tape, serializer and renderer.");
+
+    parser.add_argument("-o", "--output", default = None, help = "File to write results to as JSON. Use - for standard output");
+    parser.add_argument("-b", "--benchmarks", nargs = "+", choices = list(BENCHMARKS.keys()), default = list(BENCHMARKS.keys()), help = "Benchmarks to run. Defaults to all of them");
+
+    args = parser.parse_args();
+
+    # Keep standard output for the JSON if it is being written there
+
+    results = BenchmarkResults(sys.stderr if args.output == "-" else sys.stdout);
+
+    for name in args.benchmarks:
+        BENCHMARKS[name](results);
+
+    if args.output == "-":
+        print(json.dumps(results.to_json_object(), indent = 2));
+
+    elif args.output != None:
+
+        with open(args.output, "w") as f:
+            json.dump(results.to_json_object(), f, indent = 2);
+
+if __name__ == "__main__":
+    main();
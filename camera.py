@@ -0,0 +1,71 @@
+from typing import Tuple as tTuple;
+from pygame import Vector2, Rect;
+
+CAMERA_MIN_ZOOM = 0.125;
+CAMERA_MAX_ZOOM = 4;
+
+class Camera:
+
+    """Maps between machine (world) positions and positions in a window. offset is the world position shown at the window's top-left and zoom is the number of window pixels per world unit."""
+
+    def __init__(self,
+        offset: Vector2 | None = None,
+        zoom: float = 1):
+
+        self.offset = Vector2(offset) if offset != None else Vector2(0, 0);
+        self.zoom = zoom;
+
+    def world_to_screen(self,
+        pos: Vector2) -> Vector2:
+        return (Vector2(pos) - self.offset) * self.zoom;
+
+    def screen_to_world(self,
+        pos: Vector2) -> Vector2:
+        return (Vector2(pos) / self.zoom) + self.offset;
+
+    def get_scaled_offset(self) -> tTuple[int, int]:
+
+        """Gets the offset in window pixels. Sprites are positioned at world positions times the zoom, so they are drawn moved back by this."""
+
+        return (round(self.offset[0] * self.zoom), round(self.offset[1] * self.zoom));
+
+    def get_visible_world_rect(self,
+        size: tTuple[int, int],
+        margin: int = 0) -> Rect:
+
+        """Gets the part of the world shown in a window of the provided size, grown by margin window pixels on every side"""
+
+        world_margin = margin / self.zoom;
+
+        return Rect(
+            int(self.offset[0] - world_margin),
+            int(self.offset[1] - world_margin),
+            int((size[0] / self.zoom) + (2 * world_margin)) + 1,
+            int((size[1] / self.zoom) + (2 * world_margin)) + 1
+        );
+
+    def pan(self,
+        dx: float,
+        dy: float) -> None:
+
+        """Moves the camera by the provided number of window pixels"""
+
+        self.offset += Vector2(dx, dy) / self.zoom;
+
+    def zoom_at(self,
+        factor: float,
+        screen_pos: Vector2) -> bool:
+
+        """Zooms by the provided factor, keeping the world position under screen_pos where it is. Returns whether the zoom changed."""
+
+        new_zoom = min(max(self.zoom * factor, CAMERA_MIN_ZOOM), CAMERA_MAX_ZOOM);
+
+        if new_zoom == self.zoom:
+            return False;
+
+        world_pos = self.screen_to_world(screen_pos);
+
+        self.zoom = new_zoom;
+        self.offset = world_pos - (Vector2(screen_pos) / self.zoom);
+
+        return True;
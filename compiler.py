@@ -0,0 +1,359 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from typing import Dict as tDict;
+from collections import OrderedDict;
+from weakref import WeakKeyDictionary;
+from hashlib import sha256;
+import sys;
+
+from machine import Machine;
+from tape import Tape, TAPE_MAX_SPAN;
+
+# Compiles a machine into a Python function specialised to it. Each state becomes a block of code that branches on the symbol read with the writes, head moves and next states written in as constants, so running a step involves no method calls or table lookups.
+# Large machines are compiled to a loop that looks each step up in a flat list indexed by state and symbol code instead, as branching through thousands of transitions is slower than one list index
+# The function runs on a bytearray of symbol codes. Cells that have never been written hold SENTINEL_CODE, which no transition reads, so reaching one falls through to the slow path that grows the buffer and fills the cell with the blank symbol. This keeps bounds checks out of the fast path and keeps track of which cells have been written, as a tape does
+# Compiled machines are cached by a hash of their transition table, so identical machines share one, and each machine remembers its compiled form until its transition table changes
+# N.B. like the engine, this module must not import pygame or tkinter
+
+SENTINEL_CODE = 0xff;
+UNWRITTEN = bytes([SENTINEL_CODE]);
+MAX_SYMBOL_CODES = SENTINEL_CODE; # Codes 0 to 254 can be used for symbols
+
+COMPILED_TAPE_PADDING = 64; # Number of unwritten cells added either side of the tape when it is loaded into a buffer
+COMPILE_CACHE_MAX_SIZE = 32; # Maximum number of compiled machines kept by content hash
+COMPILE_MAX_BRANCHED_TRANSITIONS = 2000; # Machines with more transitions are compiled to a flat table lookup rather than branches
+FLAT_TABLE_WIDTH = SENTINEL_CODE + 1; # Entries per state in the flat table, one for every symbol code
+
+class CompiledMachine:
+
+    """A machine compiled to a Python function. Symbols used by the machine are given fixed codes when compiling and any other symbols on a tape are given codes after them when it is run."""
+
+    def __init__(self,
+        machine: Machine):
+
+        table = machine.transition_table;
+
+        self._table_keys = set(table.keys());
+
+        # Give every state and symbol a dense code. The index after the last state is used for states without transitions
+
+        self.state_numbers = sorted({start for start, _ in table.keys()} | {t.end for t in table.values()});
+        self.state_indexes = {n: i for i, n in enumerate(self.state_numbers)};
+
+        self.symbols = sorted({read_symbol for _, read_symbol in table.keys()} | {t.write_symbol for t in table.values()});
+        self.symbol_codes = {symbol: i for i, symbol in enumerate(self.symbols)};
+
+        if len(self.symbols) > MAX_SYMBOL_CODES:
+            raise Exception(f"Machines with more than {MAX_SYMBOL_CODES} symbols can't be compiled");
+
+        self.margin = max([abs(t.head_move) for t in table.values()] + [1]); # Unwritten cells kept either side of the written cells so the head can never move off the buffer
+
+        # Which states read the blank symbol, by blank symbol, as it depends on the tape being run
+
+        self._reads_blank = {};
+
+        namespace = {"UNWRITTEN": UNWRITTEN};
+
+        if len(table) > COMPILE_MAX_BRANCHED_TRANSITIONS:
+            self.source = self._generate_flat_source();
+            namespace["TABLE"] = self._build_flat_table(table);
+        else:
+            self.source = self._generate_source(table);
+
+        exec(compile(self.source, f"<compiled machine {len(self.state_numbers)} states>", "exec"), namespace);
+
+        self.function = namespace["run"];
+
+    def _generate_state_block(self,
+        lines: tList[str],
+        indent: str,
+        state_index: int,
+        transitions: tList[tTuple[int, int, int, int]]) -> None:
+
+        """Adds the code for a state, which branches on the code read. transitions are (read code, write code, head move, end state index)."""
+
+        keyword = "if";
+
+        for read_code, write_code, head_move, end_index in transitions:
+
+            lines.append(f"{indent}{keyword} c == {read_code}:");
+
+            body = [];
+
+            if write_code != read_code:
+                body.append(f"cells[head] = {write_code}");
+
+            if head_move != 0:
+                body.append(f"head += {head_move}");
+
+            if end_index != state_index:
+                body.append(f"state = {end_index}");
+
+            if len(body) == 0:
+                body.append("pass");
+
+            lines.extend(f"{indent}    {line}" for line in body);
+
+            keyword = "elif";
+
+        if len(transitions) > 0:
+
+            # Reaching an unwritten cell. If the state reads blanks, fill the cell with a blank and go again
+
+            lines.append(f"{indent}{keyword} c == {SENTINEL_CODE} and reads_blank_{state_index}:");
+            lines.append(f"{indent}    if head < {self.margin}:");
+            lines.append(f"{indent}        extra = len(cells) + {self.margin}");
+            lines.append(f"{indent}        cells[0:0] = UNWRITTEN * extra");
+            lines.append(f"{indent}        head += extra");
+            lines.append(f"{indent}        shift += extra");
+            lines.append(f"{indent}    if head >= len(cells) - {self.margin}:");
+            lines.append(f"{indent}        cells.extend(UNWRITTEN * (len(cells) + {self.margin}))");
+            lines.append(f"{indent}    cells[head] = blank");
+            lines.append(f"{indent}    continue");
+            lines.append(f"{indent}else:");
+            lines.append(f"{indent}    halted = True");
+            lines.append(f"{indent}    break");
+
+        else:
+            lines.append(f"{indent}halted = True");
+            lines.append(f"{indent}break");
+
+    def _generate_dispatch(self,
+        lines: tList[str],
+        indent: str,
+        low: int,
+        high: int,
+        blocks: tDict[int, tList[tTuple[int, int, int, int]]]) -> None:
+
+        """Adds code that branches to the blocks of the states with indexes from low (inclusive) to high (exclusive), splitting the range in half at each branch"""
+
+        if high - low == 1:
+            self._generate_state_block(lines, indent, low, blocks.get(low, []));
+            return;
+
+        middle = (low + high) // 2;
+
+        lines.append(f"{indent}if state < {middle}:");
+        self._generate_dispatch(lines, indent + "    ", low, middle, blocks);
+        lines.append(f"{indent}else:");
+        self._generate_dispatch(lines, indent + "    ", middle, high, blocks);
+
+    def _generate_source(self,
+        table: dict) -> str:
+
+        states_count = len(self.state_numbers) + 1; # Including the index for states without transitions
+
+        blocks = {};
+
+        for (start, read_symbol), t in table.items():
+
+            blocks.setdefault(self.state_indexes[start], []).append((
+                self.symbol_codes[read_symbol],
+                self.symbol_codes[t.write_symbol],
+                t.head_move,
+                self.state_indexes[t.end]
+            ));
+
+        lines = [
+            "def run(cells, head, state, max_steps, blank, reads_blank):",
+            "",
+            f"    ({''.join(f'reads_blank_{i}, ' for i in range(states_count))}) = reads_blank",
+            "",
+            "    steps = 0",
+            "    halted = False",
+            "    shift = 0",
+            "",
+            "    while steps < max_steps:",
+            "",
+            "        c = cells[head]",
+            ""
+        ];
+
+        self._generate_dispatch(lines, "        ", 0, states_count, blocks);
+
+        lines.extend([
+            "",
+            "        steps += 1",
+            "",
+            "    return head, state, steps, halted, shift",
+            ""
+        ]);
+
+        return "\n".join(lines);
+
+    def _build_flat_table(self,
+        table: dict) -> tList[tTuple[int, int, int] | None]:
+
+        """Builds a list with an entry for every state index and symbol code, at state index * FLAT_TABLE_WIDTH + code. Entries are (write code, head move, end state index * FLAT_TABLE_WIDTH), or None where there's no transition."""
+
+        flat = [None] * ((len(self.state_numbers) + 1) * FLAT_TABLE_WIDTH);
+
+        for (start, read_symbol), t in table.items():
+            flat[(self.state_indexes[start] * FLAT_TABLE_WIDTH) + self.symbol_codes[read_symbol]] = (self.symbol_codes[t.write_symbol], t.head_move, self.state_indexes[t.end] * FLAT_TABLE_WIDTH);
+
+        return flat;
+
+    def _generate_flat_source(self) -> str:
+
+        """Generates a function that looks each step up in the flat table. The state is kept multiplied by FLAT_TABLE_WIDTH so the lookup is a single add."""
+
+        return "\n".join([
+            "def run(cells, head, state, max_steps, blank, reads_blank):",
+            "",
+            "    table = TABLE",
+            "",
+            "    steps = 0",
+            "    halted = False",
+            "    shift = 0",
+            f"    state *= {FLAT_TABLE_WIDTH}",
+            "",
+            "    while steps < max_steps:",
+            "",
+            "        entry = table[state + cells[head]]",
+            "",
+            "        if entry is None:",
+            "",
+            "            # Reaching an unwritten cell. If the state reads blanks, fill the cell with a blank and go again",
+            "",
+            f"            if cells[head] == {SENTINEL_CODE} and reads_blank[state // {FLAT_TABLE_WIDTH}]:",
+            f"                if head < {self.margin}:",
+            f"                    extra = len(cells) + {self.margin}",
+            "                    cells[0:0] = UNWRITTEN * extra",
+            "                    head += extra",
+            "                    shift += extra",
+            f"                if head >= len(cells) - {self.margin}:",
+            f"                    cells.extend(UNWRITTEN * (len(cells) + {self.margin}))",
+            "                cells[head] = blank",
+            "                continue",
+            "",
+            "            halted = True",
+            "            break",
+            "",
+            "        cells[head], head_move, state = entry",
+            "        head += head_move",
+            "",
+            "        steps += 1",
+            "",
+            f"    return head, state // {FLAT_TABLE_WIDTH}, steps, halted, shift",
+            ""
+        ]);
+
+    def run(self,
+        tape: Tape,
+        state: int,
+        max_steps: int | None) -> tTuple[int, int, bool]:
+
+        """Runs the compiled machine on a tape, from the provided state, until it halts or max_steps steps have been made. Updates the tape and its head and returns (state, steps, halted)."""
+
+        if max_steps == None:
+            max_steps = sys.maxsize;
+
+        # Give codes to any symbols on the tape that the machine doesn't use
+
+        symbols = list(self.symbols);
+        codes = dict(self.symbol_codes);
+
+        def get_code(symbol: str) -> int:
+
+            code = codes.get(symbol);
+
+            if code == None:
+
+                if len(symbols) >= MAX_SYMBOL_CODES:
+                    raise Exception(f"Tapes with more than {MAX_SYMBOL_CODES} symbols can't be run by a compiled machine");
+
+                code = codes[symbol] = len(symbols);
+                symbols.append(symbol);
+
+            return code;
+
+        blank = get_code(tape.get_default_symbol());
+
+        # Load the written part of the tape into a buffer
+
+        start, end = tape.get_bounds();
+        low = min(start, tape.head);
+        high = max(end, tape.head);
+
+        if high - low >= TAPE_MAX_SPAN:
+            raise Exception(f"Can't run a compiled machine on a tape spanning more than {TAPE_MAX_SPAN} cells");
+
+        padding = self.margin + COMPILED_TAPE_PADDING;
+        origin = padding - low; # Buffer index of tape index 0
+
+        cells = bytearray([SENTINEL_CODE]) * ((high - low + 1) + (2 * padding));
+        cells[start + origin : end + origin + 1] = bytes(get_code(symbol) for symbol in tape.read_all());
+
+        # Run
+
+        default_symbol = tape.get_default_symbol();
+
+        state_index = self.state_indexes.get(state, len(self.state_numbers));
+        reads_blank = self._reads_blank.get(default_symbol);
+
+        if reads_blank == None:
+            reads_blank = self._reads_blank[default_symbol] = tuple((n, default_symbol) in self._table_keys for n in self.state_numbers) + (False,);
+
+        head, state_index, steps, halted, shift = self.function(cells, tape.head + origin, state_index, max_steps, blank, reads_blank);
+
+        origin += shift;
+
+        # Write the cells back. Cells still unwritten either side are left out so the tape's written range stays the same as if it had been run by the engine. Any left unwritten between written cells read as blank on the tape anyway
+
+        first = len(cells) - len(cells.lstrip(UNWRITTEN));
+        last = len(cells.rstrip(UNWRITTEN));
+
+        written = cells[first:last].replace(UNWRITTEN, bytes([blank]));
+        tape.write_range(first - origin, [symbols[code] for code in written]);
+
+        tape.head_to(head - origin);
+
+        if state_index < len(self.state_numbers):
+            state = self.state_numbers[state_index];
+
+        return state, steps, halted;
+
+def get_content_hash(machine: Machine) -> str:
+
+    """Gets a hash of what the machine does, which is the same for any machines with the same transition table whatever their layout"""
+
+    h = sha256();
+
+    for (start, read_symbol), t in sorted(machine.transition_table.items(), key = lambda item: (item[0][0], item[0][1])):
+        h.update(repr((start, read_symbol, t.end, t.write_symbol, t.head_move)).encode());
+
+    return h.hexdigest();
+
+# Compiled machines by content hash, least recently used first
+
+_compiled_by_hash = OrderedDict();
+
+# Machine -> (table version, compiled machine) for the last compiled form of each machine
+
+_compiled_by_machine = WeakKeyDictionary();
+
+def get_compiled_machine(machine: Machine) -> CompiledMachine:
+
+    """Gets the compiled form of a machine, only compiling it if neither it nor an identical machine has been compiled since its transition table last changed"""
+
+    entry = _compiled_by_machine.get(machine);
+
+    if (entry != None) and (entry[0] == machine.table_version):
+        return entry[1];
+
+    key = get_content_hash(machine);
+    compiled = _compiled_by_hash.get(key);
+
+    if compiled != None:
+        _compiled_by_hash.move_to_end(key);
+
+    else:
+
+        compiled = _compiled_by_hash[key] = CompiledMachine(machine);
+
+        if len(_compiled_by_hash) > COMPILE_CACHE_MAX_SIZE:
+            _compiled_by_hash.popitem(last = False);
+
+    _compiled_by_machine[machine] = (machine.table_version, compiled);
+
+    return compiled;
@@ -1,7 +1,7 @@
 from typing import Callable as tCallable;
 from typing import Tuple as tTuple;
 from typing import List as tList;
-from pygame import Surface, Vector2;
+from pygame import Surface, Vector2, Rect;
 import pygame;
 
 from control_button_sprite import ControlButtonSprite;
@@ -43,6 +43,19 @@ STOP_ICON_POINTS = [
     (0, 1)
 ];
 
+STEP_BACK_ICON_POINTS_0 = [
+    (0, 0),
+    (0.2, 0),
+    (0.2, 1),
+    (0, 1)
+];
+
+STEP_BACK_ICON_POINTS_1 = [
+    (1, 0),
+    (0.3, 0.5),
+    (1, 1)
+];
+
 class ControlsWindow(Surface):
 
     def __init__(self,
@@ -62,6 +75,21 @@ class ControlsWindow(Surface):
 
         button_separation_displacement = Vector2(1, 0) * (BUTTON_WIDTH + BUTTON_SEPARATION);
 
+        # Step back button
+
+        self.step_back_button = ControlButtonSprite(
+            center_pos = center - (2 * button_separation_displacement),
+            width = BUTTON_WIDTH,
+            draw_icon_call = ControlsWindow.draw_step_back_icon,
+            icon_padding = BUTTON_ICON_PADDING,
+            button_bg_color = BUTTON_BG_COLOR,
+            shaded_button_bg_color = SHADED_BUTTON_BG_COLOR,
+            icon_color = BUTTON_ICON_COLOR,
+            main_bg_color = self.bg_color
+        );
+
+        self.button_sprites.add(self.step_back_button);
+
         # Pause button
 
         self.pause_button = ControlButtonSprite(
@@ -125,6 +153,19 @@ class ControlsWindow(Surface):
 
         self.button_sprites.draw(self);
 
+        # Whole window has changed
+
+        self.dirty_rects = [self.get_rect()];
+
+    def pop_dirty_rects(self) -> tList[Rect]:
+
+        """Gets the areas of the window that have changed since this was last called"""
+
+        rects = self.dirty_rects;
+        self.dirty_rects = [];
+
+        return rects;
+
     def pos_in_play_button(self,
         pos: Vector2) -> bool:
         return self.play_button.rect.collidepoint(pos);
@@ -137,6 +178,10 @@ class ControlsWindow(Surface):
         pos: Vector2) -> bool:
         return self.stop_button.rect.collidepoint(pos);
 
+    def pos_in_step_back_button(self,
+        pos: Vector2) -> bool:
+        return self.step_back_button.rect.collidepoint(pos);
+
     @staticmethod
     def process_shape_points(orig: tList[Vector2],
         width: int,
@@ -215,6 +260,36 @@ class ControlsWindow(Surface):
             points = points
         );
 
+    @staticmethod
+    def draw_step_back_icon(surface: Surface,
+        color: tTuple[int, int, int],
+        center: Vector2,
+        width: int) -> None:
+
+        points0 = ControlsWindow.process_shape_points(
+            orig = STEP_BACK_ICON_POINTS_0,
+            width = width,
+            center = center
+        );
+
+        pygame.draw.polygon(
+            surface = surface,
+            color = color,
+            points = points0
+        );
+
+        points1 = ControlsWindow.process_shape_points(
+            orig = STEP_BACK_ICON_POINTS_1,
+            width = width,
+            center = center
+        );
+
+        pygame.draw.polygon(
+            surface = surface,
+            color = color,
+            points = points1
+        );
+
     def set_play_button_shaded_state(self,
         state: bool) -> None:
         self.play_button.set_shaded_state(state);
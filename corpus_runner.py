@@ -0,0 +1,273 @@
+from typing import List as tList;
+from typing import Dict as tDict;
+from argparse import ArgumentParser;
+from multiprocessing import Pool;
+from hashlib import sha256;
+import csv;
+import json;
+import os;
+
+from machine import Machine;
+from machine_serializer import MachineSerializer;
+from tape import Tape;
+from rle_tape import RleTape;
+from tape_files import try_read_tape;
+from engine import run_machine, RunResult;
+from macro_engine import run_macro_machine;
+
+# Runs a single machine against a corpus of tape files, spreading the runs across a pool of processes. Results are written as each run finishes.
+# Usage: python corpus_runner.py <machine file> <tape files or directories...> -o <output file>
+
+RESULT_FIELDS = ["tape", "error", "halted", "state", "steps", "head", "tape_start", "tape_digest", "cycle_start", "cycle_period", "never_halts"];
+
+OUTPUT_FORMAT_JSONL = "jsonl";
+OUTPUT_FORMAT_CSV = "csv";
+
+JOBS_CHUNK_SIZE = 16; # Number of tape files sent to a worker at a time
+CORPUS_DEFAULT_MAX_STEPS = 1000000; # So that a tape the machine never halts on can't keep a worker busy forever
+LOCKSTEP_BATCH_SIZE = 1024; # Number of tape files run together by a worker in lockstep mode
+
+# Worker process state. Set once per worker by _init_worker so that the machine is only sent to each worker once
+
+_worker_machine: Machine | None = None;
+_worker_max_steps: int | None = None;
+_worker_detect_cycles: bool = False;
+_worker_macro_block_size: int | None = None;
+_worker_tape_class: type = Tape;
+_worker_compiled: bool = False;
+
+def _init_worker(machine_bytes: bytes,
+    max_steps: int | None,
+    detect_cycles: bool,
+    macro_block_size: int | None = None,
+    rle_tape: bool = False,
+    compiled: bool = False) -> None:
+
+    global _worker_machine, _worker_max_steps, _worker_detect_cycles, _worker_macro_block_size, _worker_tape_class, _worker_compiled;
+
+    _worker_machine = MachineSerializer.deserialize(machine_bytes);
+    _worker_max_steps = max_steps;
+    _worker_detect_cycles = detect_cycles;
+    _worker_macro_block_size = macro_block_size;
+    _worker_tape_class = RleTape if rle_tape else Tape;
+    _worker_compiled = compiled;
+
+def tape_digest(result: RunResult) -> str:
+
+    """Gets a digest of the tape a run finished with, for comparing outputs without storing them"""
+
+    h = sha256();
+
+    h.update(str(result.tape_start).encode());
+
+    for symbol in result.tape_cells:
+        h.update(b",");
+        h.update(symbol.encode());
+
+    return h.hexdigest();
+
+def _read_tape_file(path: str,
+    record: tDict[str, object]) -> Tape | None:
+
+    """Reads the tape from the provided file, recording the error in record if it can't be read"""
+
+    try:
+        with open(path, "r") as f:
+            tape = try_read_tape(f, _worker_tape_class);
+    except (OSError, ValueError) as e: # ValueError includes UnicodeDecodeError, for files that aren't text
+        record["error"] = str(e);
+        return None;
+
+    if tape == None:
+        record["error"] = "Failed to read tape from file";
+
+    return tape;
+
+def _new_record(path: str) -> tDict[str, object]:
+
+    record = {field: None for field in RESULT_FIELDS};
+    record["tape"] = path;
+
+    return record;
+
+def _add_result_to_record(record: tDict[str, object],
+    result: RunResult) -> None:
+
+    record["halted"] = result.halted;
+    record["state"] = result.state;
+    record["steps"] = result.steps;
+    record["head"] = result.head;
+    record["tape_start"] = result.tape_start;
+    record["tape_digest"] = tape_digest(result);
+    record["cycle_start"] = result.cycle_start;
+    record["cycle_period"] = result.cycle_period;
+    record["never_halts"] = result.never_halts;
+
+def run_tape_file(path: str) -> tDict[str, object]:
+
+    """Runs the worker's machine on the tape in the provided file and returns the result as a record"""
+
+    record = _new_record(path);
+    tape = _read_tape_file(path, record);
+
+    if tape != None:
+
+        if _worker_macro_block_size != None:
+            result = run_macro_machine(_worker_machine, tape, max_steps = _worker_max_steps, block_size = _worker_macro_block_size);
+        else:
+            result = run_machine(_worker_machine, tape, max_steps = _worker_max_steps, detect_cycles = _worker_detect_cycles, compiled = _worker_compiled);
+        _add_result_to_record(record, result);
+
+    return record;
+
+def run_tape_files_lockstep(paths: tList[str]) -> tList[tDict[str, object]]:
+
+    """Runs the worker's machine on the tapes in all the provided files at once using the lockstep simulator and returns the results as records"""
+
+    # Imported here as NumPy is only needed in lockstep mode
+
+    from lockstep import run_machine_lockstep;
+
+    records = [];
+    tapes = [];
+    tape_records = [];
+
+    for path in paths:
+
+        record = _new_record(path);
+        tape = _read_tape_file(path, record);
+
+        if tape != None:
+            tapes.append(tape);
+            tape_records.append(record);
+
+        records.append(record);
+
+    results = run_machine_lockstep(_worker_machine, tapes, max_steps = _worker_max_steps);
+
+    for record, result in zip(tape_records, results):
+        _add_result_to_record(record, result);
+
+    return records;
+
+def expand_tape_paths(paths: tList[str]) -> tList[str]:
+
+    """Replaces any directories in the provided paths with the files in them"""
+
+    out = [];
+
+    for path in paths:
+
+        if os.path.isdir(path):
+            out.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if os.path.isfile(os.path.join(path, name))));
+
+        else:
+            out.append(path);
+
+    return out;
+
+def run_corpus(machine_bytes: bytes,
+    tape_paths: tList[str],
+    output_file,
+    output_format: str,
+    max_steps: int | None = None,
+    detect_cycles: bool = False,
+    processes: int | None = None,
+    lockstep: bool = False,
+    macro_block_size: int | None = None,
+    rle_tape: bool = False,
+    compiled: bool = False) -> int:
+
+    """Runs the machine on every tape file, writing each result to output_file as soon as it is available. Returns the number of runs.
+    In lockstep mode each worker runs batches of tapes together with the lockstep simulator. If macro_block_size is given, each tape is run as a macro machine with blocks of that many cells. Cycles aren't detected in either mode.
+    If rle_tape is set, tapes are stored as runs of symbols, which uses far less memory for machines that write long stretches of the same symbol. If compiled is set, the machine is compiled to a Python function, which is much faster unless cycles are being detected."""
+
+    if output_format == OUTPUT_FORMAT_CSV:
+        writer = csv.DictWriter(output_file, fieldnames = RESULT_FIELDS);
+        writer.writeheader();
+        write_record = writer.writerow;
+
+    else:
+        write_record = lambda record: output_file.write(json.dumps(record) + "\n");
+
+    count = 0;
+
+    with Pool(processes = processes, initializer = _init_worker, initargs = (machine_bytes, max_steps, detect_cycles, macro_block_size, rle_tape, compiled)) as pool:
+
+        if lockstep:
+
+            # Use smaller batches if needed so that every worker gets some
+
+            workers = processes if processes != None else os.cpu_count();
+            batch_size = max(1, min(LOCKSTEP_BATCH_SIZE, -(-len(tape_paths) // workers)));
+
+            batches = [tape_paths[i : i + batch_size] for i in range(0, len(tape_paths), batch_size)];
+            records_lists = pool.imap_unordered(run_tape_files_lockstep, batches);
+
+        else:
+            records_lists = ([record] for record in pool.imap_unordered(run_tape_file, tape_paths, chunksize = JOBS_CHUNK_SIZE));
+
+        for records in records_lists:
+
+            for record in records:
+                write_record(record);
+                count += 1;
+
+            output_file.flush();
+
+    return count;
+
+def main():
+
+    parser = ArgumentParser(description = "Run a machine against a corpus of tape files in parallel.");
+
+    parser.add_argument("machine", help = "Machine file to run");
+    parser.add_argument("tapes", nargs = "+", help = "Tape files, or directories of tape files, to run the machine on");
+    parser.add_argument("-o", "--output", required = True, help = "File to write results to");
+    parser.add_argument("-f", "--format", choices = [OUTPUT_FORMAT_JSONL, OUTPUT_FORMAT_CSV], default = None, help = "Output format. Worked out from the output file's extension if not given");
+    parser.add_argument("-n", "--max-steps", type = int, default = CORPUS_DEFAULT_MAX_STEPS, help = f"Maximum number of steps to run each tape for. Defaults to {CORPUS_DEFAULT_MAX_STEPS}. A negative number removes the limit");
+    parser.add_argument("-c", "--detect-cycles", action = "store_true", help = "Stop runs that are found to be in a cycle");
+    parser.add_argument("-l", "--lockstep", action = "store_true", help = "Run batches of tapes together using NumPy. Can't be used with --detect-cycles");
+    parser.add_argument("-m", "--macro-block-size", type = int, default = None, help = "Run each tape as a macro machine with blocks of this many cells, which is much faster for machines that sweep over long uniform stretches of tape. Can't be used with --detect-cycles or --lockstep");
+    parser.add_argument("-r", "--rle-tape", action = "store_true", help = "Store tapes as runs of symbols, for machines that write long stretches of the same symbol");
+    parser.add_argument("-C", "--compiled", action = "store_true", help = "Run the machine compiled to a Python function. Has no effect with --detect-cycles, --lockstep or --macro-block-size");
+    parser.add_argument("-p", "--processes", type = int, default = os.cpu_count(), help = "Number of worker processes. Defaults to the number of cores");
+
+    args = parser.parse_args();
+
+    if args.lockstep and args.detect_cycles:
+        parser.error("--lockstep can't be used with --detect-cycles");
+
+    if (args.macro_block_size != None) and (args.lockstep or args.detect_cycles):
+        parser.error("--macro-block-size can't be used with --lockstep or --detect-cycles");
+
+    output_format = args.format;
+
+    if output_format == None:
+        output_format = OUTPUT_FORMAT_CSV if args.output.lower().endswith(".csv") else OUTPUT_FORMAT_JSONL;
+
+    with open(args.machine, "rb") as f:
+        machine_bytes = f.read();
+
+    tape_paths = expand_tape_paths(args.tapes);
+
+    with open(args.output, "w", newline = "") as output_file:
+
+        count = run_corpus(
+            machine_bytes = machine_bytes,
+            tape_paths = tape_paths,
+            output_file = output_file,
+            output_format = output_format,
+            max_steps = args.max_steps if args.max_steps >= 0 else None,
+            detect_cycles = args.detect_cycles,
+            processes = args.processes,
+            lockstep = args.lockstep,
+            macro_block_size = args.macro_block_size,
+            rle_tape = args.rle_tape,
+            compiled = args.compiled
+        );
+
+    print(f"Ran {count} tapes.");
+
+if __name__ == "__main__":
+    main();
@@ -0,0 +1,111 @@
+from argparse import ArgumentParser;
+import random;
+
+from machine import Machine, Position;
+from tape import Tape;
+from engine import Engine, run_machine;
+from macro_check import create_random_machine, create_random_tape;
+
+# Differential check of cycle detection against a brute force search. Random small machines are run on random input tapes with cycle detection on, and the cycle found is compared with the first configuration to repeat when every configuration is stored.
+# Usage: python cycle_check.py [-n number of machines] [-s seed]
+
+CHECK_DEFAULT_MACHINES = 1000;
+CHECK_DEFAULT_SEED = 0;
+
+CHECK_MAX_STEPS = 1000; # Runs that haven't repeated a configuration by this many steps aren't compared
+
+def find_cycle_brute_force(m: Machine,
+    tape: Tape,
+    start_state: int) -> tuple | None:
+
+    """Runs the machine step by step, storing every configuration, until one repeats. Returns (cycle start, period), or None if the run halts or doesn't repeat within CHECK_MAX_STEPS steps."""
+
+    engine = Engine(m, tape, start_state);
+    seen = {};
+
+    while engine.steps <= CHECK_MAX_STEPS:
+
+        # The cells not holding the default symbol, found without cycle_detection so that both can't be wrong in the same way
+
+        tape = engine.tape;
+        start, end = tape.get_bounds();
+        default_symbol = tape.get_default_symbol();
+
+        cells = frozenset((i, tape.get(i)) for i in range(start, end + 1) if tape.get(i) != default_symbol);
+        key = (engine.state, tape.head, cells);
+
+        if key in seen:
+            return (seen[key], engine.steps - seen[key]);
+
+        seen[key] = engine.steps;
+
+        if engine.run_steps(1) == 0:
+            return None;
+
+    return None;
+
+def check_machine(m: Machine,
+    tape: Tape,
+    start_state: int,
+    description: str) -> bool:
+
+    """Checks the cycle found by the engine against the brute force search. Returns whether a cycle was compared."""
+
+    expected = find_cycle_brute_force(m, tape.copy(), start_state);
+
+    if expected == None:
+        return False;
+
+    result = run_machine(m, tape.copy(), start_state, max_steps = 100 * CHECK_MAX_STEPS, detect_cycles = True);
+
+    if (result.cycle_start, result.cycle_period) != expected:
+        raise Exception(f"Cycle differs for {description}: found {(result.cycle_start, result.cycle_period)}, expected {expected}");
+
+    return True;
+
+def check_blank_tapes() -> None:
+
+    """Checks a machine that steps right and back over a blank tape. Writing to the right widens the tape's written range, but the configurations stay the same so the cycle starts straight away."""
+
+    m = Machine();
+    m.add_state(Position(0, 0));
+    m.add_state(Position(100, 0));
+    m.try_add_transition(start = 0, end = 1, read_symbol = "0", write_symbol = "0", head_move = 1);
+    m.try_add_transition(start = 1, end = 0, read_symbol = "0", write_symbol = "0", head_move = -1);
+
+    for written_to in [None, 3, -5]:
+
+        tape = Tape("0");
+
+        if written_to != None:
+            tape.set(written_to, "0");
+
+        check_machine(m, tape, 0, f"blank tape written to {written_to}");
+
+def main():
+
+    parser = ArgumentParser(description = "Check cycle detection against a brute force search on random machines and tapes.");
+
+    parser.add_argument("-n", "--machines", type = int, default = CHECK_DEFAULT_MACHINES, help = f"Number of random machines to check. Defaults to {CHECK_DEFAULT_MACHINES}");
+    parser.add_argument("-s", "--seed", type = int, default = CHECK_DEFAULT_SEED, help = "Seed for the random machines and tapes");
+
+    args = parser.parse_args();
+
+    check_blank_tapes();
+
+    rng = random.Random(args.seed);
+    checked = 0;
+
+    for i in range(args.machines):
+
+        m = create_random_machine(rng);
+        tape = create_random_tape(rng);
+        start_state = rng.randrange(len(m.states));
+
+        if check_machine(m, tape, start_state, f"machine {i} of seed {args.seed}"):
+            checked += 1;
+
+    print(f"Checked {checked} cycles against a brute force search.");
+
+if __name__ == "__main__":
+    main();
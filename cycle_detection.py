@@ -0,0 +1,115 @@
+from machine import Machine;
+from tape import Tape;
+
+# Zobrist-style hashing of machine configurations. A configuration's hash is the XOR of a key for the current state, a key for the head position and a key for each cell not holding the default symbol, so each change to the configuration updates the hash in O(1).
+# Keys are derived by hashing the inputs rather than stored in tables as the tape is unbounded. Python's tuple hashing is used as it is fast and mixes well. N.B. string hashes are randomised per process so configuration hashes must not be compared between processes
+
+STATE_SALT = 0x5bd1e995;
+HEAD_SALT = 0x4f6cdd1d;
+CELL_SALT = 0x7f4a7c15;
+
+# N.B. hash(-1) == hash(-2) in CPython so integers are mapped to odd numbers (which can never be -2) before being hashed
+
+def state_key(n: int) -> int:
+    return hash((STATE_SALT, 2 * n + 1));
+
+def head_key(i: int) -> int:
+    return hash((HEAD_SALT, 2 * i + 1));
+
+def cell_key(i: int,
+    symbol: str) -> int:
+
+    """Gets the key for index i holding the provided symbol. N.B. cells holding the default symbol don't contribute to the hash at all."""
+
+    return hash((CELL_SALT, 2 * i + 1, symbol));
+
+def hash_configuration(tape: Tape,
+    state: int) -> int:
+
+    """Calculates the hash of a whole configuration from scratch"""
+
+    default_symbol = tape.get_default_symbol();
+
+    h = state_key(state) ^ head_key(tape.head);
+
+    start, _ = tape.get_bounds();
+
+    for i, symbol in enumerate(tape.read_all(), start):
+
+        if symbol != default_symbol:
+            h ^= cell_key(i, symbol);
+
+    return h;
+
+def _get_written_cells(tape: Tape) -> tuple:
+
+    """Gets the start index and symbols of the tape's cells from the first to the last not holding the default symbol"""
+
+    default_symbol = tape.get_default_symbol();
+    start, _ = tape.get_bounds();
+    cells = tape.read_all();
+
+    first = 0;
+    last = len(cells);
+
+    while (first < last) and (cells[first] == default_symbol):
+        first += 1;
+
+    while (last > first) and (cells[last - 1] == default_symbol):
+        last -= 1;
+
+    # A blank tape has no first cell, so its start mustn't depend on how far the tape was ever written
+
+    if first == last:
+        return (0, []);
+
+    return (start + first, cells[first:last]);
+
+def configurations_match(tape_a: Tape,
+    state_a: int,
+    tape_b: Tape,
+    state_b: int) -> bool:
+
+    """Checks whether two configurations are the same, ignoring how far each tape's written range extends with default symbols"""
+
+    if (state_a != state_b) or (tape_a.head != tape_b.head):
+        return False;
+
+    return _get_written_cells(tape_a) == _get_written_cells(tape_b);
+
+def find_cycle_start(machine: Machine,
+    initial_tape: Tape,
+    start_state: int,
+    period: int,
+    found_step: int) -> int | None:
+
+    """Given that the run from the provided configuration was found, at step found_step, to be in a cycle with the provided period, finds the first step of the cycle. This is done by replaying two copies of the run, one period apart, until their configurations match.
+    The cycle must start by step found_step - period, so if the configurations haven't matched by then, or the run halts, the cycle came from a hash collision and None is returned."""
+
+    # Imported here as the engine imports this module
+
+    from engine import Engine;
+
+    leader = Engine(machine, initial_tape.copy(), start_state);
+    follower = Engine(machine, initial_tape.copy(), start_state);
+
+    leader.enable_configuration_hash();
+    follower.enable_configuration_hash();
+
+    if leader.run_steps(period) < period:
+        return None;
+
+    while follower.steps <= found_step - period:
+
+        # Hashes are compared first as comparing whole configurations is slow
+
+        if ((leader.configuration_hash == follower.configuration_hash)
+            and configurations_match(leader.tape, leader.state, follower.tape, follower.state)):
+            return follower.steps;
+
+        if leader.run_steps(1) == 0:
+            return None;
+
+        follower.run_steps(1);
+
+    return None;
@@ -0,0 +1,741 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from typing import BinaryIO;
+from bisect import bisect_right;
+
+from machine import Machine;
+from tape import Tape;
+from cycle_detection import hash_configuration, find_cycle_start, state_key, head_key, cell_key;
+from profiler import TransitionProfile;
+from compiler import get_compiled_machine;
+from trace_files import TraceWriter, TRACE_DEFAULT_CHECKPOINT_INTERVAL;
+
+# N.B. this module must not import pygame or tkinter so that machines can be run headless
+
+COMPILED_MIN_STEPS = 1000; # Steps run by the plain loop at the start of each compiled run_steps call, so short runs don't pay for loading the tape into a buffer and back
+
+class RunResult:
+
+    """The outcome of running a machine on a tape"""
+
+    def __init__(self,
+        halted: bool,
+        state: int,
+        steps: int,
+        head: int,
+        tape_start: int,
+        tape_cells: tList[str],
+        cycle_start: int | None = None,
+        cycle_period: int | None = None,
+        never_halts: bool = False):
+
+        self.halted = halted;
+        self.state = state;
+        self.steps = steps;
+        self.head = head;
+        self.tape_start = tape_start; # Index of the first cell in tape_cells
+        self.tape_cells = tape_cells;
+
+        # Set if the run was found to never halt by entering a cycle
+
+        self.cycle_start = cycle_start;
+        self.cycle_period = cycle_period;
+
+        self.never_halts = never_halts or (cycle_period != None); # Whether the run was found to never halt, which the macro engine can find without a cycle
+
+    def to_string(self):
+
+        status = "Halted" if self.halted else "Stopped";
+
+        s = f"{status} in state {self.state} after {self.steps} steps with head at {self.head}";
+
+        if self.cycle_period != None:
+            s += f" (enters a cycle at step {self.cycle_start} with period {self.cycle_period})";
+
+        elif self.never_halts:
+            s += " (never halts)";
+
+        return s;
+
+class RunSnapshot:
+
+    """A lightweight copy of where a run is, including only the cells of the tape around the head. Used to show a run that is happening on another thread."""
+
+    def __init__(self,
+        state: int,
+        steps: int,
+        head: int,
+        halted: bool,
+        tape_start: int,
+        tape_cells: tList[str],
+        default_symbol: str,
+        cycle_start: int | None = None,
+        cycle_period: int | None = None):
+
+        self.state = state;
+        self.steps = steps;
+        self.head = head;
+        self.halted = halted;
+        self.tape_start = tape_start; # Index of the first cell in tape_cells
+        self.tape_cells = tape_cells;
+        self.default_symbol = default_symbol;
+
+        self.cycle_start = cycle_start;
+        self.cycle_period = cycle_period;
+
+    def get(self,
+        i: int) -> str:
+
+        """Gets the symbol in a cell of the tape, as a Tape would. Cells outside of those copied are taken to hold the default symbol."""
+
+        j = i - self.tape_start;
+
+        if 0 <= j < len(self.tape_cells):
+            return self.tape_cells[j];
+
+        else:
+            return self.default_symbol;
+
+class Checkpoint:
+
+    """A copy of the machine's configuration at a step that a run can be restored to"""
+
+    def __init__(self,
+        step: int,
+        state: int,
+        head: int,
+        tape_snapshot: tuple):
+
+        self.step = step;
+        self.state = state;
+        self.head = head;
+        self.tape_snapshot = tape_snapshot;
+
+class Engine:
+
+    """Runs a machine on a tape. Used both by the GUI, which steps it, and for headless batch runs."""
+
+    def __init__(self,
+        machine: Machine,
+        tape: Tape,
+        start_state: int = 0,
+        detect_cycles: bool = False,
+        checkpoint_interval: int | None = None,
+        max_checkpoints: int | None = None,
+        profile: bool = False,
+        compiled: bool = False):
+
+        self.machine = machine;
+        self.tape = tape;
+
+        self.state = start_state;
+        self.steps = 0;
+        self.halted = False;
+
+        # Cycle detection
+
+        self.configuration_hash = None; # Hash of the current configuration, if being tracked
+
+        self.detect_cycles = detect_cycles;
+        self.cycle_start = None;
+        self.cycle_period = None;
+
+        if self.detect_cycles:
+
+            self._initial_tape = tape.copy();
+            self._initial_state = start_state;
+
+            self.enable_configuration_hash();
+
+            # Brent's algorithm state. The tortoise is the configuration hash at a step that the current configuration is compared to
+
+            self._reset_brent();
+
+        # Checkpoints, recorded every checkpoint_interval steps so that the run can be moved back to earlier steps. If there would be more than max_checkpoints, every other checkpoint is dropped and the interval is doubled
+
+        self.checkpoint_interval = checkpoint_interval;
+        self.max_checkpoints = max_checkpoints;
+
+        self.checkpoints = [];
+        self._checkpoint_steps = [];
+
+        if self.checkpoint_interval != None:
+            self._record_checkpoint();
+
+        # Whether to run the machine compiled to a Python function when not hashing configurations or profiling. Much faster for long runs. Each call to run_steps loads the tape into a buffer and back, so the first COMPILED_MIN_STEPS steps of each call are run by the plain loop
+
+        self.compiled = compiled;
+
+        # Profiling, counting how many times each transition is made. Off by default as it slows the run down a little
+
+        self.profile = None;
+
+        if profile:
+            self.enable_profiling();
+
+        # Tracing, streaming every step to a file. Off unless enable_tracing is called
+
+        self.trace = None;
+
+    def _reset_brent(self) -> None:
+
+        # Brent's algorithm state. The tortoise is the configuration hash at a step that the current configuration is compared to
+
+        self._brent_tortoise = self.configuration_hash;
+        self._brent_power = 1;
+        self._brent_lam = 0;
+
+    def enable_configuration_hash(self) -> None:
+
+        """Starts keeping configuration_hash up to date as the engine runs"""
+
+        self.configuration_hash = hash_configuration(self.tape, self.state);
+
+    def enable_profiling(self) -> None:
+
+        """Starts counting how many times each transition is made. N.B. steps replayed when seeking are counted again."""
+
+        if self.profile == None:
+            self.profile = TransitionProfile(self.machine);
+
+    def disable_profiling(self) -> None:
+        self.profile = None;
+
+    def enable_tracing(self,
+        file: BinaryIO,
+        checkpoint_interval: int = TRACE_DEFAULT_CHECKPOINT_INTERVAL) -> None:
+
+        """Starts streaming a trace of every step from the current one to a binary file opened for writing. Steps replayed when seeking back aren't written again. Can't be used while hashing configurations, as when detecting cycles."""
+
+        if self.configuration_hash != None:
+            raise Exception("Can't trace a run while hashing configurations");
+
+        if self.trace != None:
+            raise Exception("Run is already being traced");
+
+        self.trace = TraceWriter(file, self.machine, self.tape, self.state, self.steps, checkpoint_interval);
+
+    def disable_tracing(self) -> None:
+
+        """Stops tracing, finishing the trace file. The file is left open."""
+
+        if self.trace != None:
+            self.trace.close();
+            self.trace = None;
+
+    def step(self) -> bool:
+
+        """Performs a single transition. Returns False (and marks the engine as halted) if no transition applies."""
+
+        return self.run_steps(1) == 1;
+
+    def run_steps(self,
+        max_steps: int | None = None) -> int:
+
+        """Performs transitions until the machine halts, max_steps transitions have been made or a cycle is found (if detecting cycles). Returns the number of transitions made."""
+
+        if self.halted:
+            return 0;
+
+        if self.checkpoint_interval == None:
+            return self._run_steps_unchecked(max_steps);
+
+        # Run in chunks that end on checkpoint steps
+
+        cycle_already_found = self.cycle_period != None;
+        total = 0;
+
+        while (max_steps == None) or (total < max_steps):
+
+            chunk = self.checkpoint_interval - (self.steps % self.checkpoint_interval);
+
+            if max_steps != None:
+                chunk = min(chunk, max_steps - total);
+
+            done = self._run_steps_unchecked(chunk);
+            total += done;
+
+            if ((self.steps % self.checkpoint_interval) == 0) and (self.steps > self._checkpoint_steps[-1]):
+                self._record_checkpoint();
+
+            if (done < chunk) or (self.cycle_period != None and not cycle_already_found):
+                break;
+
+        return total;
+
+    def _run_steps_unchecked(self,
+        max_steps: int | None) -> int:
+
+        """Runs steps without recording checkpoints"""
+
+        if self.trace == None:
+            return self._run_steps_untraced(max_steps);
+
+        # Replay any steps that are already in the trace, which happens after seeking back, then trace the rest
+
+        total = 0;
+        behind = self.trace.end_step - self.steps;
+
+        if behind > 0:
+
+            total = self._run_steps_untraced(behind if max_steps == None else min(behind, max_steps));
+
+            if self.halted or (total == max_steps):
+                return total;
+
+        return total + self._run_steps_traced(None if max_steps == None else max_steps - total);
+
+    def _run_steps_untraced(self,
+        max_steps: int | None) -> int:
+
+        if self.configuration_hash != None:
+            return self._run_steps_hashed(max_steps);
+
+        if self.profile != None:
+            return self._run_steps_profiled(max_steps);
+
+        if self.compiled:
+            return self._run_steps_compiled(max_steps);
+
+        return self._run_steps_plain(max_steps);
+
+    def _run_steps_compiled(self,
+        max_steps: int | None) -> int:
+
+        # Run short runs and the start of long ones plain, which is quicker than loading the tape for the compiled machine
+
+        total = self._run_steps_plain(COMPILED_MIN_STEPS if max_steps == None else min(COMPILED_MIN_STEPS, max_steps));
+
+        if self.halted or (total == max_steps):
+            return total;
+
+        compiled_machine = get_compiled_machine(self.machine);
+
+        self.state, steps, halted = compiled_machine.run(self.tape, self.state, None if max_steps == None else max_steps - total);
+
+        self.steps += steps;
+        self.halted = halted;
+
+        return total + steps;
+
+    def _run_steps_plain(self,
+        max_steps: int | None) -> int:
+
+        # Pull everything used in the loop into locals to avoid attribute lookups on each step
+
+        table_get = self.machine.transition_table.get;
+        tape_get = self.tape.get;
+        tape_set = self.tape.set;
+
+        state = self.state;
+        head = self.tape.head;
+
+        steps = 0;
+        halted = False;
+
+        while (max_steps is None) or (steps < max_steps):
+
+            t = table_get((state, tape_get(head)));
+
+            if t is None:
+                halted = True;
+                break;
+
+            tape_set(head, t.write_symbol);
+            head += t.head_move;
+            state = t.end;
+
+            steps += 1;
+
+        # Write state back
+
+        self.state = state;
+        self.tape.head_to(head);
+        self.steps += steps;
+        self.halted = halted;
+
+        return steps;
+
+    def _run_steps_profiled(self,
+        max_steps: int | None) -> int:
+
+        """The same as run_steps but also counting the transitions made"""
+
+        # The profile's compiled table gives each transition as a tuple including its ID, which is cheaper to unpack than looking up the transition's attributes
+
+        compiled_get = self.profile.compiled.get;
+        counts = self.profile.counts;
+        tape_get = self.tape.get;
+        tape_set = self.tape.set;
+
+        state = self.state;
+        head = self.tape.head;
+
+        steps = 0;
+        halted = False;
+
+        while (max_steps is None) or (steps < max_steps):
+
+            entry = compiled_get((state, tape_get(head)));
+
+            if entry is None:
+                halted = True;
+                break;
+
+            write_symbol, head_move, state, transition_id = entry;
+
+            tape_set(head, write_symbol);
+            head += head_move;
+            counts[transition_id] += 1;
+
+            steps += 1;
+
+        # Write state back
+
+        self.state = state;
+        self.tape.head_to(head);
+        self.steps += steps;
+        self.halted = halted;
+
+        # The state the machine halts in is visited without a step being made from it
+
+        if halted and (self.profile != None):
+            self.profile.add_halt(state);
+
+        return steps;
+
+    def _run_steps_traced(self,
+        max_steps: int | None) -> int:
+
+        """The same as run_steps but also writing each step to the trace and, if profiling, counting the transitions made"""
+
+        trace = self.trace;
+
+        # The trace's table gives each transition as a tuple including its ID and how a step made with it is encoded
+
+        entries_get = trace.entries.get;
+        buffer = trace.buffer;
+        tape = self.tape;
+        tape_get = tape.get;
+        tape_set = tape.set;
+
+        counts = self.profile.counts if self.profile != None else None;
+
+        state = self.state;
+        head = tape.head;
+        until_checkpoint = trace.steps_until_checkpoint;
+
+        steps = 0;
+        halted = False;
+
+        while (max_steps is None) or (steps < max_steps):
+
+            entry = entries_get((state, tape_get(head)));
+
+            if entry is None:
+                halted = True;
+                break;
+
+            write_symbol, head_move, state, transition_id, record = entry;
+
+            tape_set(head, write_symbol);
+            head += head_move;
+            buffer += record;
+
+            if counts is not None:
+                counts[transition_id] += 1;
+
+            steps += 1;
+            until_checkpoint -= 1;
+
+            if until_checkpoint == 0:
+
+                tape.head_to(head);
+                trace.write_checkpoint(self.steps + steps, state);
+
+                until_checkpoint = trace.checkpoint_interval;
+
+        # Write state back
+
+        self.state = state;
+        tape.head_to(head);
+        self.steps += steps;
+        self.halted = halted;
+
+        # The state the machine halts in is visited without a step being made from it
+
+        if halted and (self.profile != None):
+            self.profile.add_halt(state);
+
+        trace.steps_until_checkpoint = until_checkpoint;
+        trace.end_step = self.steps;
+        trace.halted = halted;
+
+        return steps;
+
+    def _run_steps_hashed(self,
+        max_steps: int | None) -> int:
+
+        """The same as run_steps but also updating the configuration hash and, if enabled, checking for cycles and counting the transitions made"""
+
+        total = 0;
+
+        while True:
+
+            steps, period = self._run_hashed_loop(None if max_steps == None else max_steps - total);
+            total += steps;
+
+            if period == None:
+                return total;
+
+            cycle_start = find_cycle_start(self.machine, self._initial_tape, self._initial_state, period, self.steps);
+
+            if cycle_start != None:
+                self.cycle_start = cycle_start;
+                self.cycle_period = period;
+                return total;
+
+            # The configuration hash collided with an earlier one that wasn't the same configuration, so there isn't a cycle. Carry on looking for one from here
+
+            self._reset_brent();
+
+            if (max_steps != None) and (total >= max_steps):
+                return total;
+
+    def _run_hashed_loop(self,
+        max_steps: int | None) -> tTuple[int, int | None]:
+
+        """Runs the steps for _run_steps_hashed, stopping if the hash matches the one Brent's algorithm is comparing against. Returns the number of steps made and the period of the cycle if the hash matched."""
+
+        table_get = self.machine.transition_table.get;
+        tape_get = self.tape.get;
+        tape_set = self.tape.set;
+        default_symbol = self.tape.get_default_symbol();
+
+        state_keys = {};
+
+        if self.profile != None:
+            counts = self.profile.counts;
+            transition_ids = self.profile.ids;
+        else:
+            counts = None;
+
+        state = self.state;
+        head = self.tape.head;
+        h = self.configuration_hash;
+
+        detect_cycles = self.detect_cycles and (self.cycle_period == None); # Stop checking once a cycle has been found
+
+        if detect_cycles:
+            tortoise = self._brent_tortoise;
+            power = self._brent_power;
+            lam = self._brent_lam;
+
+        steps = 0;
+        halted = False;
+        period = None;
+
+        while (max_steps is None) or (steps < max_steps):
+
+            read_symbol = tape_get(head);
+            t = table_get((state, read_symbol));
+
+            if t is None:
+                halted = True;
+                break;
+
+            # Update hash for the written cell
+
+            write_symbol = t.write_symbol;
+
+            if write_symbol != read_symbol:
+
+                if read_symbol != default_symbol:
+                    h ^= cell_key(head, read_symbol);
+
+                if write_symbol != default_symbol:
+                    h ^= cell_key(head, write_symbol);
+
+            tape_set(head, write_symbol);
+
+            if counts is not None:
+                counts[transition_ids[t]] += 1;
+
+            # Update hash for the head and state
+
+            if t.head_move != 0:
+                h ^= head_key(head);
+                head += t.head_move;
+                h ^= head_key(head);
+
+            if t.end != state:
+
+                for n in (state, t.end):
+
+                    key = state_keys.get(n);
+
+                    if key is None:
+                        key = state_keys[n] = state_key(n);
+
+                    h ^= key;
+
+                state = t.end;
+
+            steps += 1;
+
+            # Brent's cycle finding
+
+            if detect_cycles:
+
+                lam += 1;
+
+                if h == tortoise:
+                    period = lam;
+                    break;
+
+                if lam == power:
+                    tortoise = h;
+                    power *= 2;
+                    lam = 0;
+
+        # Write state back
+
+        self.state = state;
+        self.tape.head_to(head);
+        self.steps += steps;
+        self.halted = halted;
+
+        # The state the machine halts in is visited without a step being made from it
+
+        if halted and (counts is not None):
+            self.profile.add_halt(state);
+        self.configuration_hash = h;
+
+        if detect_cycles:
+
+            self._brent_tortoise = tortoise;
+            self._brent_power = power;
+            self._brent_lam = lam;
+
+        return steps, period;
+
+    # Checkpoints
+
+    def _record_checkpoint(self) -> None:
+
+        self.checkpoints.append(Checkpoint(self.steps, self.state, self.tape.head, self.tape.get_snapshot()));
+        self._checkpoint_steps.append(self.steps);
+
+        if (self.max_checkpoints != None) and (len(self.checkpoints) > self.max_checkpoints):
+
+            # Thin out checkpoints to stay within the limit
+
+            self.checkpoint_interval *= 2;
+
+            self.checkpoints = [c for c in self.checkpoints if (c.step % self.checkpoint_interval) == 0];
+            self._checkpoint_steps = [c.step for c in self.checkpoints];
+
+    def _restore_checkpoint(self,
+        checkpoint: Checkpoint) -> None:
+
+        self.state = checkpoint.state;
+        self.steps = checkpoint.step;
+        self.halted = False;
+
+        self.tape.load_snapshot(checkpoint.tape_snapshot);
+        self.tape.head_to(checkpoint.head);
+
+        if self.configuration_hash != None:
+
+            self.enable_configuration_hash();
+
+            if self.detect_cycles:
+                self._reset_brent();
+
+    def seek(self,
+        step: int) -> None:
+
+        """Moves the run to the provided step, restoring the nearest checkpoint before it if the step is behind the current one and replaying from there. Stops early if the machine halts before the step."""
+
+        if self.checkpoint_interval == None:
+            raise Exception("Can't seek when checkpoints aren't being recorded");
+
+        step = max(step, 0);
+
+        checkpoint = self.checkpoints[bisect_right(self._checkpoint_steps, step) - 1];
+
+        # Only restore the checkpoint if it is closer to the step than the current position is
+
+        if not (checkpoint.step <= self.steps <= step):
+            self._restore_checkpoint(checkpoint);
+
+        # N.B. running stops when a cycle is found so may need continuing
+
+        while (self.steps < step) and (self.run_steps(step - self.steps) > 0):
+            pass;
+
+    def step_back(self) -> None:
+
+        """Moves the run back by a single step"""
+
+        if self.steps > 0:
+            self.seek(self.steps - 1);
+
+    def run(self,
+        max_steps: int | None = None) -> RunResult:
+
+        """Runs the machine until it halts or until max_steps transitions have been made in total and returns the result"""
+
+        if max_steps == None:
+            self.run_steps(None);
+        else:
+            self.run_steps(max(max_steps - self.steps, 0));
+
+        return self.get_result();
+
+    def get_result(self) -> RunResult:
+
+        tape_start, _ = self.tape.get_bounds();
+
+        return RunResult(
+            halted = self.halted,
+            state = self.state,
+            steps = self.steps,
+            head = self.tape.head,
+            tape_start = tape_start,
+            tape_cells = self.tape.read_all(),
+            cycle_start = self.cycle_start,
+            cycle_period = self.cycle_period
+        );
+
+    def get_snapshot(self,
+        cells_each_side: int) -> RunSnapshot:
+
+        """Gets a snapshot of the run with cells_each_side cells of the tape either side of the head"""
+
+        tape = self.tape;
+        head = tape.head;
+        tape_start = head - cells_each_side;
+
+        return RunSnapshot(
+            state = self.state,
+            steps = self.steps,
+            head = head,
+            halted = self.halted,
+            tape_start = tape_start,
+            tape_cells = [tape.get(i) for i in range(tape_start, head + cells_each_side + 1)],
+            default_symbol = tape.get_default_symbol(),
+            cycle_start = self.cycle_start,
+            cycle_period = self.cycle_period
+        );
+
+def run_machine(machine: Machine,
+    tape: Tape,
+    start_state: int = 0,
+    max_steps: int | None = None,
+    detect_cycles: bool = False,
+    compiled: bool = False) -> RunResult:
+
+    """Runs a machine on a tape, without any rendering, until it halts, until max_steps transitions have been made or, if detect_cycles is set, until it is found to be in a cycle"""
+
+    return Engine(machine, tape, start_state, detect_cycles, compiled = compiled).run(max_steps);
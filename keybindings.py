@@ -3,6 +3,30 @@ import pygame;
 class Keybinding:
 
     def __init__(self,
-        delete_bind: int = pygame.K_d):
+        delete_bind: int = pygame.K_d,
+        seek_bind: int = pygame.K_g,
+        turbo_bind: int = pygame.K_t,
+        profile_bind: int = pygame.K_p,
+        export_profile_bind: int = pygame.K_e,
+        speed_up_bind: int = pygame.K_RIGHTBRACKET,
+        slow_down_bind: int = pygame.K_LEFTBRACKET,
+        pan_left_bind: int = pygame.K_LEFT,
+        pan_right_bind: int = pygame.K_RIGHT,
+        pan_up_bind: int = pygame.K_UP,
+        pan_down_bind: int = pygame.K_DOWN,
+        zoom_in_bind: int = pygame.K_EQUALS,
+        zoom_out_bind: int = pygame.K_MINUS):
 
-        self.delete_bind = delete_bind;
\ No newline at end of file
+        self.delete_bind = delete_bind;
+        self.seek_bind = seek_bind;
+        self.turbo_bind = turbo_bind;
+        self.profile_bind = profile_bind;
+        self.export_profile_bind = export_profile_bind;
+        self.speed_up_bind = speed_up_bind;
+        self.slow_down_bind = slow_down_bind;
+        self.pan_left_bind = pan_left_bind;
+        self.pan_right_bind = pan_right_bind;
+        self.pan_up_bind = pan_up_bind;
+        self.pan_down_bind = pan_down_bind;
+        self.zoom_in_bind = zoom_in_bind;
+        self.zoom_out_bind = zoom_out_bind;
\ No newline at end of file
@@ -0,0 +1,253 @@
+from typing import List as tList;
+import numpy as np;
+
+from machine import Machine;
+from tape import Tape;
+from engine import RunResult;
+
+# Runs many tapes through the same machine at once. All live runs are advanced one step at a time using NumPy array operations, so the per-step Python overhead is shared between every run instead of being paid by each of them.
+# N.B. this module needs NumPy, which the rest of the program doesn't
+
+TAPE_MARGIN = 64; # Number of blank cells added either side of the tapes when loading them
+
+class LockstepSimulator:
+
+    def __init__(self,
+        machine: Machine,
+        start_state: int = 0):
+
+        self.machine = machine;
+        self.start_state = start_state;
+
+    def _compile(self,
+        symbols: tList[str]) -> None:
+
+        """Builds dense transition tables indexed by [state index, symbol code]. Symbols are given codes by their index in the symbols list, which is extended with any symbols used by the machine."""
+
+        # Give every state and symbol a dense index
+
+        self.state_numbers = sorted({s.n for s in self.machine.states} | {t.end for t in self.machine.transitions} | {self.start_state});
+        state_indexes = {n: i for i, n in enumerate(self.state_numbers)};
+
+        for t in self.machine.transitions:
+
+            for symbol in (t.read_symbol, t.write_symbol):
+
+                if symbol not in symbols:
+                    symbols.append(symbol);
+
+        self.symbols = symbols;
+        symbol_codes = {symbol: i for i, symbol in enumerate(symbols)};
+
+        # Build tables
+
+        shape = (len(self.state_numbers), len(symbols));
+
+        self.defined_table = np.zeros(shape, dtype = bool);
+        self.next_state_table = np.zeros(shape, dtype = np.int32);
+        self.write_table = np.zeros(shape, dtype = np.min_scalar_type(len(symbols)));
+        self.move_table = np.zeros(shape, dtype = np.int64);
+
+        for (start, read_symbol), t in self.machine.transition_table.items():
+
+            if start not in state_indexes:
+                continue;
+
+            i = state_indexes[start];
+            j = symbol_codes[read_symbol];
+
+            self.defined_table[i, j] = True;
+            self.next_state_table[i, j] = state_indexes[t.end];
+            self.write_table[i, j] = symbol_codes[t.write_symbol];
+            self.move_table[i, j] = t.head_move;
+
+        self.start_state_index = state_indexes[self.start_state];
+
+    def run(self,
+        tapes: tList[Tape],
+        max_steps: int | None = None) -> tList[RunResult]:
+
+        """Runs the machine on each of the tapes until every run has halted or max_steps steps have been made. The tapes themselves aren't changed."""
+
+        if len(tapes) == 0:
+            return [];
+
+        default_symbol = tapes[0].get_default_symbol();
+
+        if any(t.get_default_symbol() != default_symbol for t in tapes):
+            raise Exception("All tapes must have the same default symbol");
+
+        # Read tapes, giving every symbol a code. The default symbol has code 0 so that new cells are blank
+
+        symbols = [default_symbol];
+        symbol_codes = {default_symbol: 0};
+
+        tapes_contents = [];
+
+        for t in tapes:
+
+            start, _ = t.get_bounds();
+            cells = t.read_all();
+
+            for symbol in cells:
+
+                if symbol not in symbol_codes:
+                    symbol_codes[symbol] = len(symbols);
+                    symbols.append(symbol);
+
+            tapes_contents.append((start, [symbol_codes[symbol] for symbol in cells]));
+
+        self._compile(symbols);
+
+        # Lay tapes out as the rows of one array, with tape index 0 in column `origin` for every row
+
+        n = len(tapes);
+
+        lowest = min(min(start, t.head) for (start, _), t in zip(tapes_contents, tapes));
+        highest = max(max(start + len(cells) - 1, t.head) for (start, cells), t in zip(tapes_contents, tapes));
+
+        origin = TAPE_MARGIN - lowest;
+        width = (highest - lowest + 1) + (2 * TAPE_MARGIN);
+
+        cells = np.zeros((n, width), dtype = self.write_table.dtype);
+
+        for row, (start, codes) in enumerate(tapes_contents):
+            cells[row, origin + start : origin + start + len(codes)] = codes;
+
+        # Per-run vectors
+
+        heads = np.array([t.head for t in tapes], dtype = np.int64);
+        states = np.full(n, self.start_state_index, dtype = np.int64);
+        steps = np.zeros(n, dtype = np.int64);
+        halted = np.zeros(n, dtype = bool);
+        starts = np.array([start for start, _ in tapes_contents], dtype = np.int64); # Written bounds
+        ends = np.array([start + len(codes) - 1 for start, codes in tapes_contents], dtype = np.int64);
+
+        # Flattened tables so that one index, state * symbols_count + symbol, looks up a transition
+
+        symbols_count = len(self.symbols);
+
+        defined_table = self.defined_table.ravel();
+        next_state_table = self.next_state_table.ravel().astype(np.int64);
+        write_table = self.write_table.ravel();
+        move_table = self.move_table.ravel();
+
+        # The runs that haven't halted, with compacted copies of their vectors. These are only written back to the per-run vectors when runs halt or the loop ends
+
+        live = np.arange(n);
+        live_heads = heads.copy();
+        live_states = states.copy();
+        live_starts = starts.copy();
+        live_ends = ends.copy();
+
+        flat_cells = cells.reshape(-1);
+        row_offsets = (live * width) + origin; # Index in flat_cells of tape index 0 for each live run
+
+        step = 0;
+
+        while (live.size > 0) and ((max_steps == None) or (step < max_steps)):
+
+            cell_indexes = row_offsets + live_heads;
+            keys = (live_states * symbols_count) + flat_cells[cell_indexes];
+
+            # Mask out runs that have no transition to make
+
+            defined = defined_table[keys];
+
+            if not defined.all():
+
+                halting = ~defined;
+                halting_runs = live[halting];
+
+                halted[halting_runs] = True;
+                steps[halting_runs] = step;
+                heads[halting_runs] = live_heads[halting];
+                states[halting_runs] = live_states[halting];
+                starts[halting_runs] = live_starts[halting];
+                ends[halting_runs] = live_ends[halting];
+
+                live = live[defined];
+                live_heads = live_heads[defined];
+                live_states = live_states[defined];
+                live_starts = live_starts[defined];
+                live_ends = live_ends[defined];
+                row_offsets = row_offsets[defined];
+                cell_indexes = cell_indexes[defined];
+                keys = keys[defined];
+
+                if live.size == 0:
+                    break;
+
+            # Write and update bounds
+
+            flat_cells[cell_indexes] = write_table[keys];
+
+            np.minimum(live_starts, live_heads, out = live_starts);
+            np.maximum(live_ends, live_heads, out = live_ends);
+
+            # Move heads and change states
+
+            live_heads += move_table[keys];
+            live_states = next_state_table[keys];
+
+            step += 1;
+
+            # Grow tapes if any head has reached an edge
+
+            lowest_col = live_heads.min() + origin;
+            highest_col = live_heads.max() + origin;
+
+            if (lowest_col < 0) or (highest_col >= width):
+
+                extra_left = max(-lowest_col, 0);
+                extra_right = max(highest_col - width + 1, 0);
+
+                if extra_left > 0:
+                    extra_left = max(extra_left, width);
+
+                if extra_right > 0:
+                    extra_right = max(extra_right, width);
+
+                new_cells = np.zeros((n, width + extra_left + extra_right), dtype = cells.dtype);
+                new_cells[:, extra_left : extra_left + width] = cells;
+
+                cells = new_cells;
+                flat_cells = cells.reshape(-1);
+                origin += extra_left;
+                width = cells.shape[1];
+                row_offsets = (live * width) + origin;
+
+        steps[live] = step;
+        heads[live] = live_heads;
+        states[live] = live_states;
+        starts[live] = live_starts;
+        ends[live] = live_ends;
+
+        # Create results
+
+        results = [];
+
+        for row in range(n):
+
+            start = int(starts[row]);
+            end = int(ends[row]);
+
+            results.append(RunResult(
+                halted = bool(halted[row]),
+                state = self.state_numbers[states[row]],
+                steps = int(steps[row]),
+                head = int(heads[row]),
+                tape_start = start,
+                tape_cells = [symbols[code] for code in cells[row, start + origin : end + origin + 1]]
+            ));
+
+        return results;
+
+def run_machine_lockstep(machine: Machine,
+    tapes: tList[Tape],
+    start_state: int = 0,
+    max_steps: int | None = None) -> tList[RunResult]:
+
+    """Runs a machine on each of the tapes at once and returns the results in the same order as the tapes"""
+
+    return LockstepSimulator(machine, start_state).run(tapes, max_steps);
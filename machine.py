@@ -1,21 +1,36 @@
 from typing import List as tList;
 from typing import Tuple as tTuple;
-from struct import pack, unpack
-from pygame import Vector2;
+from typing import Iterable as tIterable;
+from typing import Sequence as tSequence;
+from typing import NamedTuple;
+from heapq import heappush, heappop;
+from spatial_index import SpatialGrid;
+
+# N.B. the model modules (machine, tape, machine_serializer, tape_files) must not import pygame so that machines can be loaded and run without it. The GUI converts positions to and from pygame.Vector2 where it needs vector maths
 
 INT32_FMT = "i";
 INT32_SIZE = 4;
 
 SYMBOL_MAX_LENGTH = 4; # Maximum number of chars a symbol can be
 
+STATE_GRID_CELL_SIZE = 64; # Size of the cells of the grid used to find states by position
+LONG_PAIR_DISTANCE = 500; # Connected states further apart than this on either axis are kept as a long pair, so that finding the pairs near an area only needs to look at the states near it and the long pairs
+
+class Position(NamedTuple):
+
+    """Position of a state in the machine. Can be indexed like a pair and passed straight to pygame.Vector2."""
+
+    x: float;
+    y: float;
+
 class State:
 
     def __init__(self,
         n: int,
-        pos: Vector2):
+        pos: tSequence[float]):
 
         self.n = n;
-        self.pos = pos;
+        self.pos = pos if type(pos) == Position else Position(pos[0], pos[1]);
 
 class Transition:
 
@@ -74,28 +89,79 @@ class Machine:
         self.states = [];
         self.transitions = [];
 
+        self.table_version = 0; # Changed whenever the transition table changes, so that things derived from it know to be rebuilt
+
+        self._clear_indexes();
+
+    def _clear_indexes(self) -> None:
+
+        # Compiled lookup of (state, read symbol) to the transition that applies. Kept in sync with self.transitions by the methods that change the machine
+
+        self.transition_table = {};
+        self.table_version += 1;
+
+        # Indexes, kept consistent by the methods that change the machine
+
+        self._states_by_number = {};
+        self._free_state_numbers = []; # Heap of numbers below _next_state_number that may be free. Entries are checked lazily
+        self._next_state_number = 0; # All numbers from this upwards are free
+
+        self._transition_keys = set(); # (start, end, read_symbol) of every transition
+        self._transitions_by_input = {}; # (start, read_symbol) -> transitions in the order they were added
+        self._transitions_by_pair = {}; # Pair key -> transitions between the pair of states in the order they were added
+        self._neighbours = {}; # State number -> numbers of states it has transitions with
+        self._long_pairs = set(); # Pair keys of connected states further apart than LONG_PAIR_DISTANCE, or with a state that isn't in the machine
+
+        self._state_grid = SpatialGrid(STATE_GRID_CELL_SIZE); # States by position. N.B. states' positions mustn't be changed while they are in the machine
+
+    @staticmethod
+    def _pair_key(a: int,
+        b: int) -> tTuple[int, int]:
+        return (a, b) if a <= b else (b, a);
+
     def get_next_available_state_number(self) -> int:
 
         """Gets the next available number for a state in this machine"""
 
-        i = 0;
+        free = self._free_state_numbers;
 
-        while True:
+        while (len(free) > 0) and (free[0] in self._states_by_number):
+            heappop(free);
 
-            if all(map(lambda s: s.n != i, self.states)):
-                return i;
+        if len(free) > 0:
+            return free[0];
 
-            i += 1;
+        return self._next_state_number;
 
     def add_state(self,
-        pos: Vector2) -> State:
+        pos: tSequence[float]) -> State:
 
         s = State(self.get_next_available_state_number(), pos);
 
-        self.states.append(s);
+        self.insert_state(s);
 
         return s;
 
+    def insert_state(self,
+        s: State) -> None:
+
+        """Adds an already-created state to the machine, keeping its number. Used when loading machines."""
+
+        if s.n in self._states_by_number:
+            raise Exception("A state already exists with provided number");
+
+        if s.n >= self._next_state_number:
+
+            for i in range(self._next_state_number, s.n):
+                heappush(self._free_state_numbers, i);
+
+            self._next_state_number = s.n + 1;
+
+        self.states.append(s);
+        self._states_by_number[s.n] = s;
+        self._neighbours.setdefault(s.n, set());
+        self._state_grid.insert(s, s.pos);
+
     def try_add_transition(self,
         start: int,
         end: int,
@@ -115,6 +181,7 @@ class Machine:
             return False;
         
         self.transitions.append(t);
+        self._add_to_indexes(t);
 
         return True;
 
@@ -122,53 +189,288 @@ class Machine:
         new_t: Transition
         ) -> bool:
 
-        combs = [];
+        return not ((new_t.start, new_t.end, new_t.read_symbol) in self._transition_keys);
 
-        for t in self.transitions:
+    def get_state_by_number(self,
+        n: int) -> State | None:
+        return self._states_by_number.get(n);
 
-            combs.append((t.start, t.end, t.read_symbol));
+    def get_states_within(self,
+        pos: tSequence[float],
+        radius: float) -> tList[State]:
 
-        new_comb = (new_t.start, new_t.end, new_t.read_symbol);
+        """Gets every state whose position is within radius of the provided position"""
 
-        return not (new_comb in combs);
+        return self._state_grid.query_radius(pos, radius);
 
-    def get_state_by_number(self,
-        n: int) -> State | None:
-        
-        try:
-            return next(filter(lambda s: s.n == n, self.states));
-        except StopIteration:
-            return None;
+    def get_states_in_rect(self,
+        rect: tTuple[float, float, float, float]) -> tList[State]:
+
+        """Gets every state whose position is in the provided (left, top, width, height) rect"""
+
+        return self._state_grid.query_rect(rect);
+
+    def get_nearest_state_within(self,
+        pos: tSequence[float],
+        radius: float) -> State | None:
+
+        """Gets the state nearest to the provided position out of those within radius of it, or None if there are none"""
+
+        return self._state_grid.query_nearest(pos, radius);
+
+    def check_any_state_within(self,
+        pos: tSequence[float],
+        radius: float) -> bool:
+        return self._state_grid.any_within(pos, radius);
 
     def get_transitions_between(self,
         a: int | State,
         b: int | State) -> tList[Transition]:
-        return list(filter(lambda t: t.is_between(a, b), self.transitions));
+
+        if type(a) == State:
+            a = a.n;
+
+        if type(b) == State:
+            b = b.n;
+
+        return list(self._transitions_by_pair.get(Machine._pair_key(a, b), ()));
+
+    def get_connected_state_pairs(self) -> tList[tTuple[int, int]]:
+
+        """Gets every pair of state numbers (smaller first) that has at least one transition between them"""
+
+        return list(self._transitions_by_pair.keys());
+
+    def get_connected_state_pairs_in_rect(self,
+        rect: tTuple[float, float, float, float]) -> tList[tTuple[int, int]]:
+
+        """Gets every pair of state numbers (smaller first) that has at least one transition between them and whose states' bounding box overlaps the provided (left, top, width, height) rect, in order. Edges of the rect are included."""
+
+        left, top, width, height = rect[0], rect[1], rect[2], rect[3];
+        right = left + width;
+        bottom = top + height;
+
+        # A pair that isn't long and overlaps the rect has both of its states within LONG_PAIR_DISTANCE of the rect
+
+        candidates = set(self._long_pairs);
+        d = LONG_PAIR_DISTANCE;
+
+        for s in self._state_grid.query_rect((left - d, top - d, width + (2 * d), height + (2 * d))):
+
+            n = s.n;
+
+            for other in self._neighbours[n]:
+                candidates.add((n, other) if n <= other else (other, n));
+
+        out = [];
+
+        for pair in candidates:
+
+            s1 = self._states_by_number.get(pair[0]);
+            s2 = self._states_by_number.get(pair[1]);
+
+            if (s1 == None) or (s2 == None):
+                continue;
+
+            (x1, y1), (x2, y2) = s1.pos, s2.pos;
+
+            if (max(x1, x2) >= left) and (min(x1, x2) <= right) and (max(y1, y2) >= top) and (min(y1, y2) <= bottom):
+                out.append(pair);
+
+        out.sort();
+
+        return out;
 
     def safe_remove_state(self,
         n: int) -> None:
 
-        state = self.get_state_by_number(n);
+        self.safe_remove_states([n]);
 
-        if state == None:
+    def safe_remove_states(self,
+        ns: tIterable[int]) -> None:
+
+        """Removes the states with the provided numbers and all transitions involving them. Removing many states at once only passes over the states and transitions lists once."""
+
+        ns = list(ns);
+
+        if not all(n in self._states_by_number for n in ns):
             raise Exception("No state exists with provided number");
 
+        removed_states = set();
+        removed_transitions = set();
+
+        for n in ns:
+
+            state = self._states_by_number.get(n);
+
+            if state == None:
+                continue; # Number was repeated
+
+            # Remove transitions involving state from indexes
+
+            for other in self._neighbours.pop(n):
+
+                pair_key = Machine._pair_key(n, other);
+                self._long_pairs.discard(pair_key);
+
+                for t in self._transitions_by_pair.pop(pair_key):
+
+                    removed_transitions.add(t);
+                    self._remove_from_indexes(t);
+
+                if other != n:
+                    self._neighbours[other].discard(n);
+
+            # Remove state from indexes
+
+            removed_states.add(state);
+            del self._states_by_number[n];
+            self._state_grid.remove(state, state.pos);
+            heappush(self._free_state_numbers, n);
+
+        # Remove from lists
+
+        if len(removed_states) > 0:
+            self.states = [s for s in self.states if s not in removed_states];
+
+        if len(removed_transitions) > 0:
+            self.transitions = [t for t in self.transitions if t not in removed_transitions];
+
+    def _check_long_pair(self,
+        a: int,
+        b: int) -> bool:
+
+        # States that aren't in the machine yet count as far apart as their positions aren't known
+
+        s1 = self._states_by_number.get(a);
+        s2 = self._states_by_number.get(b);
+
+        return ((s1 == None) or (s2 == None)
+            or (abs(s1.pos[0] - s2.pos[0]) > LONG_PAIR_DISTANCE) or (abs(s1.pos[1] - s2.pos[1]) > LONG_PAIR_DISTANCE));
+
+    def _add_to_indexes(self,
+        t: Transition) -> None:
+
+        start = t.start;
+        end = t.end;
+
+        self._transition_keys.add((start, end, t.read_symbol));
+
+        pair_key = (start, end) if start <= end else (end, start);
+        same_pair = self._transitions_by_pair.get(pair_key);
+
+        if same_pair == None:
+
+            self._transitions_by_pair[pair_key] = [t];
+
+            # First transition between the pair so they are new neighbours
+
+            self._neighbours.setdefault(start, set()).add(end);
+            self._neighbours.setdefault(end, set()).add(start);
+
+            if self._check_long_pair(start, end):
+                self._long_pairs.add(pair_key);
+
         else:
+            same_pair.append(t);
 
-            # Remove state
+        # The first transition added for a (state, symbol) pair takes priority, as it did when the transitions list was scanned linearly
 
-            self.states.remove(state);
+        input_key = (start, t.read_symbol);
+        same_input = self._transitions_by_input.get(input_key);
 
-            # Remove transitions involving state
+        if same_input == None:
+            self._transitions_by_input[input_key] = [t];
+            self.transition_table[input_key] = t;
+            self.table_version += 1;
 
-            new_transitions_list = [];
+        else:
+            same_input.append(t);
 
-            for t in self.transitions:
+    def _remove_from_indexes(self,
+        t: Transition) -> None:
 
-                if (t.start != n) and (t.end != n):
-                    new_transitions_list.append(t);
+        """Removes a transition from every index except for the pair and neighbour indexes, which are handled by the caller"""
 
-            self.transitions = new_transitions_list;
+        self._transition_keys.discard((t.start, t.end, t.read_symbol));
+
+        input_key = (t.start, t.read_symbol);
+        same_input = self._transitions_by_input[input_key];
+        same_input.remove(t);
+
+        if len(same_input) == 0:
+            del self._transitions_by_input[input_key];
+            del self.transition_table[input_key];
+
+        else:
+            self.transition_table[input_key] = same_input[0];
+
+        self.table_version += 1;
+
+    def rebuild_indexes(self) -> None:
+
+        """Rebuilds every index and the transition table from the states and transitions lists in one pass over each, changing table_version once. Raises an exception if more than one state has the same number."""
+
+        self._clear_indexes();
+
+        # States
+
+        states_by_number = self._states_by_number;
+        state_grid = self._state_grid;
+
+        for s in self.states:
+
+            if s.n in states_by_number:
+                raise Exception(f"Machine has more than one state numbered {s.n}");
+
+            states_by_number[s.n] = s;
+            state_grid.insert(s, s.pos);
+
+        self._next_state_number = max(states_by_number, default = -1) + 1;
+        self._free_state_numbers = [n for n in range(self._next_state_number) if n not in states_by_number]; # In ascending order, so already a heap
+
+        # Transitions. The first transition for a (state, symbol) pair takes priority, as in _add_to_indexes
+
+        transition_keys = self._transition_keys;
+        transitions_by_input = self._transitions_by_input;
+        transitions_by_pair = self._transitions_by_pair;
+        transition_table = self.transition_table;
+
+        for t in self.transitions:
+
+            start = t.start;
+            end = t.end;
+
+            transition_keys.add((start, end, t.read_symbol));
+
+            pair_key = (start, end) if start <= end else (end, start);
+            same_pair = transitions_by_pair.get(pair_key);
+
+            if same_pair == None:
+                transitions_by_pair[pair_key] = [t];
+            else:
+                same_pair.append(t);
+
+            input_key = (start, t.read_symbol);
+            same_input = transitions_by_input.get(input_key);
+
+            if same_input == None:
+                transitions_by_input[input_key] = [t];
+                transition_table[input_key] = t;
+            else:
+                same_input.append(t);
+
+        # Neighbours and long pairs, once for each pair of connected states
+
+        neighbours = self._neighbours = {n: set() for n in states_by_number};
+
+        for a, b in transitions_by_pair:
+
+            neighbours.setdefault(a, set()).add(b);
+            neighbours.setdefault(b, set()).add(a);
+
+            if self._check_long_pair(a, b):
+                self._long_pairs.add((a, b));
 
     def determine_output(self,
         start_state: int,
@@ -177,9 +479,9 @@ class Machine:
 
         """Determines what the machine would do when in the specified state and reading the specified symbol. Returns (next_state, write_symbol, head_move) or None if no transitions are found."""
 
-        for t in self.transitions:
+        t = self.transition_table.get((start_state, read_symbol));
 
-            if t.applies_to(start_state, read_symbol):
-                return t.output_to_tuple();
+        if t == None:
+            return None;
 
-        return None;
+        return t.output_to_tuple();
@@ -1,13 +1,19 @@
 from typing import List as tList;
 from typing import Tuple as tTuple;
-from struct import pack, unpack;
-from pygame import Vector2;
+from struct import Struct;
+import gc;
 
-from machine import State, Transition, Machine;
+from machine import State, Transition, Machine, Position;
 
 INT32_FMT = "i";
 INT32_SIZE = 4;
 
+# Precompiled formats
+
+INT32_STRUCT = Struct(INT32_FMT);
+STATE_STRUCT = Struct(INT32_FMT * 3); # Number, x position, y position
+TRANSITION_ENDS_STRUCT = Struct(INT32_FMT * 2); # Start, end
+
 # For tkinter.filedialog
 
 MACHINE_FILE_EXTENSION = ".turingmach";
@@ -16,36 +22,54 @@ MACHINE_FILETYPES = [("Turing Machine", f"*{MACHINE_FILE_EXTENSION}"),
 
 class MachineSerializer:
 
+    # File layout (all integers are native 32-bit ints):
+    #   number of states, then (n, x, y) for each state
+    #   number of transitions, then for each transition: start, end, read symbol, write symbol, head move
+    #   where each symbol is its length in bytes followed by its UTF-8 bytes
+
     @staticmethod
     def serialize(m: Machine) -> bytes:
 
-        bs = bytearray();
+        # Encode symbols first so that the output's size is known and it can be allocated once
+
+        encoded_symbols = [(t.read_symbol.encode(), t.write_symbol.encode()) for t in m.transitions];
+
+        size = INT32_SIZE + (STATE_STRUCT.size * len(m.states)) + INT32_SIZE;
+        size += ((TRANSITION_ENDS_STRUCT.size + (3 * INT32_SIZE)) * len(m.transitions));
+        size += sum(len(r) + len(w) for r, w in encoded_symbols);
+
+        bs = bytearray(size);
+        i = 0;
 
         # Write number of states
 
-        MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, len(m.states)));
+        INT32_STRUCT.pack_into(bs, i, len(m.states));
+        i += INT32_SIZE;
 
         # Write states
 
         for s in m.states:
 
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, s.n));
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, int(s.pos[0])));
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, int(s.pos[1])));
+            STATE_STRUCT.pack_into(bs, i, s.n, int(s.pos[0]), int(s.pos[1]));
+            i += STATE_STRUCT.size;
 
         # Write number of transitions
 
-        MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, len(m.transitions)));
+        INT32_STRUCT.pack_into(bs, i, len(m.transitions));
+        i += INT32_SIZE;
 
         # Write transitions
 
-        for t in m.transitions:
+        for t, (read_symbol, write_symbol) in zip(m.transitions, encoded_symbols):
+
+            TRANSITION_ENDS_STRUCT.pack_into(bs, i, t.start, t.end);
+            i += TRANSITION_ENDS_STRUCT.size;
 
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, t.start));
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, t.end));
-            MachineSerializer.add_bytes_to_bytearray(bs, MachineSerializer.serialize_str(t.read_symbol));
-            MachineSerializer.add_bytes_to_bytearray(bs, MachineSerializer.serialize_str(t.write_symbol));
-            MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, t.head_move));
+            i = MachineSerializer.write_encoded_str(bs, i, read_symbol);
+            i = MachineSerializer.write_encoded_str(bs, i, write_symbol);
+
+            INT32_STRUCT.pack_into(bs, i, t.head_move);
+            i += INT32_SIZE;
 
         # Return bytes
 
@@ -54,80 +78,113 @@ class MachineSerializer:
     @staticmethod
     def deserialize(bs: bytes) -> Machine:
 
-        m = Machine();
+        """Loads a machine from bytes written by serialize. Raises an exception if more than one state has the same number."""
+
+        # Loading creates an object for every state and transition, which would set the cyclic garbage collector off many times over without it finding anything to free, so it is paused while loading
+
+        gc_was_enabled = gc.isenabled();
+        gc.disable();
+
+        try:
+            return MachineSerializer._deserialize(bs);
+
+        finally:
+
+            if gc_was_enabled:
+                gc.enable();
+
+    @staticmethod
+    def _deserialize(bs: bytes) -> Machine:
+
+        mv = memoryview(bs); # Slicing a memoryview doesn't copy the data
 
         i = 0;
 
         # Read number of states
 
-        states_count = unpack(INT32_FMT, bs[i : i + INT32_SIZE])[0];
+        states_count = INT32_STRUCT.unpack_from(mv, i)[0];
         i += INT32_SIZE;
 
         # Read states
 
-        for _ in range(states_count):
-
-            n, pos_x, pos_y = unpack(INT32_FMT * 3, bs[i : i + (INT32_SIZE * 3)]);
-            i += INT32_SIZE * 3;
+        states_end = i + (STATE_STRUCT.size * states_count);
 
-            s = State(n, Vector2(pos_x, pos_y));
-            m.states.append(s);
+        states = [State(n, Position(pos_x, pos_y)) for n, pos_x, pos_y in STATE_STRUCT.iter_unpack(mv[i : states_end])];
+        i = states_end;
 
         # Read number of transitions
 
-        transitions_count = unpack(INT32_FMT, bs[i : i + INT32_SIZE])[0];
+        transitions_count = INT32_STRUCT.unpack_from(mv, i)[0];
         i += INT32_SIZE;
 
         # Read transitions
 
-        for _ in range(transitions_count):
+        transitions = [];
 
-            start, end = unpack(INT32_FMT * 2, bs[i : i + (INT32_SIZE * 2)]);
-            i += INT32_SIZE * 2;
+        for _ in range(transitions_count):
 
-            read_symbol, i_inc = MachineSerializer.deserialize_str(bs[i:]);
-            i += i_inc;
+            start, end = TRANSITION_ENDS_STRUCT.unpack_from(mv, i);
+            i += TRANSITION_ENDS_STRUCT.size;
 
-            write_symbol, i_inc = MachineSerializer.deserialize_str(bs[i:]);
-            i += i_inc;
+            read_symbol, i = MachineSerializer.read_str(mv, i);
+            write_symbol, i = MachineSerializer.read_str(mv, i);
 
-            head_move = unpack(INT32_FMT, bs[i : i + INT32_SIZE])[0];
+            head_move = INT32_STRUCT.unpack_from(mv, i)[0];
             i += INT32_SIZE;
 
-            t = Transition(start, end, read_symbol, write_symbol, head_move);
-            m.transitions.append(t);
+            transitions.append(Transition(start, end, read_symbol, write_symbol, head_move));
+
+        # Create machine, building its indexes in one go
+
+        m = Machine();
+
+        m.states = states;
+        m.transitions = transitions;
+        m.rebuild_indexes();
 
         # Return output
 
         return m;
 
     @staticmethod
-    def serialize_str(s: str) -> bytes:
+    def write_encoded_str(bs: bytearray,
+        i: int,
+        encoded: bytes) -> int:
 
-        bs = bytearray();
+        """Writes an already-encoded string into bs at index i and returns the index after it"""
 
-        MachineSerializer.add_bytes_to_bytearray(bs, pack(INT32_FMT, len(s)));
+        INT32_STRUCT.pack_into(bs, i, len(encoded));
+        i += INT32_SIZE;
 
-        MachineSerializer.add_bytes_to_bytearray(bs, s.encode());
+        bs[i : i + len(encoded)] = encoded;
 
-        return bs;
+        return i + len(encoded);
 
     @staticmethod
-    def deserialize_str(bs: bytes) -> tTuple[str, int]:
+    def read_str(mv: memoryview,
+        i: int) -> tTuple[str, int]:
 
-        i = 0;
+        """Reads a string starting at index i and returns it along with the index after it"""
 
-        size = unpack(INT32_FMT, bs[i : i + INT32_SIZE])[0];
+        size = INT32_STRUCT.unpack_from(mv, i)[0];
         i += INT32_SIZE;
 
-        s = bs[i : i + size].decode();
-        i += size;
+        return (str(mv[i : i + size], "utf-8"), i + size);
+
+    @staticmethod
+    def serialize_str(s: str) -> bytes:
+
+        encoded = s.encode();
+
+        return INT32_STRUCT.pack(len(encoded)) + encoded;
+
+    @staticmethod
+    def deserialize_str(bs: bytes) -> tTuple[str, int]:
 
-        return (s, i);
+        return MachineSerializer.read_str(memoryview(bs), 0);
 
     @staticmethod
     def add_bytes_to_bytearray(arr: bytearray,
         bs: bytes) -> None:
 
-        for b in bs:
-            arr.append(b);
+        arr.extend(bs);
@@ -1,12 +1,16 @@
 from typing import List as tList;
 from typing import Tuple as tTuple;
-from pygame import Surface, Vector2;
+from typing import Dict as tDict;
+from pygame import Surface, Vector2, Rect;
+from math import log1p;
 import pygame;
 
 from machine import Machine, State, Transition;
 
 from state_sprite import StateSprite;
 from transitions_sprite import TransitionsSprite;
+from render_cache import render_text;
+from camera import Camera;
 
 STATE_COLOR = (0, 0, 0);
 CURR_STATE_COLOR = (0, 100, 200);
@@ -18,11 +22,36 @@ TRANSITION_TEXT_COLOR = (255, 0, 0);
 TRANSITION_LINE_WIDTH = 5;
 TRANSITION_LOOP_HEIGHT = 50;
 
+# Heatmap colours for the least and most used states and transitions. States and transitions that haven't been used keep their normal colours
+
+HEATMAP_COLD_COLOR = (80, 0, 160);
+HEATMAP_HOT_COLOR = (255, 200, 0);
+HEATMAP_BUCKETS = 16; # Number of steps between the cold and hot colours, so that counts changing a little while running doesn't recolour every sprite
+
 STATUS_TEXT_COLOR = (0, 0, 255);
 STATUS_TEXT_POS = (5, 5);
 
+CULL_MARGIN = 100; # How far (in window pixels) outside of the window sprites are needed for. Needs to be enough for transition details, which can stick out past the line between the states
+SPRITE_AREA_MARGIN = 4 * CULL_MARGIN; # How far (in window pixels) outside of the window sprites are made for, so that panning only needs them updating once the window and its CULL_MARGIN have left the area they were made for
+DIRTY_AREAS_MAX_COUNT = 16; # Most areas of the window re-composited separately before the whole window is re-composited instead
+
+def get_heat_color(count: int,
+    max_count: int) -> tTuple[int, int, int]:
+
+    """Gets the heatmap colour for a count out of the provided maximum. Counts are compared on a log scale as they often differ by orders of magnitude."""
+
+    if max_count <= 1:
+        t = 1;
+    else:
+        t = round(HEATMAP_BUCKETS * log1p(count - 1) / log1p(max_count - 1)) / HEATMAP_BUCKETS;
+
+    return tuple(round(c + ((h - c) * t)) for c, h in zip(HEATMAP_COLD_COLOR, HEATMAP_HOT_COLOR));
+
 class MachineWindow(Surface):
 
+    """Draws a machine. Sprites are kept for each state and each pair of states with transitions between them, and only the sprites affected by a change are rebuilt. The window is only re-composited from its sprites and status text when something has changed.
+    The machine is viewed through a camera that can be panned and zoomed. Sprites are only kept for states and transitions near the visible part of the machine."""
+
     def __init__(self,
         size: tTuple[int, int],
         machine: Machine,
@@ -38,6 +67,8 @@ class MachineWindow(Surface):
 
         self.curr_state = 0;
 
+        self.camera = Camera();
+
         self.bg_color = bg_color;
         self.state_font = state_font;
         self.transition_font = transition_font;
@@ -45,75 +76,391 @@ class MachineWindow(Surface):
         self.state_sprites = pygame.sprite.Group();
         self.transition_sprites = pygame.sprite.Group();
 
+        self.state_sprites_by_number = {};
+        self.transition_sprites_by_pair = {};
+        self.pairs_by_state = {}; # State number -> pairs with a transitions sprite involving the state
+
+        self.sprite_area = None; # Area, in the positions sprites are created at, that the sprites were made for. None until sprites are made
+        self.sprite_world_rect = None; # The same area in machine positions
+
+        self.lines_layer = None; # Covers the sprite area with the lines of the transitions sprites drawn on. Drawing the lines straight onto the window wouldn't always give the same pixels when clipped to different dirty areas
+        self.lines_layer_dirty = True;
+
+        # Heatmap of how many times states and transitions have been used, if being shown
+
+        self.heatmap_state_counts = None; # State number -> count
+        self.heatmap_pair_counts = None; # Pair of state numbers -> count for the transitions between them
+        self.heatmap_max_state_count = 0;
+        self.heatmap_max_pair_count = 0;
+
         self.status_text = "";
+        self.status_text_surface = None;
+
+        self.dirty = True; # Whether the whole window needs re-compositing
+        self.dirty_areas = []; # Areas of the window that need re-compositing, if not the whole window
+        self.dirty_rects = []; # Areas that have been re-composited since they were last taken by pop_dirty_rects
 
         self.set_status_text("");
         self.refresh();
 
     def refresh(self) -> None:
 
-        """Clears all machine sprites on the surface and re-draws them, looking at the state of the machine"""
-
-        # Fill with background color
-
-        self.fill(self.bg_color);
+        """Clears all machine sprites and re-creates them, looking at the state of the machine"""
 
         # Clear existing sprites
 
         self.state_sprites.empty();
         self.transition_sprites.empty();
 
+        self.state_sprites_by_number = {};
+        self.transition_sprites_by_pair = {};
+        self.pairs_by_state = {};
+
+        self.sprite_area = None;
+
         # Add new sprites
 
-        for i in range(len(self.machine.states)):
+        self.update_visible_sprites();
 
-            s1 = self.machine.states[i];
+        # Initially update state sprites (for setting current state)
 
-            self.create_state_sprite(s1);
+        self.update_state_sprites();
 
-            for j in range(i, len(self.machine.states)):
+        self.redraw();
 
-                s2 = self.machine.states[j];
+    def get_scaled_view_rect(self,
+        margin: int = 0) -> Rect:
 
-                self.create_transitions_sprite(s1, s2);
+        """Gets the part of the machine shown in the window, grown by margin window pixels on every side, in the positions sprites are created at"""
 
-        # Initially update state sprites (for setting current state)
+        ox, oy = self.camera.get_scaled_offset();
+        width, height = self.get_size();
 
-        self.update_state_sprites();
+        return Rect(ox - margin, oy - margin, width + (2 * margin), height + (2 * margin));
+
+    def check_pair_visible(self,
+        pair: tTuple[int, int],
+        view: Rect) -> bool:
+
+        """Checks whether the line for the transitions between a pair of states could be in view"""
+
+        s1 = self.machine.get_state_by_number(pair[0]);
+        s2 = self.machine.get_state_by_number(pair[1]);
+
+        if (s1 == None) or (s2 == None):
+            return False;
+
+        left = min(s1.pos[0], s2.pos[0]);
+        top = min(s1.pos[1], s2.pos[1]) - TRANSITION_LOOP_HEIGHT; # Loops are drawn above their state
+        right = max(s1.pos[0], s2.pos[0]);
+        bottom = max(s1.pos[1], s2.pos[1]);
+
+        return view.colliderect(Rect(int(left), int(top), int(right - left) + 1, int(bottom - top) + 1));
+
+    def update_visible_sprites(self) -> None:
+
+        """Creates sprites for the states and transitions that have come into the sprite area and removes those for the ones that have left it. The sprite area is SPRITE_AREA_MARGIN bigger than the window, so this does nothing until the view has moved out of the area the sprites were last made for."""
+
+        if (self.sprite_area != None) and self.sprite_area.contains(self.get_scaled_view_rect(CULL_MARGIN)):
+            return;
+
+        self.sprite_area = self.get_scaled_view_rect(SPRITE_AREA_MARGIN);
+        self.sprite_world_rect = self.camera.get_visible_world_rect(self.get_size(), SPRITE_AREA_MARGIN);
+
+        area = self.sprite_world_rect;
+
+        # States
+
+        area_states = sorted(self.machine.get_states_in_rect(area), key = lambda s: s.n);
+        area_numbers = set(s.n for s in area_states);
+
+        for n in [n for n in self.state_sprites_by_number if n not in area_numbers]:
+            self.state_sprites_by_number.pop(n).kill();
+
+        for s in area_states:
+
+            if s.n not in self.state_sprites_by_number:
+                self.create_state_sprite(s);
+
+        # Transitions. Either of a pair's states can be out of the area while the line between them is in it. Loops are drawn above their state so pairs up to a loop's height below the area are looked for too
+
+        area_pairs = [
+            pair for pair in self.machine.get_connected_state_pairs_in_rect((area.x, area.y, area.width, area.height + TRANSITION_LOOP_HEIGHT))
+            if self.check_pair_visible(pair, area)
+        ];
+        area_pairs_set = set(area_pairs);
+
+        for pair in [pair for pair in self.transition_sprites_by_pair if pair not in area_pairs_set]:
+            self._remove_transitions_sprite(pair);
+
+        for pair in area_pairs:
+
+            if pair not in self.transition_sprites_by_pair:
+
+                self.create_transitions_sprite(
+                    self.machine.get_state_by_number(pair[0]),
+                    self.machine.get_state_by_number(pair[1])
+                );
+
+        # The lines layer needs to cover the new area
+
+        self.lines_layer_dirty = True;
+        self.dirty = True;
+
+    def pan_camera(self,
+        dx: float,
+        dy: float) -> None:
+
+        """Moves the view by the provided number of window pixels"""
+
+        old_ox, old_oy = self.camera.get_scaled_offset();
+
+        self.camera.pan(dx, dy);
+
+        new_ox, new_oy = self.camera.get_scaled_offset();
+
+        # Sprites don't depend on the camera's offset so only the sprites coming in and out of the sprite area change
+
+        self.update_visible_sprites();
+
+        # What has already been composited can be moved along rather than composited again
+
+        if not self.dirty:
+            self.scroll_composited(old_ox - new_ox, old_oy - new_oy);
+
+    def scroll_composited(self,
+        sx: int,
+        sy: int) -> None:
+
+        """Moves what has been composited onto the window by the provided number of pixels, marking the strips uncovered at the edges and the status text as needing re-compositing"""
+
+        if (sx == 0) and (sy == 0):
+            return;
+
+        width, height = self.get_size();
+
+        if (abs(sx) >= width) or (abs(sy) >= height):
+            self.dirty = True;
+            return;
+
+        self.scroll(sx, sy);
+
+        # Areas waiting to be re-composited have moved along with everything else
+
+        self.dirty_areas = [area.move(sx, sy) for area in self.dirty_areas];
+
+        # Uncovered strips
+
+        if sx > 0:
+            self.dirty_areas.append(Rect(0, 0, sx, height));
+        elif sx < 0:
+            self.dirty_areas.append(Rect(width + sx, 0, -sx, height));
+
+        if sy > 0:
+            self.dirty_areas.append(Rect(0, 0, width, sy));
+        elif sy < 0:
+            self.dirty_areas.append(Rect(0, height + sy, width, -sy));
+
+        # The status text stays where it is, so both where it has been moved to and where it belongs need re-compositing
+
+        status_rect = self.status_text_surface.get_rect(topleft = STATUS_TEXT_POS);
+
+        self.dirty_areas.append(status_rect);
+        self.dirty_areas.append(status_rect.move(sx, sy));
+
+        # Everything on the window has changed
+
+        self.dirty_rects.append(self.get_rect());
+
+    def zoom_camera(self,
+        factor: float,
+        screen_pos: Vector2) -> None:
+
+        """Zooms the view by the provided factor, keeping the point under screen_pos in place"""
+
+        if self.camera.zoom_at(factor, screen_pos):
+
+            # Sprites are drawn at the camera's zoom so all of them need re-creating
+
+            self.refresh();
+
+    def screen_to_world(self,
+        pos: Vector2) -> Vector2:
+
+        """Converts a position relative to the window to a position in the machine"""
+
+        return self.camera.screen_to_world(pos);
+
+    def redraw(self) -> None:
+
+        """Composites the sprites and status text onto the surface"""
+
+        # Fill with background color
+
+        self.fill(self.bg_color);
 
         # Draw sprites
 
         self.redraw_sprites();
 
-        # Render status text
-
-        text_surface = self.state_font.render(
-            self.status_text,
-            False,
-            STATUS_TEXT_COLOR,
-            None
-        );
+        # Draw status text
 
         self.blit(
-            source = text_surface,
+            source = self.status_text_surface,
             dest = STATUS_TEXT_POS
         );
 
+        self.dirty = False;
+        self.dirty_areas = [];
+        self.dirty_rects = [self.get_rect()];
+
+    def redraw_if_dirty(self) -> None:
+
+        """Re-composites the window, or the parts of it, that have changed"""
+
+        # Each dirty area composites every sprite clipped to it, so past DIRTY_AREAS_MAX_COUNT areas compositing the whole window once is quicker
+
+        if self.dirty or (len(self.dirty_areas) > DIRTY_AREAS_MAX_COUNT):
+            self.redraw();
+
+        elif len(self.dirty_areas) > 0:
+
+            # Re-composite only the dirty areas by clipping drawing to each one
+
+            for area in self.dirty_areas:
+
+                self.set_clip(area);
+
+                self.fill(self.bg_color);
+                self.redraw_sprites();
+                self.blit(
+                    source = self.status_text_surface,
+                    dest = STATUS_TEXT_POS
+                );
+
+            self.set_clip(None);
+
+            self.dirty_rects.extend(self.dirty_areas);
+            self.dirty_areas = [];
+
+    def pop_dirty_rects(self) -> tList[Rect]:
+
+        """Gets the areas of the window that have changed since this was last called"""
+
+        rects = self.dirty_rects;
+        self.dirty_rects = [];
+
+        return rects;
+
+    def set_heatmap(self,
+        state_counts: tDict[int, int] | None,
+        pair_counts: tDict[tTuple[int, int], int] | None) -> None:
+
+        """Colours states and the transitions between pairs of states by how many times they have been used, or stops doing so if the counts are None"""
+
+        if (state_counts == self.heatmap_state_counts) and (pair_counts == self.heatmap_pair_counts):
+            return;
+
+        self.heatmap_state_counts = state_counts;
+        self.heatmap_pair_counts = pair_counts;
+
+        self.heatmap_max_state_count = max(state_counts.values(), default = 0) if state_counts != None else 0;
+        self.heatmap_max_pair_count = max(pair_counts.values(), default = 0) if pair_counts != None else 0;
+
+        # Recolour only the sprites whose colour has changed, marking their areas as dirty. Sprites created later get their colours when they are created
+
+        ox, oy = self.camera.get_scaled_offset();
+
+        for n, s in self.state_sprites_by_number.items():
+
+            if s.set_state_color(self.get_state_color(n)):
+                self.dirty_areas.append(s.rect.move(-ox, -oy));
+
+        for pair, s in self.transition_sprites_by_pair.items():
+
+            color = self.get_transitions_color(pair);
+
+            if color == s.color:
+                continue;
+
+            s.set_color(color);
+
+            if s.line == None:
+                self.dirty_areas.append(s.rect.move(-ox, -oy));
+
+            else:
+                self.lines_layer_dirty = True;
+                self.dirty_areas.append(s.get_line_rect().move(-ox, -oy).clip(self.get_rect()));
+
+    def get_state_color(self,
+        n: int) -> tTuple[int, int, int]:
+
+        count = self.heatmap_state_counts.get(n, 0) if self.heatmap_state_counts != None else 0;
+
+        if count == 0:
+            return STATE_COLOR;
+
+        return get_heat_color(count, self.heatmap_max_state_count);
+
+    def get_transitions_color(self,
+        pair: tTuple[int, int]) -> tTuple[int, int, int]:
+
+        count = self.heatmap_pair_counts.get(pair, 0) if self.heatmap_pair_counts != None else 0;
+
+        if count == 0:
+            return TRANSITION_COLOR;
+
+        return get_heat_color(count, self.heatmap_max_pair_count);
+
     def set_machine(self, m: Machine) -> None:
         self.machine = m;
 
     def redraw_sprites(self) -> None:
 
-        # Render sprites
+        # Render sprites. Sprites are positioned at machine positions multiplied by the zoom so are moved back by the camera's offset
+
+        ox, oy = self.camera.get_scaled_offset();
+
+        if self.lines_layer_dirty:
+            self.redraw_lines_layer();
+
+        self.blit(self.lines_layer, (self.sprite_area.x - ox, self.sprite_area.y - oy));
+
+        self.blits([(s.image, (s.rect.x - ox, s.rect.y - oy)) for s in self.transition_sprites], False);
+        self.blits([(s.image, (s.rect.x - ox, s.rect.y - oy)) for s in self.state_sprites], False);
+
+    def redraw_lines_layer(self) -> None:
+
+        area = self.sprite_area;
+
+        if (self.lines_layer == None) or (self.lines_layer.get_size() != area.size):
+            self.lines_layer = Surface(area.size);
+            self.lines_layer.set_colorkey(self.bg_color);
+
+        self.lines_layer.fill(self.bg_color);
+
+        for s in self.transition_sprites:
+            s.draw_line(self.lines_layer, area.topleft);
 
-        self.transition_sprites.draw(self);
-        self.state_sprites.draw(self);
+        self.lines_layer_dirty = False;
 
     def update_state_sprites(self) -> None:
 
-        self.state_sprites.update(curr_state = self.curr_state);
+        for s in self.state_sprites:
+            self._update_state_sprite(s);
 
-        self.redraw_sprites();
+    def _update_state_sprite(self,
+        s: StateSprite) -> None:
+
+        """Updates a state sprite, marking its area as dirty if it has changed"""
+
+        was_curr = s.is_curr;
+
+        s.update(curr_state = self.curr_state);
+
+        if s.is_curr != was_curr:
+            ox, oy = self.camera.get_scaled_offset();
+            self.dirty_areas.append(s.rect.move(-ox, -oy));
 
     def create_state_sprite(self,
         state: State
@@ -121,15 +468,74 @@ class MachineWindow(Surface):
 
         s = StateSprite(
             state = state,
-            state_color = STATE_COLOR,
+            state_color = self.get_state_color(state.n),
             curr_state_color = CURR_STATE_COLOR,
             text_color = STATE_TEXT_COLOR,
             bg_color = self.bg_color,
-            width = STATE_WIDTH,
-            font = self.state_font
+            width = round(STATE_WIDTH * self.camera.zoom),
+            font = self.state_font,
+            scale = self.camera.zoom
         );
 
+        s.update(curr_state = self.curr_state);
+
         self.state_sprites.add(s);
+        self.state_sprites_by_number[state.n] = s;
+
+        self.dirty = True;
+
+    def remove_state_sprites(self,
+        n: int) -> None:
+
+        """Removes the sprite for a state and the sprites for any transitions involving it"""
+
+        s = self.state_sprites_by_number.pop(n, None);
+
+        if s != None:
+            s.kill();
+
+        for pair in list(self.pairs_by_state.get(n, ())):
+            self._remove_transitions_sprite(pair);
+
+        self.dirty = True;
+
+    def refresh_transitions_between(self,
+        a: int | State,
+        b: int | State
+        ) -> None:
+
+        """Re-creates the sprite for the transitions between two states"""
+
+        if type(a) == State:
+            a = a.n;
+
+        if type(b) == State:
+            b = b.n;
+
+        pair = (a, b) if a <= b else (b, a);
+
+        self._remove_transitions_sprite(pair);
+
+        s1 = self.machine.get_state_by_number(pair[0]);
+        s2 = self.machine.get_state_by_number(pair[1]);
+
+        if (s1 != None) and (s2 != None) and (self.sprite_area != None) and self.check_pair_visible(pair, self.sprite_world_rect):
+            self.create_transitions_sprite(s1, s2);
+
+        self.dirty = True;
+
+    def _remove_transitions_sprite(self,
+        pair: tTuple[int, int]) -> None:
+
+        s = self.transition_sprites_by_pair.pop(pair, None);
+
+        if s != None:
+
+            s.kill();
+            self.lines_layer_dirty = True;
+
+            for n in pair:
+                self.pairs_by_state[n].discard(pair);
 
     def create_transitions_sprite(self,
         s1: State,
@@ -139,31 +545,39 @@ class MachineWindow(Surface):
         if len(self.machine.get_transitions_between(s1, s2)) == 0:
             return;
 
+        pair = (s1.n, s2.n) if s1.n <= s2.n else (s2.n, s1.n);
+
         s = TransitionsSprite(
             machine = self.machine,
-            parent_dims = self.get_size(),
             start = s1,
             end = s2,
-            color = TRANSITION_COLOR,
+            color = self.get_transitions_color(pair),
             text_color = TRANSITION_TEXT_COLOR,
             bg_color = self.bg_color,
-            line_width = TRANSITION_LINE_WIDTH,
-            loop_transition_height = TRANSITION_LOOP_HEIGHT,
-            font = self.transition_font
+            line_width = max(1, round(TRANSITION_LINE_WIDTH * self.camera.zoom)),
+            loop_transition_height = round(TRANSITION_LOOP_HEIGHT * self.camera.zoom),
+            font = self.transition_font,
+            scale = self.camera.zoom
         );
 
         self.transition_sprites.add(s);
+        self.transition_sprites_by_pair[pair] = s;
+        self.lines_layer_dirty = True;
+
+        for n in pair:
+            self.pairs_by_state.setdefault(n, set()).add(pair);
+
+        self.dirty = True;
 
     def get_state_in_pos(self,
         pos: Vector2
         ) -> State | None:
 
-        for s in self.state_sprites:
+        """Gets the state at the provided machine position. N.B. positions relative to the window need converting with screen_to_world first"""
 
-            if s.check_pos_in_sprite(pos):
-                return s.state;
+        # States are circles around their positions
 
-        return None;
+        return self.machine.get_nearest_state_within(pos, STATE_WIDTH / 2);
 
     def set_status_text(self,
         text: str | None) -> None:
@@ -173,10 +587,32 @@ class MachineWindow(Surface):
 
         self.status_text = text;
 
-        self.refresh();
+        # Only the areas covered by the old and new text need re-compositing
+
+        if self.status_text_surface != None:
+            self.dirty_areas.append(self.status_text_surface.get_rect(topleft = STATUS_TEXT_POS));
+
+        self.status_text_surface = render_text(
+            self.state_font,
+            self.status_text,
+            False,
+            STATUS_TEXT_COLOR,
+            None
+        );
+
+        self.dirty_areas.append(self.status_text_surface.get_rect(topleft = STATUS_TEXT_POS));
 
     def set_curr_state(self,
         n: int) -> None:
 
+        # Only the sprites for the previous and new current states change
+
+        prev = self.curr_state;
         self.curr_state = n;
-        self.update_state_sprites();
+
+        for state_n in (prev, n):
+
+            s = self.state_sprites_by_number.get(state_n);
+
+            if s != None:
+                self._update_state_sprite(s);
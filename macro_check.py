@@ -0,0 +1,138 @@
+from typing import List as tList;
+from argparse import ArgumentParser;
+import random;
+
+from machine import Machine, Position;
+from tape import Tape;
+from engine import RunResult, run_machine;
+from macro_engine import MacroEngine, run_macro_machine;
+
+# Differential check of the macro machine against the engine. Random small machines are run on random input tapes, from random states and head positions, with every block size up to CHECK_MAX_BLOCK_SIZE, and any difference in the results stops the check.
+# Usage: python macro_check.py [-n number of machines] [-s seed]
+
+CHECK_DEFAULT_MACHINES = 200;
+CHECK_DEFAULT_SEED = 0;
+
+CHECK_MAX_STATES = 5;
+CHECK_SYMBOLS = ["0", "1", "2"];
+CHECK_HALT_CHANCE = 0.04; # Chance of each (state, symbol) pair having no transition, and of each transition going to the state without transitions
+CHECK_HEAD_MOVES = (-1, 0, 1);
+
+CHECK_TAPE_MAX_CELLS = 12; # Most cells written on an input tape
+CHECK_TAPE_SPREAD = 8; # Input cells and the head are placed at indices from -CHECK_TAPE_SPREAD to CHECK_TAPE_SPREAD
+
+CHECK_MAX_BLOCK_SIZE = 8;
+CHECK_STEPS = [0, 1, 2, 7, 50, 500, 3000]; # Step limits, so that runs stop part way through blocks
+CHECK_NEVER_HALTS_STEPS = 100000; # Steps the engine runs a machine for to check that it doesn't halt when the macro machine finds it never will
+
+def check_same_result(a: RunResult,
+    b: RunResult,
+    description: str) -> None:
+
+    if ((a.halted, a.state, a.steps, a.head, a.tape_start, a.tape_cells)
+        != (b.halted, b.state, b.steps, b.head, b.tape_start, b.tape_cells)):
+        raise Exception(f"Results differ for {description}");
+
+def create_random_machine(rng: random.Random) -> Machine:
+
+    """Creates a machine with between 1 and CHECK_MAX_STATES states and a random transition for most (state, symbol) pairs. A few transitions go to an extra state without transitions so that some runs halt late"""
+
+    states_count = rng.randint(1, CHECK_MAX_STATES);
+    symbols = CHECK_SYMBOLS[:rng.randint(2, len(CHECK_SYMBOLS))];
+
+    m = Machine();
+
+    for i in range(states_count + 1):
+        m.add_state(Position(i * 100, 0));
+
+    for start in range(states_count):
+
+        for read_symbol in symbols:
+
+            if rng.random() < CHECK_HALT_CHANCE:
+                continue;
+
+            m.try_add_transition(
+                start = start,
+                end = states_count if rng.random() < CHECK_HALT_CHANCE else rng.randrange(states_count),
+                read_symbol = read_symbol,
+                write_symbol = rng.choice(symbols),
+                head_move = rng.choice(CHECK_HEAD_MOVES)
+            );
+
+    return m;
+
+def create_random_tape(rng: random.Random) -> Tape:
+
+    t = Tape(CHECK_SYMBOLS[0]);
+
+    for _ in range(rng.randint(0, CHECK_TAPE_MAX_CELLS)):
+        t.set(rng.randint(-CHECK_TAPE_SPREAD, CHECK_TAPE_SPREAD), rng.choice(CHECK_SYMBOLS));
+
+    t.head_to(rng.randint(-CHECK_TAPE_SPREAD, CHECK_TAPE_SPREAD));
+
+    return t;
+
+def check_machine(m: Machine,
+    tape: Tape,
+    start_state: int,
+    description: str) -> int:
+
+    """Checks the macro machine against the engine for every block size and step limit, both in one run and continued from a run stopped part way. Returns the number of runs checked."""
+
+    checked = 0;
+    halts = None; # Whether the engine halts within CHECK_NEVER_HALTS_STEPS steps, only found if needed
+
+    for max_steps in CHECK_STEPS:
+
+        expected = run_machine(m, tape.copy(), start_state, max_steps = max_steps);
+
+        for block_size in range(1, CHECK_MAX_BLOCK_SIZE + 1):
+
+            run_description = f"{description} with block size {block_size} and {max_steps} steps";
+
+            result = run_macro_machine(m, tape.copy(), start_state, max_steps = max_steps, block_size = block_size);
+            check_same_result(expected, result, run_description);
+
+            if result.never_halts:
+
+                if halts == None:
+                    halts = run_machine(m, tape.copy(), start_state, max_steps = CHECK_NEVER_HALTS_STEPS).halted;
+
+                if halts:
+                    raise Exception(f"Found to never halt but halts for {run_description}");
+
+            # Continued from a run stopped part way, which may be part way through a block
+
+            engine = MacroEngine(m, tape.copy(), start_state, block_size);
+            engine.run(max_steps // 3);
+            check_same_result(expected, engine.run(max_steps), f"{run_description}, continued");
+
+            checked += 2;
+
+    return checked;
+
+def main():
+
+    parser = ArgumentParser(description = "Check the macro machine against the engine on random machines and tapes.");
+
+    parser.add_argument("-n", "--machines", type = int, default = CHECK_DEFAULT_MACHINES, help = f"Number of random machines to check. Defaults to {CHECK_DEFAULT_MACHINES}");
+    parser.add_argument("-s", "--seed", type = int, default = CHECK_DEFAULT_SEED, help = "Seed for the random machines and tapes");
+
+    args = parser.parse_args();
+
+    rng = random.Random(args.seed);
+    checked = 0;
+
+    for i in range(args.machines):
+
+        m = create_random_machine(rng);
+        tape = create_random_tape(rng);
+        start_state = rng.randrange(len(m.states));
+
+        checked += check_machine(m, tape, start_state, f"machine {i} of seed {args.seed}");
+
+    print(f"Checked {checked} runs against the engine.");
+
+if __name__ == "__main__":
+    main();
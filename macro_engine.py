@@ -0,0 +1,441 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+
+from machine import Machine;
+from tape import Tape;
+from engine import RunResult;
+
+# Runs a machine as a macro machine. The tape is split into blocks of block_size cells, held as two stacks of (block, repeat count) runs either side of the head, and the head always sits on a boundary between blocks.
+# A macro step runs the machine from entering a block on one side until it leaves the block, halts or is found to loop inside the block. The outcome only depends on (state, block, side entered from) so it is worked out once and cached.
+# When the machine leaves a block on the far side in the same state it entered in, it would do the same to every copy of the block in the run it came from, so the whole run is passed over in one go. This is what makes machines that sweep over long uniform stretches of tape fast.
+# Step counts and the final tape are exactly the same as the engine's, including the range of the tape that has been written to. Cycle detection and checkpoints aren't supported
+# N.B. like the engine, this module must not import pygame or tkinter
+
+MACRO_DEFAULT_BLOCK_SIZE = 3;
+
+DIR_LEFT = -1;
+DIR_RIGHT = 1;
+
+# Ways a macro step can end, other than leaving the block to the left or right
+
+EXIT_HALT = 0;
+EXIT_LOOP = 2; # The machine loops forever inside the block
+
+class MacroEngine:
+
+    def __init__(self,
+        machine: Machine,
+        tape: Tape,
+        start_state: int = 0,
+        block_size: int = MACRO_DEFAULT_BLOCK_SIZE):
+
+        if block_size < 1:
+            raise Exception("Block size must be at least 1");
+
+        if any(abs(t.head_move) > 1 for t in machine.transition_table.values()):
+            raise Exception("Macro simulation only supports head moves of -1, 0 and 1");
+
+        self.machine = machine;
+        self.tape = tape;
+        self.block_size = block_size;
+
+        self.state = start_state;
+        self.steps = 0;
+        self.macro_steps = 0;
+        self.halted = False;
+        self.never_halts = False; # Set if the machine is found to run forever without leaving a block or while passing over blank tape
+
+        # Blocks are interned to IDs so that they are cheap to compare and to use in cache keys
+
+        self._blocks = []; # ID -> tuple of symbols
+        self._block_ids = {}; # Tuple of symbols -> ID
+
+        self._blank_block = self._intern_block((tape.get_default_symbol(),) * block_size);
+
+        self._cache = {}; # (state, block ID, direction entered in) -> outcome of the macro step
+
+        self._load_tape();
+
+    def _intern_block(self,
+        cells: tTuple[str, ...]) -> int:
+
+        block_id = self._block_ids.get(cells);
+
+        if block_id == None:
+            block_id = self._block_ids[cells] = len(self._blocks);
+            self._blocks.append(cells);
+
+        return block_id;
+
+    def _push(self,
+        stack: tList[tList[int]],
+        block_id: int,
+        count: int) -> None:
+
+        """Pushes count copies of a block onto a side of the tape, merging with the nearest run if it holds the same block. Blank blocks pushed onto an empty side are dropped as the tape is blank beyond it anyway."""
+
+        if (len(stack) > 0) and (stack[-1][0] == block_id):
+            stack[-1][1] += count;
+
+        elif (len(stack) > 0) or (block_id != self._blank_block):
+            stack.append([block_id, count]);
+
+    def _load_tape(self) -> None:
+
+        """Splits the tape into blocks either side of the head"""
+
+        tape = self.tape;
+        k = self.block_size;
+
+        start, end = tape.get_bounds();
+        head = tape.head;
+
+        self._left = []; # Runs left of the head, nearest last
+        self._right = []; # Runs right of the head, nearest last
+
+        # Furthest blocks are pushed first
+
+        for b in reversed(range(head, end + 1, k)):
+            self._push(self._right, self._intern_block(tuple(tape.get(i) for i in range(b, b + k))), 1);
+
+        for b in range(head - k * (((head - start) + k - 1) // k), head, k):
+            self._push(self._left, self._intern_block(tuple(tape.get(i) for i in range(b, b + k))), 1);
+
+        self._pos = head; # Tape index of the boundary the head is at
+        self._dir = DIR_RIGHT; # Direction the head is about to enter a block in
+
+        # Inclusive range of indices that have been written to, kept the same as a tape's would be
+
+        self._start = start;
+        self._end = end;
+
+        self._reload_needed = False; # Set when a run stops part way through a block, as the head is then no longer on a boundary
+
+    def _run_block(self,
+        state: int,
+        cells: tList[str],
+        i: int,
+        max_steps: int | None) -> tTuple[int, int, int, int | None, int | None, int]:
+
+        """Runs the machine on a single block's cells, starting at cell i, until the head leaves the block, the machine halts, max_steps steps have been made or (if max_steps is None) the machine is found to loop inside the block.
+        Returns (state, head index within the block, steps, lowest and highest head indices a transition was made at, how the run ended). How it ended is a direction if the head left the block, EXIT_HALT, EXIT_LOOP or None if max_steps was reached.
+        N.B. if the machine loops, the head index is replaced by the step the loop started at, so the loop's period is steps minus it."""
+
+        table_get = self.machine.transition_table.get;
+        k = len(cells);
+
+        steps = 0;
+        lo = None;
+        hi = None;
+
+        seen = {} if max_steps == None else None; # Configuration -> step it was seen at
+
+        while (max_steps == None) or (steps < max_steps):
+
+            if i < 0:
+                return state, i, steps, lo, hi, DIR_LEFT;
+
+            if i >= k:
+                return state, i, steps, lo, hi, DIR_RIGHT;
+
+            t = table_get((state, cells[i]));
+
+            if t is None:
+                return state, i, steps, lo, hi, EXIT_HALT;
+
+            if seen != None:
+
+                configuration = (state, i, tuple(cells));
+
+                if configuration in seen:
+                    return state, seen[configuration], steps, lo, hi, EXIT_LOOP;
+
+                seen[configuration] = steps;
+
+            if (lo == None) or (i < lo):
+                lo = i;
+
+            if (hi == None) or (i > hi):
+                hi = i;
+
+            cells[i] = t.write_symbol;
+            i += t.head_move;
+            state = t.end;
+
+            steps += 1;
+
+        return state, i, steps, lo, hi, None;
+
+    def _get_macro_step(self,
+        state: int,
+        block_id: int,
+        direction: int) -> tuple:
+
+        """Gets (new block ID, new state, how the step ended, steps, lowest and highest indices written, head index within the block) for entering a block in the provided state and direction"""
+
+        key = (state, block_id, direction);
+        out = self._cache.get(key);
+
+        if out == None:
+
+            cells = list(self._blocks[block_id]);
+
+            new_state, i, steps, lo, hi, ending = self._run_block(state, cells, 0 if direction == DIR_RIGHT else self.block_size - 1, None);
+
+            out = self._cache[key] = (self._intern_block(tuple(cells)), new_state, ending, steps, lo, hi, i);
+
+        return out;
+
+    def run(self,
+        max_steps: int | None = None) -> RunResult:
+
+        """Runs the machine until it halts, until max_steps transitions have been made in total or, without a step limit, until it is found to never halt, then writes the final tape back to the tape and returns the result"""
+
+        if self._reload_needed:
+            self._load_tape();
+
+        k = self.block_size;
+        blank_block = self._blank_block;
+        get_macro_step = self._get_macro_step;
+
+        left = self._left;
+        right = self._right;
+
+        state = self.state;
+        steps = self.steps;
+        macro_steps = self.macro_steps;
+        pos = self._pos;
+        direction = self._dir;
+        start = self._start;
+        end = self._end;
+
+        current = None; # (block cells, base index, head index) if the run ends part way through a block
+
+        while not self.halted:
+
+            remaining = None if max_steps == None else max_steps - steps;
+
+            if remaining == 0:
+                break;
+
+            # Once the machine is found to never halt only runs with a step limit carry on, so that they stop on the same step as the engine would
+
+            if (remaining == None) and self.never_halts:
+                break;
+
+            # Take the block the head is about to enter
+
+            stack = right if direction == DIR_RIGHT else left;
+
+            if len(stack) > 0:
+                block_id, count = stack[-1];
+            else:
+                block_id, count = blank_block, None; # Blank forever
+
+            base = pos if direction == DIR_RIGHT else pos - k;
+
+            new_block_id, new_state, ending, block_steps, lo, hi, i = get_macro_step(state, block_id, direction);
+
+            # N.B. the engine only finds that the machine has halted if it has steps left to try making, so a halt on the last allowed step isn't reported
+
+            out_of_steps = (remaining != None) and ((block_steps > remaining) or ((ending == EXIT_HALT) and (block_steps == remaining)));
+
+            if (ending in (EXIT_HALT, EXIT_LOOP)) or out_of_steps:
+
+                # The run ends inside this block, so take it off the tape to be written back separately
+
+                if count != None:
+
+                    if count > 1:
+                        stack[-1][1] -= 1;
+                    else:
+                        stack.pop();
+
+                entry = 0 if direction == DIR_RIGHT else k - 1;
+
+                if out_of_steps:
+
+                    # Finish by running what is left of the steps one at a time
+
+                    cells = list(self._blocks[block_id]);
+                    state, i, done, lo, hi, _ = self._run_block(state, cells, entry, remaining);
+
+                    steps += done;
+
+                elif ending == EXIT_HALT:
+
+                    cells = list(self._blocks[new_block_id]);
+                    state = new_state;
+
+                    steps += block_steps;
+                    macro_steps += 1;
+
+                    self.halted = True;
+
+                elif remaining != None:
+
+                    # Loops inside the block until out of steps, so skip the whole periods of the loop. Every cell the loop touches has been touched by the time it was found
+
+                    loop_start = i;
+                    period = block_steps - loop_start;
+
+                    cells = list(self._blocks[block_id]);
+                    state, i, _, _, _, _ = self._run_block(state, cells, entry, loop_start + ((remaining - loop_start) % period));
+
+                    steps += remaining;
+
+                    self.never_halts = True;
+
+                else:
+
+                    # Left just before entering the block, as the machine would run forever inside it
+
+                    cells = list(self._blocks[block_id]);
+                    i = entry;
+                    lo = None;
+
+                    self.never_halts = True;
+
+                if lo != None:
+                    start = min(start, base + lo);
+                    end = max(end, base + hi);
+
+                current = (cells, base, i);
+                break;
+
+            # Pass over every copy of the block at once if the machine comes out of the far side in the same state
+
+            if (ending == direction) and (new_state == state):
+
+                if count == None:
+
+                    self.never_halts = True;
+
+                    if remaining == None:
+                        break;
+
+                    n = remaining // block_steps;
+
+                elif remaining != None:
+                    n = min(count, remaining // block_steps);
+
+                else:
+                    n = count;
+
+            else:
+                n = 1;
+
+            # Remove the blocks passed over and put down what they were changed to
+
+            if count != None:
+
+                if count > n:
+                    stack[-1][1] -= n;
+                else:
+                    stack.pop();
+
+            self._push(left if ending == DIR_RIGHT else right, new_block_id, n);
+
+            if direction == DIR_RIGHT:
+                start = min(start, base + lo);
+                end = max(end, base + ((n - 1) * k) + hi);
+            else:
+                start = min(start, base - ((n - 1) * k) + lo);
+                end = max(end, base + hi);
+
+            if ending == direction:
+                pos += n * k * direction;
+
+            steps += n * block_steps;
+            macro_steps += 1;
+            state = new_state;
+            direction = ending;
+
+        # Write state back
+
+        self.state = state;
+        self.steps = steps;
+        self.macro_steps = macro_steps;
+        self._pos = pos;
+        self._dir = direction;
+        self._start = start;
+        self._end = end;
+
+        if current != None:
+
+            # Stopped inside a block. The blocks are split again around the head from the written back tape if the run is continued
+
+            cells, base, i = current;
+
+            self._write_tape(cells, base, base + i);
+            self._reload_needed = True;
+
+        else:
+            self._write_tape(None, None, pos if direction == DIR_RIGHT else pos - 1);
+
+        return self.get_result();
+
+    def _expand(self,
+        stack: tList[tList[int]]) -> tList[str]:
+
+        """Gets the cells of the runs in a stack, in the order the runs are in"""
+
+        blocks = self._blocks;
+        out = [];
+
+        for block_id, count in stack:
+            out.extend(blocks[block_id] * count);
+
+        return out;
+
+    def _write_tape(self,
+        cells: tList[str] | None,
+        base: int | None,
+        head: int) -> None:
+
+        """Writes the macro machine's tape back to the tape the engine was created with. cells is the block the head is in, if the run ended part way through one, and base is its first index."""
+
+        tape = self.tape;
+        default_symbol = tape.get_default_symbol();
+
+        left_cells = self._expand(self._left);
+        right_cells = self._expand(self._right[::-1]);
+
+        middle = cells if cells != None else [];
+        boundary = base if cells != None else self._pos;
+
+        all_cells = left_cells + middle + right_cells;
+        first = boundary - len(left_cells);
+
+        for i in range(self._start, self._end + 1):
+
+            j = i - first;
+            tape.set(i, all_cells[j] if 0 <= j < len(all_cells) else default_symbol);
+
+        tape.head_to(head);
+
+    def get_result(self) -> RunResult:
+
+        tape_start, _ = self.tape.get_bounds();
+
+        return RunResult(
+            halted = self.halted,
+            state = self.state,
+            steps = self.steps,
+            head = self.tape.head,
+            tape_start = tape_start,
+            tape_cells = self.tape.read_all(),
+            cycle_start = None,
+            cycle_period = None,
+            never_halts = self.never_halts
+        );
+
+def run_macro_machine(machine: Machine,
+    tape: Tape,
+    start_state: int = 0,
+    max_steps: int | None = None,
+    block_size: int = MACRO_DEFAULT_BLOCK_SIZE) -> RunResult:
+
+    """Runs a machine on a tape as a macro machine until it halts, until max_steps transitions have been made or, without a step limit, until it is found to never halt. Gives the same result as run_machine, with never_halts set if the machine was found to never halt."""
+
+    return MacroEngine(machine, tape, start_state, block_size).run(max_steps);
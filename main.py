@@ -14,16 +14,37 @@ CONTROLS_WINDOW_RECT = Rect((0, 700), (1000, 100));
 BG_COLOR = (255, 255, 255);
 
 KEYBINDINGS = Keybinding(
-    delete_bind = pygame.K_d
+    delete_bind = pygame.K_d,
+    seek_bind = pygame.K_g,
+    turbo_bind = pygame.K_t,
+    profile_bind = pygame.K_p,
+    export_profile_bind = pygame.K_e,
+    speed_up_bind = pygame.K_RIGHTBRACKET,
+    slow_down_bind = pygame.K_LEFTBRACKET,
+    pan_left_bind = pygame.K_LEFT,
+    pan_right_bind = pygame.K_RIGHT,
+    pan_up_bind = pygame.K_UP,
+    pan_down_bind = pygame.K_DOWN,
+    zoom_in_bind = pygame.K_EQUALS,
+    zoom_out_bind = pygame.K_MINUS
 );
 
 FRAMERATE = 20;
 
 MINIMUM_STATE_SEPARATION_MULTIPLIER = 3;
 
-# How long (in seconds) to wait between stepping between states when running the machine
+# How long (in seconds) to wait between stepping between states when running the machine. Used to pick the initial run speed, which can then be changed with the speed keybindings. 0 runs as many steps as fit in a frame
 MACHINE_RUN_CHANGE_DELAY = 1;
 
+# Whether to check for the machine entering a cycle (and so never halting) when running it
+MACHINE_RUN_DETECT_CYCLES = True;
+
+# How many steps apart to record checkpoints when running the machine, for stepping back and seeking. More checkpoints make seeking faster but use more memory
+MACHINE_RUN_CHECKPOINT_INTERVAL = 1000;
+
+# The most checkpoints to keep. If there would be more, every other one is dropped and the interval between them is doubled
+MACHINE_RUN_MAX_CHECKPOINTS = 1000;
+
 def main():
 
     controller = MainController(
@@ -36,7 +57,10 @@ def main():
         keybindings = KEYBINDINGS,
         framerate = FRAMERATE,
         state_minimum_separation_factor = MINIMUM_STATE_SEPARATION_MULTIPLIER,
-        run_change_delay = MACHINE_RUN_CHANGE_DELAY
+        run_change_delay = MACHINE_RUN_CHANGE_DELAY,
+        detect_cycles = MACHINE_RUN_DETECT_CYCLES,
+        checkpoint_interval = MACHINE_RUN_CHECKPOINT_INTERVAL,
+        max_checkpoints = MACHINE_RUN_MAX_CHECKPOINTS
     );
 
     controller.run_main_loop();
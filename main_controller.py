@@ -1,9 +1,10 @@
 from typing import Tuple as tTuple;
+from typing import List as tList;
 from time import time as now;
-from pygame import Rect, Vector2;
+from pygame import Rect, Vector2, Surface;
 from pygame.event import Event;
 import pygame;
-from tkinter.filedialog import asksaveasfile, askopenfile;
+from tkinter.filedialog import asksaveasfile, asksaveasfilename, askopenfile;
 
 from keybindings import Keybinding;
 
@@ -11,10 +12,13 @@ from machine import Machine;
 from tape import Tape, TAPE_DEFAULT_SYMBOL;
 from machine_serializer import MachineSerializer, MACHINE_FILETYPES, MACHINE_FILE_EXTENSION;
 from tape_files import try_read_tape, TAPE_FILETYPES;
+from engine import Engine;
+from turbo_runner import TurboRunner;
+from profiler import PROFILE_FILETYPES, PROFILE_FILE_EXTENSION;
 
 from options_window import OptionsWindow;
 from machine_window import MachineWindow, STATE_WIDTH;
-from tape_window import TapeWindow;
+from tape_window import TapeWindow, SYMBOLS_SHOWN_EACH_SIDE;
 from controls_window import ControlsWindow;
 
 import popup;
@@ -29,6 +33,35 @@ RUN_MODE_STOPPED = 0x00;
 RUN_MODE_PLAYING = 0x01;
 RUN_MODE_PAUSED = 0x02;
 
+RUN_SPEED_STEPS_PER_SECOND = 0x00; # Run a fixed number of steps per second
+RUN_SPEED_FRAME_BUDGET = 0x01; # Run as many steps as fit in a number of milliseconds each frame
+
+# Run speeds that can be switched between, slowest first, as (kind, value) where value is steps per second or milliseconds per frame depending on the kind
+RUN_SPEEDS = [
+    (RUN_SPEED_STEPS_PER_SECOND, 1),
+    (RUN_SPEED_STEPS_PER_SECOND, 2),
+    (RUN_SPEED_STEPS_PER_SECOND, 5),
+    (RUN_SPEED_STEPS_PER_SECOND, 10),
+    (RUN_SPEED_STEPS_PER_SECOND, 20),
+    (RUN_SPEED_STEPS_PER_SECOND, 50),
+    (RUN_SPEED_STEPS_PER_SECOND, 100),
+    (RUN_SPEED_STEPS_PER_SECOND, 1000),
+    (RUN_SPEED_STEPS_PER_SECOND, 10000),
+    (RUN_SPEED_FRAME_BUDGET, 5),
+    (RUN_SPEED_FRAME_BUDGET, 20),
+    (RUN_SPEED_FRAME_BUDGET, 40)
+];
+
+RUN_MAX_FRAME_TIME = 0.04; # Most time (in seconds) spent running the machine each frame at steps-per-second speeds. If steps can't be run fast enough, the run falls behind rather than slowing the frame rate
+RUN_CHUNK_STEPS = 256; # Number of steps run between checking whether a frame's time is up
+
+HEATMAP_UPDATE_INTERVAL = 0.5; # Least time (in seconds) between updating the machine window's heatmap while running, as it goes through all of the window's sprites
+
+CAMERA_PAN_STEP = 50; # How far (in window pixels) the machine window's view moves per key press
+CAMERA_ZOOM_STEP = 1.25; # Factor the machine window's view is zoomed by per key press or scroll wheel notch
+
+MOUSE_WHEEL_BUTTONS = (4, 5); # Mouse buttons that pygame also reports scroll wheel movement as
+
 # A class wasn't created for the main window directly as the main window must be created with pygame.display.set_mode so instead a controller class for main program has been made
 
 class MainController:
@@ -43,7 +76,10 @@ class MainController:
         keybindings: Keybinding,
         framerate: int,
         state_minimum_separation_factor: float,
-        run_change_delay: float):
+        run_change_delay: float,
+        detect_cycles: bool = False,
+        checkpoint_interval: int = 1000,
+        max_checkpoints: int | None = None):
 
         # Initialise pygame if not already done
 
@@ -91,7 +127,10 @@ class MainController:
 
         self.framerate = framerate;
         self.state_minimum_separation_factor = state_minimum_separation_factor;
-        self.run_change_delay = run_change_delay;
+        self.run_speed_index = MainController.find_run_speed_index(run_change_delay);
+        self.detect_cycles = detect_cycles;
+        self.checkpoint_interval = checkpoint_interval;
+        self.max_checkpoints = max_checkpoints;
 
         # Create window
 
@@ -145,10 +184,19 @@ class MainController:
         self.run_mode = RUN_MODE_STOPPED;
         self.run_curr_state = 0;
         self.run_next_move_time = 0;
+        self.engine = None;
+
+        self.turbo = False; # Whether to run the machine as fast as possible on another thread when playing
+        self.turbo_runner = None; # Set while the machine is being run on another thread
+        self.turbo_shown_steps = None; # Step count of the last snapshot shown from the turbo runner
+
+        self.profiling = False; # Whether to count how many times each transition is made and show the counts as a heatmap
+        self.heatmap_next_update_time = 0;
 
         # Prepare main loop
 
         self.running = True;
+        self.full_redraw_needed = True; # Whether the whole window needs drawing, such as on the first frame
 
     def cleanup(self):
 
@@ -184,15 +232,7 @@ class MainController:
     def check_can_create_state_in_pos(self,
         pos: Vector2) -> bool:
 
-        for s in self.machine.states:
-
-            disp = s.pos - pos;
-            dist = disp.magnitude();
-
-            if dist <= (STATE_WIDTH * self.state_minimum_separation_factor):
-                return False;
-
-        return True;
+        return not self.machine.check_any_state_within(pos, STATE_WIDTH * self.state_minimum_separation_factor);
 
     def set_machine(self, m: Machine) -> None:
         self.machine = m;
@@ -218,8 +258,17 @@ class MainController:
     # Main loop
 
     def stop_main_loop(self) -> None:
+        self.stop_turbo_runner();
         self.running = False;
 
+    def get_sub_windows(self) -> tList[tTuple[Surface, Rect]]:
+        return [
+            (self.options_window, self.options_window_rect),
+            (self.machine_window, self.machine_window_rect),
+            (self.tape_window, self.tape_window_rect),
+            (self.controls_window, self.controls_window_rect)
+        ];
+
     def run_main_loop(self) -> None:
 
         while self.running:
@@ -233,32 +282,234 @@ class MainController:
             # Update running machine
             self.update_run_machine();
 
-            # Clear main window
-            self.window.fill(self.bg_color);
+            # Re-composite sub-windows that have changed
+            self.machine_window.redraw_if_dirty();
+
+            # Collect changed areas of the sub-windows, relative to the main window
+
+            dirty_rects = [];
+            dirty_areas = [];
+
+            for window, rect in self.get_sub_windows():
+
+                for r in window.pop_dirty_rects():
+                    dirty_areas.append((window, rect, r));
+                    dirty_rects.append(r.move(rect.topleft).clip(rect));
+
+            if self.full_redraw_needed:
+
+                # Clear main window
+                self.window.fill(self.bg_color);
+
+                # Blit sub-windows onto main window
+
+                for window, rect in self.get_sub_windows():
+                    self.window.blit(window, rect.topleft);
+
+                # Flip display
+
+                pygame.display.flip();
+
+                self.full_redraw_needed = False;
+
+            elif len(dirty_rects) > 0:
+
+                # Blit only the changed areas of sub-windows onto main window
+
+                for window, rect, r in dirty_areas:
+                    self.window.blit(window, r.move(rect.topleft).topleft, area = r);
+
+                # Update only the changed areas of the display
+
+                pygame.display.update(dirty_rects);
+
+            elif self.run_mode != RUN_MODE_PLAYING:
+
+                # Nothing is changing so wait for an event instead of ticking at the framerate
+
+                self.handle_pygame_evt(pygame.event.wait());
+
+    def start_turbo_runner(self) -> None:
+
+        """Starts running the engine on another thread. Until the runner is stopped, the windows show its snapshots and the engine and tape mustn't be used."""
+
+        self.turbo_runner = TurboRunner(self.engine, SYMBOLS_SHOWN_EACH_SIDE);
+        self.turbo_shown_steps = None;
+
+        # Show the runner's first snapshot straight away so that nothing refreshing the tape window reads the tape while the runner is using it
+
+        self.tape_window.show_snapshot(self.turbo_runner.get_snapshot());
+
+        self.turbo_runner.start();
+
+    def stop_turbo_runner(self) -> None:
+
+        """Stops running the engine on another thread, if it is, and goes back to showing the engine's tape"""
+
+        if self.turbo_runner == None:
+            return;
+
+        self.turbo_runner.stop();
+        self.turbo_runner = None;
+
+        self.run_curr_state = self.engine.state;
+        self.machine_window.set_curr_state(self.run_curr_state);
+        self.tape_window.show_snapshot(None);
+
+    def update_turbo_run(self) -> None:
+
+        """Shows the latest snapshot from the turbo runner and handles the run finishing"""
+
+        snapshot = self.turbo_runner.get_snapshot();
+
+        if snapshot.steps != self.turbo_shown_steps:
+
+            self.turbo_shown_steps = snapshot.steps;
+
+            self.run_curr_state = snapshot.state;
+            self.machine_window.set_curr_state(self.run_curr_state);
+            self.tape_window.show_snapshot(snapshot);
+
+            self.machine_window.set_status_text(f"Running in turbo mode. Step {snapshot.steps}.");
+
+        if self.turbo_runner.finished:
+
+            self.stop_turbo_runner();
+
+            # If the machine halted or has been found to never halt, pause machine
 
-            # Blit sub-windows onto main window
-            
-            self.window.blit(self.options_window, self.options_window_rect.topleft);
-            self.window.blit(self.machine_window, self.machine_window_rect.topleft);
-            self.window.blit(self.tape_window, self.tape_window_rect.topleft);
-            self.window.blit(self.controls_window, self.controls_window_rect.topleft);
+            self.run_mode = RUN_MODE_PAUSED;
+
+            if self.engine.halted:
+                self.machine_window.set_status_text(f"Machine halted at step {self.engine.steps}.");
+            else:
+                self.machine_window.set_status_text(f"Entered a cycle at step {self.engine.cycle_start} with period {self.engine.cycle_period}.");
+
+            # Refresh controls button shading
+            self.refresh_control_buttons_shading();
+            self.controls_window.refresh();
+
+        self.update_heatmap(force = self.run_mode != RUN_MODE_PLAYING);
+
+    def update_heatmap(self,
+        force: bool = False) -> None:
+
+        """Shows the engine's profile on the machine window, at most once every HEATMAP_UPDATE_INTERVAL seconds unless forced. N.B. this can be called while the turbo runner is running as the counts are only read."""
+
+        if (not self.profiling) or (self.engine == None) or (self.engine.profile == None):
+            return;
+
+        if (not force) and (now() < self.heatmap_next_update_time):
+            return;
+
+        self.heatmap_next_update_time = now() + HEATMAP_UPDATE_INTERVAL;
+
+        profile = self.engine.profile;
+        self.machine_window.set_heatmap(profile.get_state_counts(), profile.get_pair_counts());
+
+    @staticmethod
+    def find_run_speed_index(run_change_delay: float) -> int:
+
+        """Finds the run speed closest to stepping once every run_change_delay seconds. A delay of 0 gives the slowest frame-budgeted speed."""
+
+        if run_change_delay <= 0:
+            return next(i for i, (kind, _) in enumerate(RUN_SPEEDS) if kind == RUN_SPEED_FRAME_BUDGET);
+
+        steps_per_second = 1 / run_change_delay;
+
+        return min(
+            (i for i, (kind, _) in enumerate(RUN_SPEEDS) if kind == RUN_SPEED_STEPS_PER_SECOND),
+            key = lambda i: abs(RUN_SPEEDS[i][1] - steps_per_second)
+        );
+
+    def get_run_speed(self) -> tTuple[int, float]:
+        return RUN_SPEEDS[self.run_speed_index];
+
+    def get_run_speed_text(self) -> str:
+
+        kind, value = self.get_run_speed();
+
+        if kind == RUN_SPEED_STEPS_PER_SECOND:
+            return f"{value} steps per second";
+        else:
+            return f"as many steps as fit in {value}ms per frame";
+
+    def get_first_move_time(self) -> float:
 
-            # Flip display
+        """Gets when the first step should be made after starting or resuming a run"""
 
-            pygame.display.flip();
+        kind, value = self.get_run_speed();
+
+        if kind == RUN_SPEED_STEPS_PER_SECOND:
+            return now() + (1 / value);
+        else:
+            return now();
+
+    def run_engine_steps(self,
+        max_steps: int | None,
+        deadline: float) -> int:
+
+        """Runs up to max_steps steps (unlimited if None), in chunks, until the time is deadline. Stops early if the machine halts or a cycle is found. Returns the number of steps run."""
+
+        engine = self.engine;
+        cycle_already_found = engine.cycle_period != None;
+
+        total = 0;
+
+        while (max_steps == None) or (total < max_steps):
+
+            chunk = RUN_CHUNK_STEPS if max_steps == None else min(RUN_CHUNK_STEPS, max_steps - total);
+
+            done = engine.run_steps(chunk);
+            total += done;
+
+            if (done < chunk) or ((not cycle_already_found) and (engine.cycle_period != None)):
+                break; # Halted or found a cycle
+
+            if now() >= deadline:
+                break;
+
+        return total;
 
     def update_run_machine(self) -> None:
 
         if self.run_mode != RUN_MODE_PLAYING:
             return; # Don't move if not meant to be running
 
-        if now() < self.run_next_move_time:
-            return; # Don't move until it is time to do so
+        if self.turbo_runner != None:
+            self.update_turbo_run();
+            return; # Machine is being run on another thread
+
+        frame_start = now();
 
-        # Determine next stage for machine and tape
-        out = self.machine.determine_output(self.run_curr_state, self.tape.get_at_head());
+        # Work out how many steps to run this frame and how long they can take
 
-        if out == None:
+        kind, value = self.get_run_speed();
+
+        if kind == RUN_SPEED_STEPS_PER_SECOND:
+
+            if frame_start < self.run_next_move_time:
+                return; # Don't move until it is time to do so
+
+            max_steps = int((frame_start - self.run_next_move_time) * value) + 1; # Steps that have become due since the last frame
+            deadline = frame_start + RUN_MAX_FRAME_TIME;
+
+        else:
+
+            max_steps = None;
+            deadline = frame_start + (value / 1000);
+
+        # Perform the transitions. The tape and current state are only re-rendered once for all of them
+        cycle_already_found = self.engine.cycle_period != None;
+        steps_run = self.run_engine_steps(max_steps, deadline);
+
+        if kind == RUN_SPEED_STEPS_PER_SECOND:
+
+            # Set next move time. If steps couldn't be run fast enough, don't try to catch up on those missed
+
+            self.run_next_move_time = max(self.run_next_move_time + (steps_run / value), now());
+
+        if self.engine.halted:
 
             # If no transitions found, pause machine
 
@@ -268,29 +519,29 @@ class MainController:
             self.refresh_control_buttons_shading();
             self.controls_window.refresh();
 
-        else:
-
-            # Extract output parts
-            next_state, write_symbol, head_move = out;
+        if steps_run > 0:
 
             # Set new state
-            self.run_curr_state = next_state;
+            self.run_curr_state = self.engine.state;
             self.machine_window.set_curr_state(self.run_curr_state);
 
-            # Write symbol to tape
-            self.tape.set_at_head(write_symbol);
+            if (not cycle_already_found) and (self.engine.cycle_period != None):
 
-            # Move tape head
-            self.tape.head_forward(head_move);
+                # If the machine has been found to never halt, pause machine and report the cycle
 
-            # Set next move time
-            self.run_next_move_time = now() + self.run_change_delay;
+                self.run_mode = RUN_MODE_PAUSED;
+                self.machine_window.set_status_text(f"Entered a cycle at step {self.engine.cycle_start} with period {self.engine.cycle_period}.");
 
-        # Refresh tape and machine
+                # Refresh controls button shading
+                self.refresh_control_buttons_shading();
+                self.controls_window.refresh();
+
+        # Refresh tape. The machine window's current state was updated by set_curr_state
 
-        self.machine_window.update_state_sprites();
         self.tape_window.refresh();
 
+        self.update_heatmap(force = self.run_mode != RUN_MODE_PLAYING);
+
     # Checking window mouse is in
 
     def check_mouse_in_options_window(self,
@@ -314,15 +565,27 @@ class MainController:
     def handle_pygame_evts(self) -> None:
 
         for evt in pygame.event.get():
+            self.handle_pygame_evt(evt);
 
-            if evt.type == pygame.QUIT:
-                self.stop_main_loop();
+    def handle_pygame_evt(self,
+        evt: Event) -> None:
 
-            elif evt.type == pygame.MOUSEBUTTONDOWN:
+        if evt.type == pygame.QUIT:
+            self.stop_main_loop();
+
+        elif evt.type == pygame.MOUSEBUTTONDOWN:
+
+            if evt.button not in MOUSE_WHEEL_BUTTONS:
                 self.handle_evt_mousedown();
 
-            elif evt.type == pygame.KEYDOWN:
-                self.handle_evt_keydown(evt);
+        elif evt.type == pygame.MOUSEWHEEL:
+            self.handle_evt_mousewheel(evt);
+
+        elif evt.type == pygame.KEYDOWN:
+            self.handle_evt_keydown(evt);
+
+        elif evt.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+            self.full_redraw_needed = True;
 
     # Handle clicks
 
@@ -376,13 +639,23 @@ class MainController:
 
         if file != None:
 
-            self.machine = MachineSerializer.deserialize(file.read());
+            try:
+                m = MachineSerializer.deserialize(file.read());
+            except Exception:
+                m = None;
 
             file.close();
 
-            self.set_machine(self.machine);
-            self.machine_window.refresh();
-            self.machine_window.set_status_text("Loaded machine.");
+            if m != None:
+
+                self.machine = m;
+
+                self.set_machine(self.machine);
+                self.machine_window.set_status_text("Loaded machine.");
+
+            else:
+
+                self.machine_window.set_status_text("Failed to load machine from file.");
 
     def handle_options_window_load_tape_button(self):
 
@@ -408,6 +681,10 @@ class MainController:
         if self.run_mode != RUN_MODE_STOPPED:
             return; # Can't edit machine while running
 
+        # Click-handling methods for the machine window take positions in the machine, which the window may be panned and zoomed across
+
+        pos = self.machine_window.screen_to_world(pos);
+
         if self.machine_click_mode == CLICK_MODE_CREATE:
             self.handle_machine_window_click_create(pos);
 
@@ -452,6 +729,7 @@ class MainController:
         if clicked_state != None:
 
             self.machine.safe_remove_state(clicked_state.n);
+            self.machine_window.remove_state_sprites(clicked_state.n);
 
             self.machine_window.set_status_text(f"Deleted state {clicked_state.n}.");
 
@@ -489,7 +767,7 @@ class MainController:
 
                 if success:
 
-                    self.machine_window.refresh();
+                    self.machine_window.refresh_transitions_between(self.transition_create_start, end_state);
 
                     self.machine_window.set_status_text(f"Created transition from {self.transition_create_start.n} to {end_state.n}.");
 
@@ -512,13 +790,17 @@ class MainController:
         elif self.controls_window.pos_in_stop_button(pos):
             self.handle_controls_window_stop_button();
 
+        elif self.controls_window.pos_in_step_back_button(pos):
+            self.handle_controls_window_step_back_button();
+
         # Refresh control button shading
         self.refresh_control_buttons_shading();
 
-        # Refresh windows
+        # Refresh windows. N.B. while the turbo runner is running, the tape window shows its latest snapshot rather than reading the tape
         self.controls_window.refresh();
         self.machine_window.update_state_sprites();
         self.tape_window.refresh();
+        self.update_heatmap(force = True);
 
     def handle_controls_window_play_button(self) -> None:
 
@@ -535,25 +817,45 @@ class MainController:
                 # Start at state 0
                 self.run_curr_state = 0;
                 self.machine_window.set_curr_state(self.run_curr_state);
+
+                # Create engine to run the machine on the tape
+                self.engine = Engine(
+                    machine = self.machine,
+                    tape = self.tape,
+                    start_state = self.run_curr_state,
+                    detect_cycles = self.detect_cycles,
+                    checkpoint_interval = self.checkpoint_interval,
+                    max_checkpoints = self.max_checkpoints,
+                    profile = self.profiling
+                );
                 
                 # Prepare to change state
-                self.run_next_move_time = now() + self.run_change_delay;
+                self.run_next_move_time = self.get_first_move_time();
+
+                if self.turbo:
+                    self.start_turbo_runner();
 
         elif self.run_mode == RUN_MODE_PAUSED:
 
             self.run_mode = RUN_MODE_PLAYING;
 
-            self.run_next_move_time = now() + self.run_change_delay;
+            self.run_next_move_time = self.get_first_move_time();
+
+            if self.turbo:
+                self.start_turbo_runner();
 
     def handle_controls_window_pause_button(self) -> None:
 
         if self.run_mode == RUN_MODE_PLAYING:
+            self.stop_turbo_runner();
             self.run_mode = RUN_MODE_PAUSED;
 
     def handle_controls_window_stop_button(self) -> None:
 
         if self.run_mode in (RUN_MODE_PLAYING, RUN_MODE_PAUSED):
 
+            self.stop_turbo_runner();
+
             self.run_mode = RUN_MODE_STOPPED;
 
             # Set current run state to initial state
@@ -564,6 +866,37 @@ class MainController:
             self.tape.load_initial_state();
             self.tape.head_to(0);
 
+            self.engine = None;
+
+    def handle_controls_window_step_back_button(self) -> None:
+
+        if self.run_mode in (RUN_MODE_PLAYING, RUN_MODE_PAUSED):
+
+            self.stop_turbo_runner();
+
+            self.run_mode = RUN_MODE_PAUSED;
+
+            self.engine.step_back();
+
+            self.run_curr_state = self.engine.state;
+            self.machine_window.set_curr_state(self.run_curr_state);
+
+            self.machine_window.set_status_text(f"Stepped back to step {self.engine.steps}.");
+
+    # Handle scrolling
+
+    def handle_evt_mousewheel(self,
+        evt: Event) -> None:
+
+        mouse_pos = Vector2(pygame.mouse.get_pos());
+
+        if self.check_mouse_in_machine_window(mouse_pos) and (evt.y != 0):
+
+            self.machine_window.zoom_camera(
+                CAMERA_ZOOM_STEP ** evt.y,
+                MainController.global_pos_to_rect_relative(mouse_pos, self.machine_window_rect)
+            );
+
     # Handle key presses
 
     def handle_evt_keydown(self,
@@ -572,6 +905,42 @@ class MainController:
         if evt.key == self.keybindings.delete_bind:
             self.handle_delete_key_pressed();
 
+        elif evt.key == self.keybindings.seek_bind:
+            self.handle_seek_key_pressed();
+
+        elif evt.key == self.keybindings.turbo_bind:
+            self.handle_turbo_key_pressed();
+
+        elif evt.key == self.keybindings.profile_bind:
+            self.handle_profile_key_pressed();
+
+        elif evt.key == self.keybindings.export_profile_bind:
+            self.handle_export_profile_key_pressed();
+
+        elif evt.key == self.keybindings.speed_up_bind:
+            self.handle_change_speed_key_pressed(1);
+
+        elif evt.key == self.keybindings.slow_down_bind:
+            self.handle_change_speed_key_pressed(-1);
+
+        elif evt.key == self.keybindings.pan_left_bind:
+            self.machine_window.pan_camera(-CAMERA_PAN_STEP, 0);
+
+        elif evt.key == self.keybindings.pan_right_bind:
+            self.machine_window.pan_camera(CAMERA_PAN_STEP, 0);
+
+        elif evt.key == self.keybindings.pan_up_bind:
+            self.machine_window.pan_camera(0, -CAMERA_PAN_STEP);
+
+        elif evt.key == self.keybindings.pan_down_bind:
+            self.machine_window.pan_camera(0, CAMERA_PAN_STEP);
+
+        elif evt.key == self.keybindings.zoom_in_bind:
+            self.handle_zoom_key_pressed(CAMERA_ZOOM_STEP);
+
+        elif evt.key == self.keybindings.zoom_out_bind:
+            self.handle_zoom_key_pressed(1 / CAMERA_ZOOM_STEP);
+
     def handle_delete_key_pressed(self) -> None:
 
         if self.machine_click_mode == CLICK_MODE_CREATE:
@@ -583,3 +952,115 @@ class MainController:
 
             self.machine_click_mode = CLICK_MODE_CREATE;
             self.machine_window.set_status_text("Switched to create mode.");
+
+    def handle_zoom_key_pressed(self,
+        factor: float) -> None:
+
+        # Zoom around the center of the machine window
+
+        self.machine_window.zoom_camera(factor, Vector2(self.machine_window.get_rect().center));
+
+    def handle_change_speed_key_pressed(self,
+        change: int) -> None:
+
+        self.run_speed_index = min(max(self.run_speed_index + change, 0), len(RUN_SPEEDS) - 1);
+
+        # Start timing from the new speed
+
+        self.run_next_move_time = self.get_first_move_time();
+
+        self.machine_window.set_status_text(f"Run speed: {self.get_run_speed_text()}.");
+
+    def handle_turbo_key_pressed(self) -> None:
+
+        self.turbo = not self.turbo;
+
+        # Switch how the machine is being run if it is playing
+
+        if self.run_mode == RUN_MODE_PLAYING:
+
+            if self.turbo:
+                self.start_turbo_runner();
+
+            else:
+                self.stop_turbo_runner();
+                self.run_next_move_time = self.get_first_move_time();
+
+        self.machine_window.set_status_text("Turbo mode on." if self.turbo else "Turbo mode off.");
+
+    def handle_profile_key_pressed(self) -> None:
+
+        self.profiling = not self.profiling;
+
+        # The engine's profile can't be changed while the turbo runner is using it, so stop the runner and start it again afterwards
+
+        was_turbo_running = self.turbo_runner != None;
+        self.stop_turbo_runner();
+
+        if self.profiling:
+
+            # Start counting straight away if the machine is running
+
+            if self.engine != None:
+                self.engine.enable_profiling();
+                self.update_heatmap(force = True);
+
+            self.machine_window.set_status_text("Profiling on. Transitions are counted from now on.");
+
+        else:
+
+            if self.engine != None:
+                self.engine.disable_profiling();
+
+            self.machine_window.set_heatmap(None, None);
+            self.machine_window.set_status_text("Profiling off.");
+
+        if was_turbo_running:
+            self.start_turbo_runner();
+
+    def handle_export_profile_key_pressed(self) -> None:
+
+        if (self.engine == None) or (self.engine.profile == None):
+            self.machine_window.set_status_text("Nothing to export. Turn profiling on and run the machine first.");
+            return;
+
+        path = asksaveasfilename(defaultextension = PROFILE_FILE_EXTENSION, filetypes = PROFILE_FILETYPES);
+
+        if path:
+
+            with open(path, "w", newline = "") as file:
+                self.engine.profile.write_csv(file);
+
+            self.machine_window.set_status_text("Exported profile.");
+
+    def handle_seek_key_pressed(self) -> None:
+
+        if self.run_mode not in (RUN_MODE_PLAYING, RUN_MODE_PAUSED):
+            return; # Can only seek while running
+
+        step = popup.run_seek_form();
+
+        if step == None:
+            return;
+
+        self.stop_turbo_runner();
+
+        self.run_mode = RUN_MODE_PAUSED;
+
+        self.engine.seek(step);
+
+        self.run_curr_state = self.engine.state;
+        self.machine_window.set_curr_state(self.run_curr_state);
+
+        if self.engine.steps == max(step, 0):
+            self.machine_window.set_status_text(f"Moved to step {self.engine.steps}.");
+        else:
+            self.machine_window.set_status_text(f"Machine halted at step {self.engine.steps}.");
+
+        # Refresh windows
+
+        self.refresh_control_buttons_shading();
+        self.controls_window.refresh();
+        self.machine_window.update_state_sprites();
+        self.tape_window.refresh();
+        self.update_heatmap(force = True);
@@ -1,7 +1,7 @@
 from typing import Callable as tCallable;
 from typing import Tuple as tTuple;
 from typing import List as tList;
-from pygame import Surface, Vector2;
+from pygame import Surface, Vector2, Rect;
 import pygame;
 
 from options_button_sprite import OptionsButtonSprite;
@@ -86,6 +86,19 @@ class OptionsWindow(Surface):
 
         self.button_sprites.draw(self);
 
+        # Whole window has changed
+
+        self.dirty_rects = [self.get_rect()];
+
+    def pop_dirty_rects(self) -> tList[Rect]:
+
+        """Gets the areas of the window that have changed since this was last called"""
+
+        rects = self.dirty_rects;
+        self.dirty_rects = [];
+
+        return rects;
+
     def get_nth_button_center_pos(self,
         n: int):
         return (
@@ -94,6 +94,65 @@ def run_transition_form() -> tTuple[str, str, int] | None:
     
     return output;
 
+def run_seek_form() -> int | None:
+
+    # Set up window
+
+    window = tk.Tk();
+
+    window.title("Seek to Step");
+    window.geometry("256x64");
+
+    # Create enter callback
+
+    def enter_callback() -> None:
+        window.quit();
+
+    # Create entry variables
+
+    step_var = tk.StringVar();
+
+    # Create widgets
+
+    lbl_step = tk.Label(window, text = "Step");
+    ety_step = tk.Entry(window, textvariable = step_var, validate = "key", validatecommand = (window.register(str_is_int), "%P"));
+
+    btn_submit = tk.Button(window, text = "Enter", command = enter_callback);
+
+    # Bind return key to enter button callback
+
+    window.bind("<Return>", lambda evt: enter_callback());
+
+    # Place widgets in window
+
+    lbl_step.grid(row = 0, column = 0);
+    ety_step.grid(row = 0, column = 1);
+
+    btn_submit.grid(row = 1, column = 1);
+
+    # Run window until it closes
+
+    ety_step.focus_set();
+    window.mainloop();
+
+    # Check if window was closed by trying to read variable
+
+    try:
+        ety_step.get();
+    except tk.TclError:
+        return None;
+
+    # Close window and return value
+
+    step = step_var.get();
+
+    window.destroy();
+
+    if step in ("", "-"):
+        return None;
+
+    return int(step);
+
 if __name__ == "__main__":
 
     # This should only run when debugging
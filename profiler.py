@@ -0,0 +1,109 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from typing import Dict as tDict;
+from array import array;
+import csv;
+
+from machine import Machine, Transition;
+
+# Counts how many times each transition of a machine is made while it runs. Transitions are given dense IDs when the profile is created so that counting a step is one array increment
+# N.B. like the engine, this module must not import pygame or tkinter
+
+PROFILE_FILE_EXTENSION = ".csv";
+PROFILE_FILETYPES = [("CSV", f"*{PROFILE_FILE_EXTENSION}"), ("All Files", "*.*")];
+
+PROFILE_CSV_FIELDS = ["kind", "state", "start", "end", "read_symbol", "write_symbol", "head_move", "count"];
+
+class TransitionProfile:
+
+    def __init__(self,
+        machine: Machine):
+
+        # Only the transitions in the transition table can ever be made
+
+        self.transitions = list(machine.transition_table.values());
+        self.ids = {t: i for i, t in enumerate(self.transitions)};
+
+        # (state, read symbol) -> (write symbol, head move, end state, transition ID) for the engine's profiling loop
+
+        self.compiled = {
+            key: (t.write_symbol, t.head_move, t.end, self.ids[t])
+            for key, t in machine.transition_table.items()
+        };
+
+        self.counts = array("Q", bytes(8 * len(self.transitions))); # Transition ID -> number of times made
+        self.halt_counts = {}; # State -> number of times the machine halted in it
+
+    def reset(self) -> None:
+
+        for i in range(len(self.counts)):
+            self.counts[i] = 0;
+
+        self.halt_counts.clear();
+
+    def add_halt(self,
+        state: int) -> None:
+        self.halt_counts[state] = self.halt_counts.get(state, 0) + 1;
+
+    def get_transition_counts(self) -> tList[tTuple[Transition, int]]:
+        return list(zip(self.transitions, self.counts));
+
+    def get_state_counts(self) -> tDict[int, int]:
+
+        """Gets the number of visits to each state that has had any, which is the number of steps made from it plus the number of times the machine halted in it"""
+
+        out = dict(self.halt_counts);
+
+        for t, count in zip(self.transitions, self.counts):
+
+            if count > 0:
+                out[t.start] = out.get(t.start, 0) + count;
+
+        return out;
+
+    def get_pair_counts(self) -> tDict[tTuple[int, int], int]:
+
+        """Gets the number of steps made between each pair of states (smaller number first), in either direction, that has had any made between them"""
+
+        out = {};
+
+        for t, count in zip(self.transitions, self.counts):
+
+            if count > 0:
+                pair = (t.start, t.end) if t.start <= t.end else (t.end, t.start);
+                out[pair] = out.get(pair, 0) + count;
+
+        return out;
+
+    def get_total(self) -> int:
+        return sum(self.counts);
+
+    def write_csv(self,
+        file) -> None:
+
+        """Writes a row for each state with its count of visits and then a row for each transition with its count of times made. The file should be opened with newline = "" as for any CSV file."""
+
+        writer = csv.DictWriter(file, fieldnames = PROFILE_CSV_FIELDS);
+        writer.writeheader();
+
+        state_counts = self.get_state_counts();
+
+        for n in sorted(set(t.start for t in self.transitions) | set(self.halt_counts.keys())):
+
+            writer.writerow({
+                "kind": "state",
+                "state": n,
+                "count": state_counts.get(n, 0)
+            });
+
+        for t, count in self.get_transition_counts():
+
+            writer.writerow({
+                "kind": "transition",
+                "start": t.start,
+                "end": t.end,
+                "read_symbol": t.read_symbol,
+                "write_symbol": t.write_symbol,
+                "head_move": t.head_move,
+                "count": count
+            });
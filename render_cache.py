@@ -0,0 +1,81 @@
+from typing import Tuple as tTuple;
+from collections import OrderedDict;
+from pygame import Surface;
+import pygame;
+
+RENDER_CACHE_MAX_SIZE = 1024; # Maximum number of rendered text surfaces kept
+
+class RenderCache:
+
+    """A bounded least-recently-used cache of rendered text surfaces.
+
+    N.B. surfaces returned are shared between callers so must not be drawn on."""
+
+    def __init__(self,
+        max_size: int = RENDER_CACHE_MAX_SIZE):
+
+        self.max_size = max_size;
+
+        self._surfaces = OrderedDict();
+
+        self.hits = 0;
+        self.misses = 0;
+
+    def render(self,
+        font: pygame.font.Font,
+        text: str,
+        antialias: bool,
+        color: tTuple[int, int, int],
+        background: tTuple[int, int, int] | None = None) -> Surface:
+
+        """Gets the surface for the text, as would be given by font.render, rendering it only if it isn't cached"""
+
+        key = (font, text, color, antialias, background);
+
+        surface = self._surfaces.get(key);
+
+        if surface != None:
+
+            self.hits += 1;
+            self._surfaces.move_to_end(key);
+
+            return surface;
+
+        self.misses += 1;
+
+        surface = font.render(text, antialias, color, background);
+
+        self._surfaces[key] = surface;
+
+        if len(self._surfaces) > self.max_size:
+            self._surfaces.popitem(last = False);
+
+        return surface;
+
+    def get_hit_rate(self) -> float:
+
+        total = self.hits + self.misses;
+
+        return (self.hits / total) if total > 0 else 0;
+
+    def reset_counters(self) -> None:
+        self.hits = 0;
+        self.misses = 0;
+
+    def clear(self) -> None:
+        self._surfaces.clear();
+        self.reset_counters();
+
+# Cache shared by all the windows and sprites
+
+TEXT_CACHE = RenderCache();
+
+def render_text(font: pygame.font.Font,
+    text: str,
+    antialias: bool,
+    color: tTuple[int, int, int],
+    background: tTuple[int, int, int] | None = None) -> Surface:
+
+    """Renders text using the shared cache"""
+
+    return TEXT_CACHE.render(font, text, antialias, color, background);
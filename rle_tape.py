@@ -0,0 +1,276 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from collections import deque;
+
+from machine import SYMBOL_MAX_LENGTH;
+
+# A tape that stores maximal runs of the same symbol instead of single cells, for machines that write long stretches of the same symbol. It can be used anywhere a Tape can be.
+# The runs are held as a zipper around a cursor: the run the cursor is in, and deques of the runs to its left and right, nearest last. Reading and writing near the cursor only touches the ends of the deques so is O(1) amortized, and the cursor follows the cells being accessed, which for a running machine is the head
+
+class RleTape:
+
+    """A tape that is infinite in both directions, storing runs of (symbol, length). Only the range of indices that has been written to is stored."""
+
+    def __init__(self, default_v):
+
+        self._default_v = default_v;
+        self._known_symbols = {default_v}; # Symbols that have been checked to be valid
+
+        # Inclusive range of indices that have been written to. The runs cover exactly this range
+
+        self._start = 0;
+        self._end = 0;
+
+        # Run the cursor is in
+
+        self._cur_symbol = default_v;
+        self._cur_start = 0;
+        self._cur_len = 1;
+
+        self._left = deque(); # [symbol, length] runs left of the cursor's run, nearest last
+        self._right = deque(); # [symbol, length] runs right of the cursor's run, nearest last
+
+        self.head = 0;
+        self._initial_state = None;
+
+    def get_default_symbol(self) -> str:
+        return self._default_v;
+
+    # Cursor
+
+    def _seek(self, i: int) -> None:
+
+        """Moves the cursor to the run holding index i, which must be in the stored range"""
+
+        left = self._left;
+        right = self._right;
+
+        while i < self._cur_start:
+
+            right.append([self._cur_symbol, self._cur_len]);
+
+            self._cur_symbol, self._cur_len = left.pop();
+            self._cur_start -= self._cur_len;
+
+        while i >= self._cur_start + self._cur_len:
+
+            left.append([self._cur_symbol, self._cur_len]);
+
+            self._cur_start += self._cur_len;
+            self._cur_symbol, self._cur_len = right.pop();
+
+    def _extend_to_include(self, i: int) -> None:
+
+        """Grows the stored range with default cells so that it includes index i"""
+
+        default_v = self._default_v;
+
+        if i < self._start:
+
+            extra = self._start - i;
+
+            # The leftmost run is at the far end of the left deque, or is the cursor's run if there are none to its left
+
+            if len(self._left) > 0:
+
+                run = self._left[0];
+
+                if run[0] == default_v:
+                    run[1] += extra;
+                else:
+                    self._left.appendleft([default_v, extra]);
+
+            elif self._cur_symbol == default_v:
+                self._cur_start -= extra;
+                self._cur_len += extra;
+
+            else:
+                self._left.appendleft([default_v, extra]);
+
+            self._start = i;
+
+        elif i > self._end:
+
+            extra = i - self._end;
+
+            if len(self._right) > 0:
+
+                run = self._right[0];
+
+                if run[0] == default_v:
+                    run[1] += extra;
+                else:
+                    self._right.appendleft([default_v, extra]);
+
+            elif self._cur_symbol == default_v:
+                self._cur_len += extra;
+
+            else:
+                self._right.appendleft([default_v, extra]);
+
+            self._end = i;
+
+    # Reading and writing
+
+    def get_at_head(self) -> str:
+        return self.get(self.head);
+
+    def set_at_head(self, v: str) -> None:
+        self.set(self.head, v);
+
+    def get(self, i: int) -> str:
+
+        if not (self._start <= i <= self._end):
+            return self._default_v;
+
+        if not (self._cur_start <= i < self._cur_start + self._cur_len):
+            self._seek(i);
+
+        return self._cur_symbol;
+
+    def set(self, i: int, v: str) -> None:
+
+        if v not in self._known_symbols:
+
+            if len(v) > SYMBOL_MAX_LENGTH:
+                raise Exception(f"Symbol is longer than the maximum of {SYMBOL_MAX_LENGTH} characters");
+
+            self._known_symbols.add(v);
+
+        if not (self._start <= i <= self._end):
+            self._extend_to_include(i);
+
+        if not (self._cur_start <= i < self._cur_start + self._cur_len):
+            self._seek(i);
+
+        if self._cur_symbol == v:
+            return;
+
+        # Split the cursor's run around the cell, leaving the cell as the cursor's run
+
+        before = i - self._cur_start;
+        after = self._cur_len - before - 1;
+
+        if before > 0:
+            self._left.append([self._cur_symbol, before]);
+
+        if after > 0:
+            self._right.append([self._cur_symbol, after]);
+
+        self._cur_symbol = v;
+        self._cur_start = i;
+        self._cur_len = 1;
+
+        # Merge with neighbouring runs of the same symbol to keep runs maximal
+
+        if (before == 0) and (len(self._left) > 0) and (self._left[-1][0] == v):
+
+            _, length = self._left.pop();
+
+            self._cur_start -= length;
+            self._cur_len += length;
+
+        if (after == 0) and (len(self._right) > 0) and (self._right[-1][0] == v):
+
+            _, length = self._right.pop();
+
+            self._cur_len += length;
+
+    def write_range(self, i: int, values: tList[str]) -> None:
+
+        """Sets consecutive cells starting at index i to the provided symbols"""
+
+        for offset, v in enumerate(values):
+            self.set(i + offset, v);
+
+    def get_bounds(self) -> tTuple[int, int]:
+
+        """Gets the (inclusive) range of indices that have been written to. Index 0 is always included."""
+
+        return (self._start, self._end);
+
+    def read_runs(self) -> tList[tTuple[str, int]]:
+
+        """Gets the runs of the stored range as (symbol, length), leftmost first. Takes time proportional to the number of runs rather than cells."""
+
+        return ([(symbol, length) for symbol, length in self._left]
+            + [(self._cur_symbol, self._cur_len)]
+            + [(symbol, length) for symbol, length in reversed(self._right)]);
+
+    def get_runs_count(self) -> int:
+        return len(self._left) + 1 + len(self._right);
+
+    def read_all(self) -> tList[str]:
+
+        out = [];
+
+        for symbol, length in self.read_runs():
+            out.extend([symbol] * length);
+
+        return out;
+
+    # Moving head
+
+    def head_forward(self,
+        amount: int = 1) -> None:
+        self.head_to(self.head + amount);
+
+    def head_back(self,
+        amount: int = 1) -> None:
+        self.head_to(self.head - amount);
+
+    def head_to(self,
+        index: int) -> None:
+        self.head = index;
+
+    def copy(self) -> "RleTape":
+
+        """Creates an independent copy of the tape, including its head position"""
+
+        t = RleTape(self._default_v);
+
+        t.load_snapshot(self.get_snapshot());
+        t._known_symbols = set(self._known_symbols);
+        t.head = self.head;
+
+        return t;
+
+    # Snapshots
+
+    def get_snapshot(self) -> tuple:
+
+        """Gets a compact copy of the tape's runs that can be loaded back with load_snapshot. The head position isn't included."""
+
+        return (tuple(self.read_runs()), self._start, self._end);
+
+    def load_snapshot(self,
+        snapshot: tuple) -> None:
+
+        runs, self._start, self._end = snapshot;
+
+        # Put the cursor on the leftmost run
+
+        self._cur_symbol, self._cur_len = runs[0];
+        self._cur_start = self._start;
+
+        self._left = deque();
+        self._right = deque([symbol, length] for symbol, length in reversed(runs[1:]));
+
+        self._known_symbols.update(symbol for symbol, _ in runs);
+
+    # Initial state
+
+    def store_initial_state(self) -> None:
+
+        """Stores the current state of the tape as the initial state that can be returned to after running the machine."""
+
+        self._initial_state = self.get_snapshot();
+
+    def load_initial_state(self) -> None:
+
+        """Loads the stored initial state if there is one stored."""
+
+        if self._initial_state == None:
+            raise Exception("No initial state has been stored when trying to load it.");
+
+        self.load_snapshot(self._initial_state);
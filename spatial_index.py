@@ -0,0 +1,183 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from typing import Sequence as tSequence;
+from math import floor;
+
+# A uniform grid over 2D positions. Items are bucketed by the grid cell their position falls in so that only the cells overlapping a query need to be searched.
+# With a cell size around the size of the queries, point and radius queries look at a small fixed number of cells, no matter how many items there are
+
+SPATIAL_GRID_DEFAULT_CELL_SIZE = 64;
+
+class SpatialGrid:
+
+    def __init__(self,
+        cell_size: float = SPATIAL_GRID_DEFAULT_CELL_SIZE):
+
+        if cell_size <= 0:
+            raise Exception("Cell size must be positive");
+
+        self.cell_size = cell_size;
+
+        self._cells = {}; # Cell -> (item, x, y) of the items in it
+        self._count = 0;
+
+    def __len__(self) -> int:
+        return self._count;
+
+    def _cells_overlapping(self,
+        min_cx: int,
+        min_cy: int,
+        max_cx: int,
+        max_cy: int):
+
+        """Yields the buckets of the non-empty cells in the provided range of cells. If the range covers more cells than there are non-empty cells, the non-empty cells are looked through instead."""
+
+        cells = self._cells;
+
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(cells):
+
+            for (cx, cy), bucket in cells.items():
+
+                if (min_cx <= cx <= max_cx) and (min_cy <= cy <= max_cy):
+                    yield bucket;
+
+        else:
+
+            for cx in range(min_cx, max_cx + 1):
+                for cy in range(min_cy, max_cy + 1):
+
+                    bucket = cells.get((cx, cy));
+
+                    if bucket != None:
+                        yield bucket;
+
+    def _cell_of(self,
+        x: float,
+        y: float) -> tTuple[int, int]:
+        return (floor(x / self.cell_size), floor(y / self.cell_size));
+
+    def insert(self,
+        item: object,
+        pos: tSequence[float]) -> None:
+
+        """Adds an item at the provided position. N.B. the position is copied so the item must be removed and re-inserted if it moves."""
+
+        x, y = pos[0], pos[1];
+
+        self._cells.setdefault(self._cell_of(x, y), []).append((item, x, y));
+        self._count += 1;
+
+    def remove(self,
+        item: object,
+        pos: tSequence[float]) -> None:
+
+        """Removes an item that was inserted at the provided position"""
+
+        key = self._cell_of(pos[0], pos[1]);
+        bucket = self._cells.get(key);
+
+        if bucket != None:
+
+            for i, entry in enumerate(bucket):
+
+                if entry[0] is item:
+
+                    # Order in a bucket doesn't matter so swap with the last entry to remove in O(1)
+
+                    bucket[i] = bucket[-1];
+                    bucket.pop();
+
+                    if len(bucket) == 0:
+                        del self._cells[key];
+
+                    self._count -= 1;
+
+                    return;
+
+        raise Exception("Item isn't in the grid at provided position");
+
+    def clear(self) -> None:
+        self._cells.clear();
+        self._count = 0;
+
+    def _within(self,
+        pos: tSequence[float],
+        radius: float):
+
+        """Yields (item, squared distance) for every item within radius of the provided position (inclusive)"""
+
+        x, y = pos[0], pos[1];
+        sqr_radius = radius * radius;
+
+        min_cx, min_cy = self._cell_of(x - radius, y - radius);
+        max_cx, max_cy = self._cell_of(x + radius, y + radius);
+
+        for bucket in self._cells_overlapping(min_cx, min_cy, max_cx, max_cy):
+
+            for item, ix, iy in bucket:
+
+                dx = ix - x;
+                dy = iy - y;
+                sqr_dist = (dx * dx) + (dy * dy);
+
+                if sqr_dist <= sqr_radius:
+                    yield item, sqr_dist;
+
+    def query_rect(self,
+        rect: tSequence[float]) -> tList[object]:
+
+        """Gets every item whose position is in the provided (left, top, width, height) rect. Items on the right and bottom edges are included."""
+
+        left, top, width, height = rect[0], rect[1], rect[2], rect[3];
+        right = left + width;
+        bottom = top + height;
+
+        min_cx, min_cy = self._cell_of(left, top);
+        max_cx, max_cy = self._cell_of(right, bottom);
+
+        out = [];
+
+        for bucket in self._cells_overlapping(min_cx, min_cy, max_cx, max_cy):
+
+            for item, ix, iy in bucket:
+
+                if (left <= ix <= right) and (top <= iy <= bottom):
+                    out.append(item);
+
+        return out;
+
+    def query_radius(self,
+        pos: tSequence[float],
+        radius: float) -> tList[object]:
+
+        """Gets every item within radius of the provided position (inclusive)"""
+
+        return [item for item, _ in self._within(pos, radius)];
+
+    def query_nearest(self,
+        pos: tSequence[float],
+        radius: float) -> object | None:
+
+        """Gets the item nearest to the provided position out of those within radius of it, or None if there are none"""
+
+        nearest = None;
+        nearest_sqr_dist = None;
+
+        for item, sqr_dist in self._within(pos, radius):
+
+            if (nearest_sqr_dist == None) or (sqr_dist < nearest_sqr_dist):
+                nearest = item;
+                nearest_sqr_dist = sqr_dist;
+
+        return nearest;
+
+    def any_within(self,
+        pos: tSequence[float],
+        radius: float) -> bool:
+
+        """Checks whether there is any item within radius of the provided position (inclusive), stopping at the first found"""
+
+        for _ in self._within(pos, radius):
+            return True;
+
+        return False;
@@ -4,6 +4,7 @@ from pygame.sprite import Sprite;
 import pygame;
 from pygame import Vector2;
 from machine import State;
+from render_cache import render_text;
 
 class StateSprite(Sprite):
 
@@ -14,18 +15,21 @@ class StateSprite(Sprite):
         text_color: tTuple[int, int, int],
         bg_color: tTuple[int, int, int],
         width: int,
-        font: pygame.font.Font):
+        font: pygame.font.Font,
+        scale: float = 1):
 
         super().__init__();
 
         self.width = width;
+        self.scale = scale;
 
         self.state = state;
         self.is_curr = False;
 
         self.font = font;
 
-        pos = self.state.pos - Vector2(width // 2);
+        # Sprite is positioned at the state's position multiplied by scale. N.B. width isn't scaled
+        pos = (Vector2(self.state.pos) * scale) - Vector2(width // 2);
 
         # Save colors
 
@@ -53,9 +57,13 @@ class StateSprite(Sprite):
 
         super().update();
 
-        self.is_curr = curr_state == self.state.n;
+        is_curr = curr_state == self.state.n;
 
-        self.redraw();
+        # Only redraw if the sprite's appearance has changed
+
+        if is_curr != self.is_curr:
+            self.is_curr = is_curr;
+            self.redraw();
 
     def redraw(self) -> None:
 
@@ -75,7 +83,8 @@ class StateSprite(Sprite):
 
         # Write n on circle
         
-        text = self.font.render(
+        text = render_text(
+            self.font,
             str(self.state.n),
             True,
             self.text_color,
@@ -94,6 +103,19 @@ class StateSprite(Sprite):
             dest = text_pos
         );
 
+    def set_state_color(self,
+        color: tTuple[int, int, int]) -> bool:
+
+        """Changes the colour of the state, redrawing if it has changed. Returns whether it has."""
+
+        if color == self.state_color:
+            return False;
+
+        self.state_color = color;
+        self.redraw();
+
+        return True;
+
     def set_is_curr(self,
         b: bool) -> None:
         self.is_curr = b;
@@ -102,9 +124,9 @@ class StateSprite(Sprite):
         pos: Vector2
         ) -> bool:
 
-        """Checks whether the provided position is in the bounds of this state. Bounds are taken to be in the shape of a circle around the center"""
+        """Checks whether the provided (unscaled) position is in the bounds of this state. Bounds are taken to be in the shape of a circle around the center"""
         
-        disp = pos - self.state.pos;
+        disp = Vector2(pos) - Vector2(self.state.pos);
         sqr_d = disp.magnitude_squared();
 
-        return sqr_d <= (self.width/2)**2;
+        return sqr_d <= (self.width/(2 * self.scale))**2;
@@ -1,17 +1,77 @@
 from typing import List as tList;
 from typing import Tuple as tTuple;
+from array import array;
+
+from machine import SYMBOL_MAX_LENGTH;
 
 TAPE_DEFAULT_SYMBOL = "0";
 
+TAPE_INITIAL_CAPACITY = 64; # Number of cells allocated when a tape is created
+TAPE_MAX_SPAN = 1 << 26; # Most cells between the leftmost and rightmost written cells, as every cell between them is stored. RleTape has no such limit
+
+BYTE_CELLS_MAX_SYMBOLS = 256; # Number of distinct symbols that can be stored while cells are kept one byte each
+WIDE_CELLS_TYPECODE = "I";
+
 class Tape:
 
+    """A tape that is infinite in both directions.
+
+    Cells are stored contiguously as small integer codes, with each distinct symbol interned to a code. Code 0 is always the default symbol. The buffer is doubled in whichever direction the tape needs to grow."""
+
     def __init__(self, default_v):
 
         self._default_v = default_v;
-        self._vs = {};
+
+        # Symbol interning
+
+        self._symbols = [default_v]; # Code -> symbol
+        self._codes = {default_v: 0}; # Symbol -> code
+
+        # Cell storage. Cells are one byte each until more than BYTE_CELLS_MAX_SYMBOLS symbols are interned
+
+        self._cells = bytearray(TAPE_INITIAL_CAPACITY);
+        self._origin = TAPE_INITIAL_CAPACITY // 2; # Buffer index of tape index 0
+
+        # Inclusive range of indices that have been written to
+
+        self._start = 0;
+        self._end = 0;
+
         self.head = 0;
         self._initial_state = None;
 
+    # Symbol interning
+
+    def intern_symbol(self, v: str) -> int:
+
+        """Gets the code used to store the provided symbol, assigning it a new code if it hasn't been seen before"""
+
+        code = self._codes.get(v);
+
+        if code != None:
+            return code;
+
+        if len(v) > SYMBOL_MAX_LENGTH:
+            raise Exception(f"Symbol is longer than the maximum of {SYMBOL_MAX_LENGTH} characters");
+
+        code = len(self._symbols);
+
+        self._symbols.append(v);
+        self._codes[v] = code;
+
+        if (code >= BYTE_CELLS_MAX_SYMBOLS) and (type(self._cells) == bytearray):
+            self._cells = array(WIDE_CELLS_TYPECODE, iter(self._cells));
+
+        return code;
+
+    def get_symbol(self, code: int) -> str:
+        return self._symbols[code];
+
+    def get_default_symbol(self) -> str:
+        return self._default_v;
+
+    # Reading and writing
+
     def get_at_head(self) -> str:
         return self.get(self.head);
 
@@ -20,40 +80,125 @@ class Tape:
 
     def get(self, i: int) -> str:
 
-        if i in self._vs.keys():
-            return self._vs[i];
+        j = i + self._origin;
+
+        if 0 <= j < len(self._cells):
+            return self._symbols[self._cells[j]];
 
         else:
             return self._default_v;
 
     def set(self, i: int, v: str) -> None:
 
-        self._vs[i] = v;
+        code = self._codes.get(v);
+
+        if code == None:
+            code = self.intern_symbol(v);
+
+        self.set_code(i, code);
+
+    def write_range(self, i: int, values: tList[str]) -> None:
+
+        """Sets consecutive cells starting at index i to the provided symbols, writing them into the buffer in one go"""
+
+        if len(values) == 0:
+            return;
+
+        # Intern every symbol first so that the type of the buffer is settled
+
+        for v in set(values):
+            self.intern_symbol(v);
+
+        codes = self._codes;
+        last = i + len(values) - 1;
+
+        self._grow_to_include(i);
+        self._grow_to_include(last);
+
+        new_codes = [codes[v] for v in values];
+        j = i + self._origin;
+
+        if type(self._cells) == bytearray:
+            self._cells[j : j + len(values)] = bytes(new_codes);
+        else:
+            self._cells[j : j + len(values)] = array(WIDE_CELLS_TYPECODE, new_codes);
+
+        if i < self._start:
+            self._start = i;
 
-    def _get_non_default_bounds(self) -> tTuple[int, int]:
+        if last > self._end:
+            self._end = last;
 
-        start = 0;
-        end = 0;
+    def get_code(self, i: int) -> int:
 
-        for n in self._vs.keys():
+        j = i + self._origin;
 
-            if (start == None) or (n < start):
-                start = n;
+        if 0 <= j < len(self._cells):
+            return self._cells[j];
 
-            if (end == None) or (n > end):
-                end = n;
+        else:
+            return 0;
+
+    def set_code(self, i: int, code: int) -> None:
+
+        j = i + self._origin;
+
+        if not (0 <= j < len(self._cells)):
+            self._grow_to_include(i);
+            j = i + self._origin;
+
+        self._cells[j] = code;
+
+        if i < self._start:
+            self._start = i;
+
+        elif i > self._end:
+            self._end = i;
+
+    def _new_cells(self, n: int) -> bytearray | array:
+
+        """Creates a buffer of n default cells of the same type as the current buffer"""
+
+        if type(self._cells) == bytearray:
+            return bytearray(n);
+
+        else:
+            return array(WIDE_CELLS_TYPECODE, bytes(n * self._cells.itemsize));
+
+    def _grow_to_include(self, i: int) -> None:
+
+        """Grows the buffer so that tape index i can be stored. The buffer is at least doubled so that growing is amortized O(1) per cell."""
+
+        if max(self._end, i) - min(self._start, i) >= TAPE_MAX_SPAN:
+            raise Exception(f"Can't write to index {i} as the tape would span more than {TAPE_MAX_SPAN} cells. Use an RleTape for tapes written this far apart");
+
+        j = i + self._origin;
+        size = len(self._cells);
+
+        if j < 0:
+
+            extra = max(-j, size);
+            self._cells = self._new_cells(extra) + self._cells;
+            self._origin += extra;
+
+        elif j >= size:
+
+            extra = max(j - size + 1, size);
+            self._cells += self._new_cells(extra);
 
-        return (start, end);
+    def get_bounds(self) -> tTuple[int, int]:
+
+        """Gets the (inclusive) range of indices that have been written to. Index 0 is always included."""
+
+        return (self._start, self._end);
 
     def read_all(self) -> tList[str]:
 
-        out = [];
-        bounds = self._get_non_default_bounds();
+        symbols = self._symbols;
 
-        for i in range(bounds[0], bounds[1] + 1, 1):
-            out.append(self.get(i));
+        return [symbols[c] for c in self._cells[self._start + self._origin : self._end + self._origin + 1]];
 
-        return out;
+    # Moving head
 
     def head_forward(self,
         amount: int = 1) -> None:
@@ -67,11 +212,54 @@ class Tape:
         index: int) -> None:
         self.head = index;
 
+    def copy(self) -> "Tape":
+
+        """Creates an independent copy of the tape, including its head position"""
+
+        t = Tape(self._default_v);
+
+        t._symbols = list(self._symbols);
+        t._codes = dict(self._codes);
+        t._cells = self._cells[:];
+        t._origin = self._origin;
+        t._start = self._start;
+        t._end = self._end;
+        t.head = self.head;
+
+        return t;
+
+    # Snapshots
+
+    def get_snapshot(self) -> tuple:
+
+        """Gets a compact copy of the tape's written cells that can be loaded back with load_snapshot. The head position isn't included."""
+
+        return (self._cells[self._start + self._origin : self._end + self._origin + 1], self._start, self._end);
+
+    def load_snapshot(self,
+        snapshot: tuple) -> None:
+
+        written, self._start, self._end = snapshot;
+
+        # Symbols may have been interned since the snapshot was taken so the cells may need widening
+
+        if type(written) != type(self._cells):
+            written = array(WIDE_CELLS_TYPECODE, iter(written));
+
+        # Rebuild the buffer with default cells either side of the written cells to grow into
+
+        padding = max(TAPE_INITIAL_CAPACITY // 2, len(written) // 2);
+
+        self._cells = self._new_cells(padding) + written + self._new_cells(padding);
+        self._origin = padding - self._start;
+
+    # Initial state
+
     def store_initial_state(self) -> None:
 
         """Stores the current state of the tape as the initial state that can be returned to after running the machine."""
 
-        self._initial_state = dict(self._vs);
+        self._initial_state = self.get_snapshot();
 
     def load_initial_state(self) -> None:
 
@@ -80,4 +268,4 @@ class Tape:
         if self._initial_state == None:
             raise Exception("No initial state has been stored when trying to load it.");
 
-        self._vs = dict(self._initial_state);
+        self.load_snapshot(self._initial_state);
@@ -0,0 +1,90 @@
+from io import StringIO;
+
+from tape import Tape, TAPE_MAX_SPAN;
+from tape_files import try_read_tape;
+from rle_tape import RleTape;
+from machine import Machine, Position;
+from engine import run_machine;
+
+# Checks that writing far from the rest of a tape fails with a clear error rather than allocating every cell in between, and that an RleTape can be used instead.
+# Usage: python tape_check.py
+
+FAR_INDEX = 10 ** 9;
+
+def check_far_index_rejected(write, description: str) -> None:
+
+    """Checks that the write fails before growing the tape, leaving the tape as it was"""
+
+    tape = Tape("0");
+    tape.set(5, "1");
+
+    try:
+        write(tape);
+    except Exception as e:
+        if "RleTape" not in str(e):
+            raise Exception(f"Unclear error for {description}: {e}");
+    else:
+        raise Exception(f"No error for {description}");
+
+    if (tape.get_bounds() != (0, 5)) or (tape.read_all() != ["0"] * 5 + ["1"]):
+        raise Exception(f"Tape changed by the rejected write for {description}");
+
+def main():
+
+    check_far_index_rejected(lambda tape: tape.set(FAR_INDEX, "1"), "set to the right");
+    check_far_index_rejected(lambda tape: tape.set(-FAR_INDEX, "1"), "set to the left");
+    check_far_index_rejected(lambda tape: tape.write_range(FAR_INDEX, ["1", "0"]), "write_range to the right");
+    check_far_index_rejected(lambda tape: tape.write_range(5 - TAPE_MAX_SPAN, ["1"]), "write_range just past the limit");
+
+    # Just inside the limit is still stored densely
+
+    tape = Tape("0");
+    tape.set(TAPE_MAX_SPAN - 1, "1");
+
+    if tape.get_bounds() != (0, TAPE_MAX_SPAN - 1) or tape.get(TAPE_MAX_SPAN - 1) != "1":
+        raise Exception("Write just inside the limit was lost");
+
+    # Running a machine from a far head fails the same way, compiled or not
+
+    m = Machine();
+    m.add_state(Position(0, 0));
+    m.try_add_transition(start = 0, end = 0, read_symbol = "0", write_symbol = "1", head_move = 1);
+
+    for compiled in [False, True]:
+
+        tape = Tape("0");
+        tape.head_to(FAR_INDEX);
+
+        try:
+            run_machine(m, tape, max_steps = 10, compiled = compiled);
+        except Exception as e:
+            if "span" not in str(e):
+                raise Exception(f"Unclear error running from a far head (compiled {compiled}): {e}");
+        else:
+            raise Exception(f"No error running from a far head (compiled {compiled})");
+
+    # An RleTape stores the gap as a single run
+
+    tape = RleTape("0");
+    tape.set(FAR_INDEX, "1");
+    tape.set(-FAR_INDEX, "1");
+
+    if (tape.get_bounds() != (-FAR_INDEX, FAR_INDEX)) or (tape.get(FAR_INDEX) != "1") or (tape.get(0) != "0") or (tape.get_runs_count() != 3):
+        raise Exception("RleTape lost far writes");
+
+    # Tape files with cells too far apart can't be read into a Tape, but can be into an RleTape
+
+    far_file = f"1\n{FAR_INDEX}: 1\n";
+
+    if try_read_tape(StringIO(far_file), Tape) != None:
+        raise Exception("Tape file with far cells read into a Tape");
+
+    tape = try_read_tape(StringIO(far_file), RleTape);
+
+    if (tape == None) or (tape.get(FAR_INDEX) != "1"):
+        raise Exception("Tape file with far cells not read into an RleTape");
+
+    print("Far tape indexes checked.");
+
+if __name__ == "__main__":
+    main();
@@ -2,6 +2,7 @@ from io import TextIOWrapper;
 from re import match;
 
 from tape import Tape, TAPE_DEFAULT_SYMBOL;
+from rle_tape import RleTape;
 from machine import SYMBOL_MAX_LENGTH;
 
 TAPE_SYMBOL_PATTERN = r"^((?P<pos>-?[0-9]+)\s*:)?\s*(?P<symbol>[A-z0-9]{1,4})$";
@@ -10,9 +11,12 @@ TAPE_SYMBOL_PATTERN = r"^((?P<pos>-?[0-9]+)\s*:)?\s*(?P<symbol>[A-z0-9]{1,4})$";
 
 TAPE_FILETYPES = [("All Files", "*.*")]
 
-def try_read_tape(f: TextIOWrapper) -> Tape | None:
+def try_read_tape(f: TextIOWrapper,
+    tape_class: type = Tape) -> Tape | RleTape | None:
 
-    t = Tape(TAPE_DEFAULT_SYMBOL);
+    """Reads a tape from a file into a new tape of the provided class, or returns None if the file isn't a valid tape or the tape class can't hold it, as for a Tape with cells too far apart"""
+
+    t = tape_class(TAPE_DEFAULT_SYMBOL);
     _next_index = 0;
 
     for l in f.readlines():
@@ -39,8 +43,11 @@ def try_read_tape(f: TextIOWrapper) -> Tape | None:
         if len(symbol) > SYMBOL_MAX_LENGTH:
             return None;
 
-        else:
+        try:
             t.set(pos, symbol);
-            _next_index = pos + 1;
+        except Exception:
+            return None;
+
+        _next_index = pos + 1;
 
     return t;
@@ -1,9 +1,11 @@
 from typing import List as tList;
 from typing import Tuple as tTuple;
-from pygame import Surface;
+from pygame import Surface, Rect;
 import pygame;
 
 from tape import Tape;
+from engine import RunSnapshot;
+from render_cache import render_text;
 
 SYMBOLS_SHOWN_EACH_SIDE = 4; # Number of symbols shown on either side of current symbol
 
@@ -35,6 +37,7 @@ class TapeWindow(Surface):
         self.cell_height = self.get_height() - (2 * SYMBOL_CELL_BORDER);
         
         self.tape = tape;
+        self.snapshot = None; # If set, the snapshot is shown instead of the tape. Used while the tape is being changed by another thread
 
         self.bg_color = bg_color;
 
@@ -56,11 +59,21 @@ class TapeWindow(Surface):
         self.value_sprites.empty();
         self.tape_sprites.empty();
 
+        # Choose what to show
+
+        if self.snapshot != None:
+            head = self.snapshot.head;
+            get_symbol = self.snapshot.get;
+
+        else:
+            head = self.tape.head;
+            get_symbol = self.tape.get;
+
         # Add new sprites
 
         for i in range(-SYMBOLS_SHOWN_EACH_SIDE, SYMBOLS_SHOWN_EACH_SIDE + 1):
 
-            cell_index = self.tape.head + i;
+            cell_index = head + i;
 
             # Find positions in cell
 
@@ -115,8 +128,9 @@ class TapeWindow(Surface):
 
             # Draw cell symbol
 
-            symbol_text = self.font.render(
-                str(self.tape.get(cell_index)),
+            symbol_text = render_text(
+                self.font,
+                str(get_symbol(cell_index)),
                 True,
                 SYMBOL_COLOR,
                 None
@@ -132,7 +146,8 @@ class TapeWindow(Surface):
 
             # Draw cell index
 
-            index_text = self.font.render(
+            index_text = render_text(
+                self.font,
                 str(cell_index),
                 True,
                 CELL_INDEX_COLOR,
@@ -152,9 +167,30 @@ class TapeWindow(Surface):
         self.tape_sprites.draw(self);
         self.value_sprites.draw(self);
 
+        # Whole window has changed
+
+        self.dirty_rects = [self.get_rect()];
+
+    def pop_dirty_rects(self) -> tList[Rect]:
+
+        """Gets the areas of the window that have changed since this was last called"""
+
+        rects = self.dirty_rects;
+        self.dirty_rects = [];
+
+        return rects;
+
     def set_tape(self, t: Tape) -> None:
         self.tape = t;
 
+    def show_snapshot(self,
+        snapshot: RunSnapshot | None) -> None:
+
+        """Shows the tape from a snapshot instead of the tape itself, or goes back to showing the tape if snapshot is None"""
+
+        self.snapshot = snapshot;
+        self.refresh();
+
     def scroll_amount(self, n: int) -> None:
         self.scroll_to(self.index + n);
 
@@ -0,0 +1,411 @@
+from typing import List as tList;
+from typing import Tuple as tTuple;
+from typing import NamedTuple, BinaryIO, Iterator;
+from bisect import bisect_right;
+from struct import Struct;
+
+from machine import Machine;
+from tape import Tape;
+
+# Execution traces. A trace records every step of a run as the transition made, the symbol written and the head move, so a run can be audited or played back without the machine.
+# Steps are streamed through a buffer as a few bytes each, with a full checkpoint of the run every checkpoint_interval steps. An index of the checkpoints is written at the end so that a reader can find the checkpoint before any step by bisection and only decode from there
+# N.B. like the engine, this module must not import pygame or tkinter
+
+TRACE_MAGIC = b"TMTRACE1";
+TRACE_INDEX_MAGIC = b"TMTRIDX1";
+
+TRACE_DEFAULT_CHECKPOINT_INTERVAL = 10000;
+TRACE_BUFFER_SIZE = 1 << 16; # Buffered bytes are written to the file once there are at least this many
+
+TRACE_FILE_EXTENSION = ".tmtrace";
+TRACE_FILETYPES = [("Turing Machine Trace", f"*{TRACE_FILE_EXTENSION}"), ("All Files", "*.*")];
+
+TRAILER_STRUCT = Struct("<Q"); # Offset of the index from the start of the trace
+
+# File layout. Integers are unsigned LEB128 varints, with signed ones zigzag encoded first, and strings are a length followed by UTF-8 bytes:
+#   TRACE_MAGIC
+#   header: first step, checkpoint interval, number of symbols then each symbol (the default symbol first), number of transitions then (start, read symbol code, end, write symbol code, head move) for each
+#   chunks, each of a checkpoint followed by the steps made until the next one:
+#     checkpoint: step, state, head, tape start, number of cells then each cell's symbol code
+#     step: transition ID, written symbol code, head move
+#   index: last step, whether the machine halted there, number of checkpoints then (step, offset) for each, each as the difference from the previous one
+#   trailer: TRAILER_STRUCT, TRACE_INDEX_MAGIC
+
+def _zigzag(n: int) -> int:
+    return (n << 1) if n >= 0 else ((-n << 1) - 1);
+
+def _unzigzag(n: int) -> int:
+    return (n >> 1) if (n & 1) == 0 else -((n + 1) >> 1);
+
+def _write_varint(out: bytearray, n: int) -> None:
+
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80);
+        n >>= 7;
+
+    out.append(n);
+
+def _write_string(out: bytearray, s: str) -> None:
+
+    bs = s.encode();
+
+    _write_varint(out, len(bs));
+    out += bs;
+
+class _VarintReader:
+
+    """Reads varints and strings from bytes in order"""
+
+    def __init__(self, data: bytes):
+
+        self.data = data;
+        self.i = 0;
+
+    def read(self) -> int:
+
+        data = self.data;
+        i = self.i;
+
+        b = data[i];
+        i += 1;
+
+        n = b & 0x7f;
+        shift = 7;
+
+        while b >= 0x80:
+            b = data[i];
+            i += 1;
+            n |= (b & 0x7f) << shift;
+            shift += 7;
+
+        self.i = i;
+
+        return n;
+
+    def read_signed(self) -> int:
+        return _unzigzag(self.read());
+
+    def read_string(self) -> str:
+
+        length = self.read();
+        s = self.data[self.i : self.i + length].decode();
+        self.i += length;
+
+        return s;
+
+class TraceStep(NamedTuple):
+
+    step: int # Step number the step was made from
+    transition_id: int
+    write_code: int
+    head_move: int
+
+class TraceConfiguration(NamedTuple):
+
+    step: int
+    state: int
+    tape: Tape # The head is the tape's head
+
+class TraceWriter:
+
+    """Streams a trace of a run to a binary file. The engine adds steps directly to the buffer; the writer adds checkpoints and the index. Transition IDs are the same as those given by a TransitionProfile of the machine."""
+
+    def __init__(self,
+        file: BinaryIO,
+        machine: Machine,
+        tape: Tape,
+        state: int,
+        step: int = 0,
+        checkpoint_interval: int = TRACE_DEFAULT_CHECKPOINT_INTERVAL):
+
+        if checkpoint_interval < 1:
+            raise Exception("Trace checkpoint interval must be at least 1");
+
+        self.file = file;
+        self.tape = tape;
+        self.checkpoint_interval = checkpoint_interval;
+
+        self.buffer = bytearray();
+        self._offset = 0; # Offset from the start of the trace of the start of the buffer
+        self._index = []; # (step, offset) of each checkpoint
+
+        # Symbol codes. The default symbol is code 0, then the machine's symbols and then any others on the tape when the trace starts
+
+        transitions = list(machine.transition_table.values());
+
+        self.symbols = [tape.get_default_symbol()];
+
+        for symbol in sorted({t.read_symbol for t in transitions} | {t.write_symbol for t in transitions}) + tape.read_all():
+
+            if symbol not in self.symbols:
+                self.symbols.append(symbol);
+
+        self.symbol_codes = {symbol: i for i, symbol in enumerate(self.symbols)};
+
+        # (state, read symbol) -> (write symbol, head move, end state, transition ID, encoded step) for the engine's tracing loop. Every step made with a transition is encoded the same, so it is only encoded once
+
+        self.entries = {};
+
+        for transition_id, t in enumerate(transitions):
+
+            record = bytearray();
+            _write_varint(record, transition_id);
+            _write_varint(record, self.symbol_codes[t.write_symbol]);
+            _write_varint(record, _zigzag(t.head_move));
+
+            self.entries[(t.start, t.read_symbol)] = (t.write_symbol, t.head_move, t.end, transition_id, bytes(record));
+
+        # Progress of the run being traced
+
+        self.end_step = step; # Step after the last step in the trace
+        self.halted = False;
+        self.steps_until_checkpoint = checkpoint_interval;
+
+        # Header
+
+        self.buffer += TRACE_MAGIC;
+
+        _write_varint(self.buffer, step);
+        _write_varint(self.buffer, checkpoint_interval);
+
+        _write_varint(self.buffer, len(self.symbols));
+
+        for symbol in self.symbols:
+            _write_string(self.buffer, symbol);
+
+        _write_varint(self.buffer, len(transitions));
+
+        for t in transitions:
+
+            for n in (t.start, self.symbol_codes[t.read_symbol], t.end, self.symbol_codes[t.write_symbol]):
+                _write_varint(self.buffer, n);
+
+            _write_varint(self.buffer, _zigzag(t.head_move));
+
+        self.write_checkpoint(step, state);
+
+    def write_checkpoint(self,
+        step: int,
+        state: int) -> None:
+
+        """Writes a checkpoint of the run, taking the tape and its head from the tape being traced, and writes out the buffer if it is full"""
+
+        self._index.append((step, self._offset + len(self.buffer)));
+
+        buffer = self.buffer;
+        tape_start, _ = self.tape.get_bounds();
+
+        _write_varint(buffer, step);
+        _write_varint(buffer, _zigzag(state));
+        _write_varint(buffer, _zigzag(self.tape.head));
+        _write_varint(buffer, _zigzag(tape_start));
+
+        cells = self.tape.read_all();
+        _write_varint(buffer, len(cells));
+
+        symbol_codes = self.symbol_codes;
+
+        for symbol in cells:
+
+            code = symbol_codes.get(symbol);
+
+            if code == None:
+                raise Exception(f"Symbol {symbol} was put on the tape after the trace started");
+
+            _write_varint(buffer, code);
+
+        if len(buffer) >= TRACE_BUFFER_SIZE:
+            self.flush();
+
+    def flush(self) -> None:
+
+        """Writes out the buffer"""
+
+        self.file.write(self.buffer);
+
+        self._offset += len(self.buffer);
+        self.buffer.clear(); # Cleared in place as the engine keeps a reference to it while running
+
+    def close(self) -> None:
+
+        """Writes the index and trailer and writes out the buffer. The file is left open."""
+
+        index_offset = self._offset + len(self.buffer);
+        buffer = self.buffer;
+
+        _write_varint(buffer, self.end_step);
+        _write_varint(buffer, int(self.halted));
+        _write_varint(buffer, len(self._index));
+
+        last_step = 0;
+        last_offset = 0;
+
+        for step, offset in self._index:
+
+            _write_varint(buffer, step - last_step);
+            _write_varint(buffer, offset - last_offset);
+
+            last_step = step;
+            last_offset = offset;
+
+        buffer += TRAILER_STRUCT.pack(index_offset);
+        buffer += TRACE_INDEX_MAGIC;
+
+        self.flush();
+        self.file.flush();
+
+class TraceReader:
+
+    """Reads a trace from a binary file opened for reading, which must be seekable. Only the header and index are read up front; chunks of steps are read as needed."""
+
+    def __init__(self,
+        file: BinaryIO):
+
+        self.file = file;
+        self._base = file.tell(); # Position of the start of the trace in the file
+
+        # Trailer
+
+        file.seek(0, 2);
+        trailer_size = TRAILER_STRUCT.size + len(TRACE_INDEX_MAGIC);
+        trailer_position = file.tell() - trailer_size;
+
+        if trailer_position < self._base:
+            raise Exception("File is too short to be a complete trace");
+
+        file.seek(trailer_position);
+        trailer = file.read(trailer_size);
+
+        if trailer[TRAILER_STRUCT.size:] != TRACE_INDEX_MAGIC:
+            raise Exception("Trace has no index, so wasn't closed when it was written");
+
+        (index_offset,) = TRAILER_STRUCT.unpack(trailer[:TRAILER_STRUCT.size]);
+        self._index_offset = index_offset;
+
+        # Index
+
+        file.seek(self._base + index_offset);
+        index = _VarintReader(file.read(trailer_position - (self._base + index_offset)));
+
+        self.end_step = index.read();
+        self.halted = index.read() == 1;
+
+        self._checkpoint_steps = [];
+        self._checkpoint_offsets = [];
+
+        step = 0;
+        offset = 0;
+
+        for _ in range(index.read()):
+
+            step += index.read();
+            offset += index.read();
+
+            self._checkpoint_steps.append(step);
+            self._checkpoint_offsets.append(offset);
+
+        # Header, which runs up to the first checkpoint
+
+        file.seek(self._base);
+
+        if file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise Exception("File isn't a trace");
+
+        header = _VarintReader(file.read(self._checkpoint_offsets[0] - len(TRACE_MAGIC)));
+
+        self.start_step = header.read();
+        self.checkpoint_interval = header.read();
+
+        self.symbols = [header.read_string() for _ in range(header.read())];
+
+        # (start, read symbol code, end, write symbol code, head move) by transition ID
+
+        self.transitions = [(header.read(), header.read(), header.read(), header.read(), header.read_signed()) for _ in range(header.read())];
+
+    def _read_chunk(self,
+        i: int) -> tTuple[TraceConfiguration, _VarintReader]:
+
+        """Reads the ith chunk, getting the configuration at its checkpoint and a reader positioned on its first step"""
+
+        start = self._checkpoint_offsets[i];
+        end = self._checkpoint_offsets[i + 1] if i + 1 < len(self._checkpoint_offsets) else self._index_offset;
+
+        self.file.seek(self._base + start);
+        reader = _VarintReader(self.file.read(end - start));
+
+        step = reader.read();
+        state = reader.read_signed();
+        head = reader.read_signed();
+        tape_start = reader.read_signed();
+
+        symbols = self.symbols;
+
+        tape = Tape(symbols[0]);
+        tape.write_range(tape_start, [symbols[reader.read()] for _ in range(reader.read())]);
+        tape.head_to(head);
+
+        return TraceConfiguration(step, state, tape), reader;
+
+    def _get_chunk_index(self,
+        step: int) -> int:
+
+        if not (self.start_step <= step <= self.end_step):
+            raise Exception(f"Step {step} isn't in the trace, which runs from step {self.start_step} to {self.end_step}");
+
+        return bisect_right(self._checkpoint_steps, step) - 1;
+
+    def _get_chunk_end_step(self,
+        i: int) -> int:
+        return self._checkpoint_steps[i + 1] if i + 1 < len(self._checkpoint_steps) else self.end_step;
+
+    def iter_steps(self,
+        start_step: int | None = None) -> Iterator[TraceStep]:
+
+        """Generates the steps in the trace from start_step on. Only the chunk holding the step being generated is held in memory."""
+
+        if start_step == None:
+            start_step = self.start_step;
+
+        i = self._get_chunk_index(start_step);
+
+        while i < len(self._checkpoint_steps):
+
+            configuration, reader = self._read_chunk(i);
+            read = reader.read;
+
+            for step in range(configuration.step, self._get_chunk_end_step(i)):
+
+                transition_id = read();
+                write_code = read();
+                head_move = _unzigzag(read());
+
+                if step >= start_step:
+                    yield TraceStep(step, transition_id, write_code, head_move);
+
+            i += 1;
+
+    def get_configuration(self,
+        step: int) -> TraceConfiguration:
+
+        """Gets the state and tape the run had at a step by loading the checkpoint before it and replaying the steps after the checkpoint"""
+
+        configuration, reader = self._read_chunk(self._get_chunk_index(step));
+
+        transitions = self.transitions;
+        symbols = self.symbols;
+        read = reader.read;
+
+        state = configuration.state;
+        tape = configuration.tape;
+
+        for _ in range(configuration.step, step):
+
+            _, _, state, _, _ = transitions[read()];
+            tape.set_at_head(symbols[read()]);
+            tape.head_forward(_unzigzag(read()));
+
+        return TraceConfiguration(step, state, tape);
+
+    def get_symbol(self,
+        code: int) -> str:
+        return self.symbols[code];
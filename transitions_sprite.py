@@ -4,6 +4,7 @@ from pygame.sprite import Sprite;
 from pygame import Vector2;
 import pygame;
 from machine import Machine, Transition, State;
+from render_cache import render_text;
 
 class TransitionsSprite(Sprite):
 
@@ -11,7 +12,6 @@ class TransitionsSprite(Sprite):
 
     def __init__(self,
         machine: Machine,
-        parent_dims: tTuple[int, int],
         start: State,
         end: State,
         color: tTuple[int, int, int],
@@ -19,7 +19,8 @@ class TransitionsSprite(Sprite):
         bg_color: tTuple[int, int, int],
         line_width: int,
         loop_transition_height: int,
-        font: pygame.font.Font):
+        font: pygame.font.Font,
+        scale: float = 1):
 
         super().__init__();
 
@@ -31,30 +32,12 @@ class TransitionsSprite(Sprite):
         if len(self.transitions) == 0:
             raise Exception("No transitions exist between the provided states");
 
-        # Calculate positions
+        # Calculate positions. States' positions are multiplied by scale. N.B. line_width and loop_transition_height aren't scaled
 
-        line_start = start.pos;
-        line_end = end.pos;
+        line_start = Vector2(start.pos) * scale;
+        line_end = (Vector2(end.pos) * scale) if start != end else line_start;
 
-        # Set up surface
-
-        self.image = pygame.Surface(size = parent_dims); # Creates the initial surface to draw the sprite on
-
-        self.image.fill(color = bg_color); # Fills the surface with the background color
-        self.image.set_colorkey(bg_color); # Sets what color pixels count as transparent pixels
-
-        # Draw connector
-
-        text_center_pos = TransitionsSprite.draw_connector(
-            surface = self.image,
-            color = color,
-            start = line_start,
-            end = line_end if start != end else line_start,
-            width = line_width,
-            loop_height = loop_transition_height
-        );
-
-        # Write details along line
+        # Write details of transitions onto their own surface
 
         details_transitions_texts = [t.to_string() for t in self.transitions];
         details_transitions_texts_sizes = list(map(lambda s: font.size(s), details_transitions_texts));
@@ -71,7 +54,8 @@ class TransitionsSprite(Sprite):
 
             t = details_transitions_texts[i];
 
-            text = font.render(
+            text = render_text(
+                font,
                 t,
                 True,
                 text_color,
@@ -90,19 +74,158 @@ class TransitionsSprite(Sprite):
                 dest = text_pos
             );
 
+        # Find the bounds of everything to draw so that the surface only needs to cover them. A line between two different states isn't drawn onto the surface but onto another surface with draw_line, as a long line's own surface would be much larger than what can be seen of it
+
+        text_center_pos = TransitionsSprite.get_text_center_pos(line_start, line_end, loop_transition_height);
+
+        details_rect = details_text_surface.get_rect(center = (int(text_center_pos[0]), int(text_center_pos[1])));
+
+        self.color = color;
+        self.line_width = line_width;
+        self.loop_transition_height = loop_transition_height;
+
+        if start != end:
+
+            # Whole positions so that the line is drawn the same wherever it is drawn from
+
+            self.line = (Vector2(round(line_start[0]), round(line_start[1])), Vector2(round(line_end[0]), round(line_end[1])));
+            bounds = details_rect;
+
+        else:
+
+            self.line = None;
+            bounds = TransitionsSprite.get_connector_rect(line_start, line_end, line_width, loop_transition_height).union(details_rect);
+
+        # Kept so that the image can be redrawn in another colour
+
+        self.bg_color = bg_color;
+        self.details_text_surface = details_text_surface;
+        self.details_pos = details_rect.move(-bounds.x, -bounds.y);
+
+        offset = Vector2(bounds.topleft);
+
+        self.loop_pos = line_start - offset;
+
+        # Set up surface
+
+        self.image = pygame.Surface(size = bounds.size); # Creates the initial surface to draw the sprite on
+
+        # Set up rect
+
+        self.rect = bounds;
+
+        # Draw onto surface
+
+        self.redraw();
+
+    def redraw(self) -> None:
+
+        self.image.fill(color = self.bg_color); # Fills the surface with the background color
+        self.image.set_colorkey(self.bg_color); # Sets what color pixels count as transparent pixels
+
+        # Draw loop
+
+        if self.line == None:
+
+            TransitionsSprite.draw_connector(
+                surface = self.image,
+                color = self.color,
+                start = self.loop_pos,
+                end = self.loop_pos,
+                width = self.line_width,
+                loop_height = self.loop_transition_height
+            );
+
+        # Write details along line
+
         self.image.blit(
-            source = details_text_surface,
-            dest = (
-                text_center_pos[0] - (details_texts_surface_width // 2),
-                text_center_pos[1] - (details_texts_surface_height // 2),
-            )
+            source = self.details_text_surface,
+            dest = self.details_pos
         );
 
-        # Set up rect
+    def set_color(self,
+        color: tTuple[int, int, int]) -> None:
 
-        self.rect = self.image.get_rect();
-        self.rect.x = 0;
-        self.rect.y = 0;
+        """Changes the colour of the line, redrawing the image if the line is a loop drawn on it. A line between two different states needs drawing again by draw_line."""
+
+        if color == self.color:
+            return;
+
+        self.color = color;
+
+        if self.line == None:
+            self.redraw();
+
+    def get_line_rect(self) -> pygame.Rect:
+
+        """Gets a rect that contains what draw_line draws, for a line between two different states"""
+
+        return TransitionsSprite.get_connector_rect(self.line[0], self.line[1], self.line_width, self.loop_transition_height);
+
+    def draw_line(self,
+        surface: pygame.Surface,
+        offset: tTuple[int, int]) -> None:
+
+        """Draws the line between the two states onto a surface that the sprite's image is drawn onto moved back by offset. Loops are part of the image so nothing is drawn for them."""
+
+        if self.line == None:
+            return;
+
+        TransitionsSprite.draw_connector(
+            surface = surface,
+            color = self.color,
+            start = self.line[0] - Vector2(offset),
+            end = self.line[1] - Vector2(offset),
+            width = self.line_width,
+            loop_height = self.loop_transition_height
+        );
+
+    @staticmethod
+    def get_text_center_pos(start: Vector2,
+        end: Vector2,
+        loop_height: int) -> Vector2:
+
+        """Gets the position that the transition details should be centered on."""
+
+        if start != end:
+            return (start + end) // 2;
+
+        else:
+            return start - Vector2(0, loop_height);
+
+    @staticmethod
+    def get_connector_rect(start: Vector2,
+        end: Vector2,
+        width: int,
+        loop_height: int) -> pygame.Rect:
+
+        """Gets a rect that contains the line drawn for a transition."""
+
+        if start != end:
+
+            left = min(start[0], end[0]);
+            top = min(start[1], end[1]);
+            right = max(start[0], end[0]);
+            bottom = max(start[1], end[1]);
+
+        else:
+
+            center = (start + (start - Vector2(0, loop_height))) // 2;
+            radius = loop_height // 2;
+
+            left = center[0] - radius;
+            top = center[1] - radius;
+            right = center[0] + radius;
+            bottom = center[1] + radius;
+
+        # Pad by the line width as thick lines extend past their end points
+
+        return pygame.Rect(
+            int(left) - width,
+            int(top) - width,
+            int(right - left) + (2 * width) + 1,
+            int(bottom - top) + (2 * width) + 1
+        );
 
     @staticmethod
     def draw_connector(surface: pygame.Surface,
@@ -114,6 +237,8 @@ class TransitionsSprite(Sprite):
 
         """Draws the line for a transition and returns the position that the transition details should be centered on."""
 
+        text_center_pos = TransitionsSprite.get_text_center_pos(start, end, loop_height);
+
         if start != end:
 
             # Normal case: different states having a transition between them
@@ -126,8 +251,6 @@ class TransitionsSprite(Sprite):
                 width = width
             );
 
-            return (start + end) // 2;
-
         else:
 
             # Less-usual case: a transition from a state back to itself
@@ -143,4 +266,4 @@ class TransitionsSprite(Sprite):
                 width = width
             );
 
-            return top;
+        return text_center_pos;
@@ -0,0 +1,68 @@
+from threading import Thread, Event;
+
+from engine import Engine, RunSnapshot;
+
+# Runs an engine as fast as it can on a background thread so that the speed of a run isn't tied to the frame rate. The GUI only reads the snapshots published by the runner while it is running and mustn't touch the engine, its machine or its tape until the runner has been stopped
+# N.B. like the engine, this module must not import pygame or tkinter
+
+TURBO_CHUNK_STEPS = 20000; # Number of steps made between publishing snapshots and checking for being stopped
+
+class TurboRunner:
+
+    def __init__(self,
+        engine: Engine,
+        snapshot_cells_each_side: int,
+        chunk_steps: int = TURBO_CHUNK_STEPS):
+
+        self.engine = engine;
+        self.snapshot_cells_each_side = snapshot_cells_each_side;
+        self.chunk_steps = chunk_steps;
+
+        self.snapshot = engine.get_snapshot(snapshot_cells_each_side); # Latest snapshot. Replaced rather than changed so it can be read from other threads
+
+        self.finished = False; # Set when the run stops by itself by halting or by being found to be in a cycle
+
+        self._stop_event = Event();
+        self._thread = None;
+
+    def start(self) -> None:
+
+        if self._thread != None:
+            raise Exception("Runner has already been started");
+
+        self._thread = Thread(target = self._run, daemon = True);
+        self._thread.start();
+
+    def stop(self) -> None:
+
+        """Stops the run and waits for the thread to finish. The engine can be used again once this returns."""
+
+        self._stop_event.set();
+
+        if self._thread != None:
+            self._thread.join();
+
+    def is_running(self) -> bool:
+        return (self._thread != None) and self._thread.is_alive();
+
+    def get_snapshot(self) -> RunSnapshot:
+        return self.snapshot;
+
+    def _run(self) -> None:
+
+        engine = self.engine;
+        chunk_steps = self.chunk_steps;
+        cells_each_side = self.snapshot_cells_each_side;
+        stop_event = self._stop_event;
+
+        cycle_already_found = engine.cycle_period != None;
+
+        while not stop_event.is_set():
+
+            engine.run_steps(chunk_steps);
+
+            self.snapshot = engine.get_snapshot(cells_each_side);
+
+            if engine.halted or ((not cycle_already_found) and (engine.cycle_period != None)):
+                self.finished = True;
+                break;